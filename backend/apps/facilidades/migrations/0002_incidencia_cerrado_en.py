@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilidades', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incidencia',
+            name='cerrado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Para las ya cerradas no hay nada mejor que su última modificación
+        migrations.RunSQL(
+            sql="UPDATE incidencias SET cerrado_en = updated_at WHERE estado = 'cerrada';",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['cerrado_en'], name='incidencias_cerrado_dcba12_idx'),
+        ),
+    ]
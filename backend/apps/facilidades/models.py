@@ -1,6 +1,7 @@
 # apps/facilidades/models.py
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from apps.core.models import BaseModel
 
 # Choices útiles
@@ -154,12 +155,29 @@ class Incidencia(BaseModel):
     urls_audio = models.JSONField(null=True, blank=True)  # lista de urls
     urls_imagen = models.JSONField(null=True, blank=True)  # lista de urls
     asignado_a = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="incidencias_asignadas")
+    # Cuándo pasó a "cerrada"; a diferencia de updated_at no cambia si después se edita
+    cerrado_en = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "incidencias"
         verbose_name = "Incidencia"
         verbose_name_plural = "Incidencias"
-        indexes = [models.Index(fields=["condominio", "estado"]), models.Index(fields=["asignado_a"])]
+        indexes = [
+            models.Index(fields=["condominio", "estado"]),
+            models.Index(fields=["asignado_a"]),
+            models.Index(fields=["cerrado_en"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        cerrado_en = self.cerrado_en
+        if self.estado != "cerrada":
+            self.cerrado_en = None
+        elif self.cerrado_en is None:
+            self.cerrado_en = timezone.now()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.cerrado_en != cerrado_en:
+            kwargs["update_fields"] = {*update_fields, "cerrado_en"}
+        super().save(*args, **kwargs)
 
 
 class ComentarioIncidencia(BaseModel):
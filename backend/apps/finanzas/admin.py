@@ -1,6 +1,6 @@
 # apps/finanzas/admin.py
 from django.contrib import admin
-from .models import Factura, Cargo, Pago, EnlacePago
+from .models import Factura, Cargo, Pago, EnlacePago, SaldoUnidad
 
 @admin.register(Factura)
 class FacturaAdmin(admin.ModelAdmin):
@@ -24,3 +24,10 @@ class EnlacePagoAdmin(admin.ModelAdmin):
     list_display = ("enlace", "condominio", "unidad", "monto", "estado", "expira_en")
     search_fields = ("enlace",)
     list_filter = ("estado",)
+
+@admin.register(SaldoUnidad)
+class SaldoUnidadAdmin(admin.ModelAdmin):
+    list_display = ("unidad", "condominio", "deuda", "monto_vencido", "vencimiento_mas_antiguo", "calculado_en")
+    search_fields = ("unidad__numero_unidad",)
+    list_filter = ("condominio",)
+    readonly_fields = [f.name for f in SaldoUnidad._meta.fields]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FinanzasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.finanzas'
+
+    def ready(self):
+        import apps.finanzas.signals # noqa
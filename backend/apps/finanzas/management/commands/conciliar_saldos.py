@@ -0,0 +1,65 @@
+# apps/finanzas/management/commands/conciliar_saldos.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.facilidades.models import Unidad
+from apps.finanzas.models import SaldoUnidad
+from apps.finanzas.services import actualizar_saldos, calcular_saldos
+
+# calculado_en cambia en cada pasada; solo cuentan los importes y las fechas de vencimiento
+COMPARADOS = [
+    "condominio_id", "total_facturado", "total_pagado", "deuda", "monto_vencido",
+    "vencimiento_mas_antiguo", "proximo_vencimiento",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye la tabla de saldos por unidad (saldos_unidad) desde facturas, "
+        "cargos y pagos, e informa las unidades cuyo saldo guardado no coincidía. "
+        "Sirve para la carga inicial y después de operaciones en bloque que no "
+        "disparan señales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--condominio", help="ID del condominio (por defecto, todos).")
+        parser.add_argument("--batch-size", type=int, default=500, help="Unidades por transacción.")
+        parser.add_argument("--dry-run", action="store_true", help="Solo informa diferencias, no guarda.")
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        unidades = Unidad.objects.order_by("pk").values_list("pk", flat=True)
+        if options["condominio"]:
+            unidades = unidades.filter(condominio_id=options["condominio"])
+
+        revisadas = diferencias = 0
+        lote = []
+        for unidad_id in unidades.iterator(chunk_size=options["batch_size"]):
+            lote.append(unidad_id)
+            if len(lote) >= options["batch_size"]:
+                diferencias += self._conciliar(lote, hoy, options["dry_run"])
+                revisadas += len(lote)
+                lote = []
+        if lote:
+            diferencias += self._conciliar(lote, hoy, options["dry_run"])
+            revisadas += len(lote)
+
+        accion = "encontradas" if options["dry_run"] else "corregidas"
+        self.stdout.write(self.style.SUCCESS(f"{revisadas} unidades revisadas, {diferencias} diferencias {accion}."))
+
+    def _conciliar(self, unidad_ids, hoy, dry_run):
+        guardados = {s.unidad_id: s for s in SaldoUnidad.objects.filter(unidad_id__in=unidad_ids)}
+        if dry_run:
+            calculados = calcular_saldos(list(Unidad.objects.filter(pk__in=unidad_ids).only("pk", "condominio_id")), hoy)
+        else:
+            calculados = actualizar_saldos(unidad_ids, hoy)
+
+        diferencias = 0
+        for saldo in calculados:
+            anterior = guardados.get(saldo.unidad_id)
+            campos = [c for c in COMPARADOS if anterior is None or getattr(anterior, c) != getattr(saldo, c)]
+            if campos:
+                diferencias += 1
+                detalle = "sin saldo" if anterior is None else ", ".join(campos)
+                self.stdout.write(f"  unidad {saldo.unidad_id}: {detalle}")
+        return diferencias
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:53
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+MONTO = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+def rellenar_saldos(apps, schema_editor):
+    """
+    Carga inicial de saldos_unidad con el mismo cálculo que `conciliar_saldos`,
+    sobre los modelos históricos (services.py puede cambiar después).
+    """
+    Unidad = apps.get_model("facilidades", "Unidad")
+    Factura = apps.get_model("finanzas", "Factura")
+    Cargo = apps.get_model("finanzas", "Cargo")
+    Pago = apps.get_model("finanzas", "Pago")
+    SaldoUnidad = apps.get_model("finanzas", "SaldoUnidad")
+    hoy = timezone.localdate()
+    cero = Value(Decimal("0"), output_field=MONTO)
+
+    def por_factura(filas):
+        total = filas.filter(factura=OuterRef("pk")).order_by().values("factura").annotate(t=Sum("monto")).values("t")
+        return Coalesce(Subquery(total, output_field=MONTO), cero, output_field=MONTO)
+
+    facturado = dict(Factura.objects.order_by().values("unidad").annotate(t=Sum("monto")).values_list("unidad", "t"))
+    for unidad_id, total in (
+        Cargo.objects.order_by().values("factura__unidad").annotate(t=Sum("monto")).values_list("factura__unidad", "t")
+    ):
+        facturado[unidad_id] = facturado.get(unidad_id, Decimal("0")) + total
+    pagado = dict(
+        Pago.objects.filter(estado="success").order_by().values("unidad")
+        .annotate(t=Sum("monto")).values_list("unidad", "t")
+    )
+    impagas = {
+        fila["unidad"]: fila
+        for fila in Factura.objects.filter(estado="pendiente")
+        .annotate(deuda=F("monto") + por_factura(Cargo.objects.all()) - por_factura(Pago.objects.filter(estado="success")))
+        .filter(deuda__gt=0).order_by().values("unidad")
+        .annotate(
+            total_deuda=Sum("deuda"),
+            total_vencido=Sum("deuda", filter=Q(fecha_vencimiento__lt=hoy)),
+            mas_antiguo=Min("fecha_vencimiento"),
+            proximo=Min("fecha_vencimiento", filter=Q(fecha_vencimiento__gte=hoy)),
+        )
+    }
+
+    saldos = []
+    for unidad_id, condominio_id in Unidad.objects.values_list("pk", "condominio_id").iterator(chunk_size=2000):
+        fila = impagas.get(unidad_id, {})
+        saldos.append(SaldoUnidad(
+            unidad_id=unidad_id,
+            condominio_id=condominio_id,
+            total_facturado=facturado.get(unidad_id) or Decimal("0"),
+            total_pagado=pagado.get(unidad_id) or Decimal("0"),
+            deuda=fila.get("total_deuda") or Decimal("0"),
+            monto_vencido=fila.get("total_vencido") or Decimal("0"),
+            vencimiento_mas_antiguo=fila.get("mas_antiguo"),
+            proximo_vencimiento=fila.get("proximo"),
+            calculado_en=hoy,
+        ))
+        if len(saldos) >= 1000:
+            SaldoUnidad.objects.bulk_create(saldos)
+            saldos = []
+    SaldoUnidad.objects.bulk_create(saldos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilidades', '0001_initial'),
+        ('finanzas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoUnidad',
+            fields=[
+                ('unidad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo', serialize=False, to='facilidades.unidad')),
+                ('total_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('deuda', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_vencido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vencimiento_mas_antiguo', models.DateField(blank=True, null=True)),
+                ('proximo_vencimiento', models.DateField(blank=True, null=True)),
+                ('calculado_en', models.DateField()),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='facilidades.condominio')),
+            ],
+            options={
+                'db_table': 'saldos_unidad',
+                'indexes': [models.Index(fields=['condominio', 'monto_vencido'], name='saldo_condominio_vencido_idx'), models.Index(fields=['proximo_vencimiento'], name='saldo_proximo_venc_idx')],
+            },
+        ),
+        migrations.RunPython(rellenar_saldos, migrations.RunPython.noop),
+    ]
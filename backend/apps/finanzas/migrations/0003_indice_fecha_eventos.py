@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0002_saldo_unidad'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['pagado_en'], name='pago_pagado_en_idx'),
+        ),
+    ]
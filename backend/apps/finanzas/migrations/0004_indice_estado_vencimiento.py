@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0003_indice_fecha_eventos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['estado', 'fecha_vencimiento'], name='factura_estado_venc_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0004_indice_estado_vencimiento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='saldounidad',
+            index=models.Index(fields=['condominio', 'deuda'], name='saldo_condominio_deuda_idx'),
+        ),
+    ]
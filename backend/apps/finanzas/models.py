@@ -1,10 +1,26 @@
 # apps/finanzas/models.py
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from apps.core.models import BaseModel
 from apps.facilidades.models import Condominio, Unidad
 
-class Factura(BaseModel):
+
+class GuardadoAtomico(models.Model):
+    """
+    save() dentro de una transacción, así el recálculo de SaldoUnidad que hace
+    post_save (ver signals.py) se confirma o se revierte junto con la fila.
+    delete() no lo necesita: el Collector ya envía post_delete dentro de la suya.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+
+class Factura(GuardadoAtomico, BaseModel):
     condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name="facturas")
     unidad = models.ForeignKey(Unidad, on_delete=models.CASCADE, related_name="facturas")
     numero_factura = models.CharField(max_length=50, unique=True)
@@ -17,12 +33,13 @@ class Factura(BaseModel):
     class Meta:
         db_table = "facturas"
         ordering = ["-emitida_en"]
+        indexes = [models.Index(fields=["estado", "fecha_vencimiento"], name="factura_estado_venc_idx")]
 
     def __str__(self):
         return f"Factura {self.numero_factura} - {self.unidad}"
 
 
-class Cargo(BaseModel):
+class Cargo(GuardadoAtomico, BaseModel):
     factura = models.ForeignKey(Factura, on_delete=models.CASCADE, related_name="cargos")
     descripcion = models.TextField()
     monto = models.DecimalField(max_digits=12, decimal_places=2)
@@ -34,7 +51,7 @@ class Cargo(BaseModel):
         return f"Cargo {self.descripcion} - {self.monto}"
 
 
-class Pago(BaseModel):
+class Pago(GuardadoAtomico, BaseModel):
     factura = models.ForeignKey(Factura, on_delete=models.SET_NULL, null=True, blank=True, related_name="pagos")
     unidad = models.ForeignKey(Unidad, on_delete=models.CASCADE, related_name="pagos")
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="pagos")
@@ -48,6 +65,7 @@ class Pago(BaseModel):
 
     class Meta:
         db_table = "pagos"
+        indexes = [models.Index(fields=["pagado_en"], name="pago_pagado_en_idx")]
 
     def __str__(self):
         return f"Pago {self.monto} - {self.usuario}"
@@ -69,3 +87,36 @@ class EnlacePago(BaseModel):
 
     def __str__(self):
         return f"Enlace {self.enlace} - {self.monto}"
+
+
+class SaldoUnidad(models.Model):
+    """
+    Saldo de cuenta por unidad, mantenido en la misma transacción que cada
+    cambio de Factura, Cargo o Pago (ver signals.py). Las consultas de
+    morosidad recorren esta tabla en vez de todo el historial de facturas;
+    `conciliar_saldos` la reconstruye desde las tablas de origen.
+    """
+    unidad = models.OneToOneField(Unidad, on_delete=models.CASCADE, primary_key=True, related_name="saldo")
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name="saldos")
+    total_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Lo que falta pagar de las facturas pendientes, y la parte ya vencida
+    deuda = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_vencido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vencimiento_mas_antiguo = models.DateField(null=True, blank=True)
+    # Siguiente vencimiento impago aún no vencido: cuando llega, monto_vencido cambia sin que haya
+    # escrituras y queda al día en la próxima pasada de `conciliar_saldos`
+    proximo_vencimiento = models.DateField(null=True, blank=True)
+    calculado_en = models.DateField()
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "saldos_unidad"
+        indexes = [
+            models.Index(fields=["condominio", "monto_vencido"], name="saldo_condominio_vencido_idx"),
+            models.Index(fields=["condominio", "deuda"], name="saldo_condominio_deuda_idx"),
+            models.Index(fields=["proximo_vencimiento"], name="saldo_proximo_venc_idx"),
+        ]
+
+    def __str__(self):
+        return f"Saldo {self.unidad} - {self.deuda}"
@@ -0,0 +1,205 @@
+# apps/finanzas/services.py
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.facilidades.models import Unidad
+from .models import Cargo, Factura, Pago, SaldoUnidad
+
+MONTO = DecimalField(max_digits=14, decimal_places=2)
+CERO = Value(Decimal("0"), output_field=MONTO)
+
+CAMPOS_SALDO = [
+    "condominio", "total_facturado", "total_pagado", "deuda", "monto_vencido",
+    "vencimiento_mas_antiguo", "proximo_vencimiento", "calculado_en",
+]
+
+
+def _suma_por_factura(queryset):
+    """Subconsulta correlacionada: suma de `monto` de las filas de la factura externa."""
+    total = queryset.filter(factura=OuterRef("pk")).order_by().values("factura").annotate(total=Sum("monto")).values("total")
+    return Coalesce(Subquery(total, output_field=MONTO), CERO, output_field=MONTO)
+
+
+def anotar_deuda(facturas):
+    """
+    Anota `importe` (monto + cargos), `pagado` (pagos exitosos) y `deuda`.
+    Cargos y pagos se suman en subconsultas, así sigue siendo una sola consulta.
+    """
+    return (
+        facturas.annotate(
+            total_cargos=_suma_por_factura(Cargo.objects.all()),
+            pagado=_suma_por_factura(Pago.objects.filter(estado="success")),
+        )
+        .annotate(importe=F("monto") + F("total_cargos"))
+        .annotate(deuda=F("importe") - F("pagado"))
+    )
+
+
+def saldos_con_deuda(condominio=None):
+    """
+    Saldos (SaldoUnidad) con deuda, opcionalmente de un condominio: índice
+    (condominio, deuda). Es la fuente de las unidades morosas para la vista de
+    morosos y los reportes. Ojo: update() y bulk_create() sobre Factura, Cargo
+    o Pago no disparan las señales y dejan el saldo desfasado hasta la próxima
+    pasada de `conciliar_saldos`.
+    """
+    saldos = SaldoUnidad.objects.filter(deuda__gt=0)
+    if condominio is not None:
+        saldos = saldos.filter(condominio=condominio)
+    return saldos
+
+
+def facturas_impagas(facturas=None):
+    """Facturas pendientes a las que todavía les falta pagar algo."""
+    if facturas is None:
+        facturas = Factura.objects.all()
+    return anotar_deuda(facturas.filter(estado="pendiente")).filter(deuda__gt=0)
+
+
+def calcular_saldos(unidades, hoy=None):
+    """
+    Saldos (sin guardar) de las unidades indicadas, calculados desde las tablas
+    de origen con tres consultas agrupadas por unidad.
+    """
+    hoy = hoy or timezone.localdate()
+    filtro = Q(unidad__in=unidades)
+    facturado = dict(
+        Factura.objects.filter(filtro).order_by().values("unidad")
+        .annotate(total=Sum("monto")).values_list("unidad", "total")
+    )
+    for unidad_id, total in (
+        Cargo.objects.filter(factura__unidad__in=unidades).order_by().values("factura__unidad")
+        .annotate(total=Sum("monto")).values_list("factura__unidad", "total")
+    ):
+        facturado[unidad_id] = facturado.get(unidad_id, Decimal("0")) + total
+    pagado = dict(
+        Pago.objects.filter(filtro, estado="success").order_by().values("unidad")
+        .annotate(total=Sum("monto")).values_list("unidad", "total")
+    )
+    impagas = {
+        fila["unidad"]: fila
+        for fila in facturas_impagas(Factura.objects.filter(filtro)).order_by().values("unidad").annotate(
+            total_deuda=Sum("deuda"),
+            total_vencido=Sum("deuda", filter=Q(fecha_vencimiento__lt=hoy)),
+            mas_antiguo=Min("fecha_vencimiento"),
+            proximo=Min("fecha_vencimiento", filter=Q(fecha_vencimiento__gte=hoy)),
+        )
+    }
+
+    saldos = []
+    for unidad in unidades:
+        fila = impagas.get(unidad.pk, {})
+        saldos.append(SaldoUnidad(
+            unidad=unidad,
+            condominio_id=unidad.condominio_id,
+            total_facturado=facturado.get(unidad.pk) or Decimal("0"),
+            total_pagado=pagado.get(unidad.pk) or Decimal("0"),
+            deuda=fila.get("total_deuda") or Decimal("0"),
+            monto_vencido=fila.get("total_vencido") or Decimal("0"),
+            vencimiento_mas_antiguo=fila.get("mas_antiguo"),
+            proximo_vencimiento=fila.get("proximo"),
+            calculado_en=hoy,
+        ))
+    return saldos
+
+
+def actualizar_saldos(unidad_ids, hoy=None):
+    """
+    Recalcula y guarda el saldo de las unidades dentro de la transacción en curso.
+    Bloquea las filas de Unidad (en orden de pk, para no cruzar bloqueos), así dos
+    transacciones que tocan la misma unidad se serializan y la segunda ve lo que
+    confirmó la primera.
+    """
+    unidad_ids = {u for u in unidad_ids if u is not None}
+    if not unidad_ids:
+        return []
+    with transaction.atomic():
+        unidades = list(
+            Unidad.objects.select_for_update().filter(pk__in=unidad_ids).order_by("pk").only("pk", "condominio_id")
+        )
+        saldos = calcular_saldos(unidades, hoy)
+        if saldos:
+            SaldoUnidad.objects.bulk_create(
+                saldos, update_conflicts=True, unique_fields=["unidad"], update_fields=CAMPOS_SALDO,
+            )
+    return saldos
+
+
+SQL_VENCIDAS = "WITH vencidas AS MATERIALIZED ({facturas}) "
+
+SQL_MOROSOS = SQL_VENCIDAS + """
+    SELECT unidad_id, numero_unidad, condominio_nombre,
+           COUNT(*) AS facturas_vencidas,
+           SUM(monto) AS total_monto,
+           SUM(deuda) AS total_pendiente,
+           MIN(fecha_vencimiento) AS vencimiento_mas_antiguo,
+           JSONB_AGG(JSONB_BUILD_OBJECT(
+               'numero_factura', numero_factura, 'monto', monto,
+               'pendiente', deuda, 'fecha_vencimiento', fecha_vencimiento
+           ) ORDER BY fecha_vencimiento) AS facturas
+    FROM vencidas
+    WHERE deuda > 0
+    GROUP BY unidad_id, numero_unidad, condominio_nombre
+    ORDER BY vencimiento_mas_antiguo, numero_unidad, unidad_id
+"""
+
+SQL_MOROSOS_TOTAL = SQL_VENCIDAS + "SELECT COUNT(DISTINCT unidad_id) FROM vencidas WHERE deuda > 0"
+
+
+class MorososPorUnidad:
+    """
+    Filas de morosos_por_unidad. La deuda de cada factura se calcula una sola
+    vez en una CTE materializada y se reutiliza en el filtro, las sumas y el
+    JSON (el ORM repetiría las subconsultas de cargos y pagos en cada uso).
+    count() y las rebanadas ejecutan la consulta con LIMIT/OFFSET, así el
+    paginador de DRF la trata igual que a un QuerySet.
+    """
+
+    def __init__(self, facturas):
+        self.sql, self.params = facturas.query.sql_with_params()
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_MOROSOS_TOTAL.format(facturas=self.sql), self.params)
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, rebanada):
+        if not isinstance(rebanada, slice) or rebanada.step is not None:
+            raise TypeError("MorososPorUnidad solo admite rebanadas [inicio:fin]")
+        inicio = rebanada.start or 0
+        sql = SQL_MOROSOS.format(facturas=self.sql) + " OFFSET %s"
+        params = (*self.params, inicio)
+        if rebanada.stop is not None:
+            sql += " LIMIT %s"
+            params += (max(rebanada.stop - inicio, 0),)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            columnas = [c[0] for c in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+def morosos_por_unidad(condominio=None, hoy=None):
+    """
+    Facturas vencidas e impagas agrupadas por unidad en un solo GROUP BY:
+    cantidad, suma de montos y de deuda, vencimiento más antiguo y el detalle
+    de las facturas (JSONB_AGG) en la misma fila. El filtro por estado y
+    vencimiento usa el índice (estado, fecha_vencimiento); las unidades salen
+    del saldo por unidad, igual que en los reportes de morosidad.
+    """
+    hoy = hoy or timezone.localdate()
+    facturas = Factura.objects.filter(
+        estado="pendiente", fecha_vencimiento__lt=hoy,
+        unidad__in=saldos_con_deuda(condominio).values("unidad"),
+    )
+    if condominio is not None:
+        facturas = facturas.filter(condominio=condominio)
+    return MorososPorUnidad(
+        anotar_deuda(facturas).order_by().values(
+            "unidad_id", "numero_factura", "monto", "fecha_vencimiento", "deuda",
+            numero_unidad=F("unidad__numero_unidad"), condominio_nombre=F("condominio__nombre"),
+        )
+    )
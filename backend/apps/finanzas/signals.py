@@ -0,0 +1,66 @@
+# apps/finanzas/signals.py
+"""
+Mantiene SaldoUnidad al día: cada alta, cambio o baja de Factura, Cargo o Pago
+recalcula el saldo de las unidades afectadas en la misma transacción (save()
+de esos modelos es atómico, ver GuardadoAtomico; delete() ya lo era).
+Las operaciones en bloque (update(), bulk_create()) no disparan señales; tras
+ellas hay que llamar a actualizar_saldos() o correr `conciliar_saldos`.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.facilidades.models import Condominio, Unidad
+from .models import Cargo, Factura, Pago
+from .services import actualizar_saldos
+
+
+def _unidad_de_factura(factura_id):
+    if factura_id is None:
+        return None
+    return Factura.objects.filter(pk=factura_id).values_list("unidad_id", flat=True).first()
+
+
+@receiver(pre_save, sender=Factura)
+@receiver(pre_save, sender=Pago)
+def guardar_unidad_anterior(sender, instance, **kwargs):
+    """Si la fila cambia de unidad, también hay que recalcular la unidad anterior."""
+    instance._unidad_anterior = None
+    if not instance._state.adding:
+        instance._unidad_anterior = sender.objects.filter(pk=instance.pk).values_list("unidad_id", flat=True).first()
+
+
+@receiver(pre_save, sender=Cargo)
+def guardar_factura_anterior(sender, instance, **kwargs):
+    instance._factura_anterior = None
+    if not instance._state.adding:
+        instance._factura_anterior = Cargo.objects.filter(pk=instance.pk).values_list("factura_id", flat=True).first()
+
+
+@receiver(post_save, sender=Factura)
+@receiver(post_save, sender=Pago)
+def actualizar_saldo(sender, instance, **kwargs):
+    actualizar_saldos({instance.unidad_id, getattr(instance, "_unidad_anterior", None)})
+
+
+@receiver(post_save, sender=Cargo)
+def actualizar_saldo_cargo(sender, instance, **kwargs):
+    facturas = {instance.factura_id, getattr(instance, "_factura_anterior", None)}
+    actualizar_saldos({_unidad_de_factura(f) for f in facturas})
+
+
+def _borrado_en_cascada(origin):
+    # Si se borra la unidad o el condominio, su saldo se va con ellos
+    return isinstance(origin, (Unidad, Condominio)) or getattr(origin, "model", None) in (Unidad, Condominio)
+
+
+@receiver(post_delete, sender=Factura)
+@receiver(post_delete, sender=Pago)
+def actualizar_saldo_borrado(sender, instance, origin=None, **kwargs):
+    if not _borrado_en_cascada(origin):
+        actualizar_saldos({instance.unidad_id})
+
+
+@receiver(post_delete, sender=Cargo)
+def actualizar_saldo_cargo_borrado(sender, instance, origin=None, **kwargs):
+    if not _borrado_en_cascada(origin):
+        actualizar_saldos({_unidad_de_factura(instance.factura_id)})
@@ -1,3 +1,176 @@
+import importlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.facilidades.models import Condominio, Unidad
+from .models import Cargo, Factura, Pago, SaldoUnidad
+from .services import calcular_saldos
+
+User = get_user_model()
+
+
+class SaldoUnidadTests(TestCase):
+    """El saldo por unidad se mantiene con las señales y se rellena en la migración."""
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.condominio = Condominio.objects.create(nombre="Las Palmas")
+        self.unidad = Unidad.objects.create(condominio=self.condominio, numero_unidad="101")
+        self.usuario = User.objects.create_user(username="residente", password="x")
+
+    def crear_factura(self, numero, monto, dias=-5, estado="pendiente"):
+        return Factura.objects.create(
+            condominio=self.condominio, unidad=self.unidad, numero_factura=numero,
+            monto=Decimal(monto), fecha_vencimiento=self.hoy + timedelta(days=dias), estado=estado,
+        )
+
+    def saldo(self):
+        return SaldoUnidad.objects.get(unidad=self.unidad)
+
+    def test_factura_vencida_crea_saldo(self):
+        self.crear_factura("F-1", "100.00")
+        saldo = self.saldo()
+        self.assertEqual(saldo.condominio_id, self.condominio.pk)
+        self.assertEqual(saldo.total_facturado, Decimal("100.00"))
+        self.assertEqual(saldo.deuda, Decimal("100.00"))
+        self.assertEqual(saldo.monto_vencido, Decimal("100.00"))
+        self.assertEqual(saldo.vencimiento_mas_antiguo, self.hoy - timedelta(days=5))
+
+    def test_factura_por_vencer_no_es_vencida(self):
+        self.crear_factura("F-1", "80.00", dias=10)
+        saldo = self.saldo()
+        self.assertEqual(saldo.deuda, Decimal("80.00"))
+        self.assertEqual(saldo.monto_vencido, Decimal("0"))
+        self.assertEqual(saldo.proximo_vencimiento, self.hoy + timedelta(days=10))
+
+    def test_cargos_y_pagos_actualizan_saldo(self):
+        factura = self.crear_factura("F-1", "100.00")
+        Cargo.objects.create(factura=factura, descripcion="Multa", monto=Decimal("20.00"))
+        self.assertEqual(self.saldo().deuda, Decimal("120.00"))
+
+        Pago.objects.create(factura=factura, unidad=self.unidad, usuario=self.usuario, monto=Decimal("50.00"), estado="success")
+        Pago.objects.create(factura=factura, unidad=self.unidad, usuario=self.usuario, monto=Decimal("70.00"), estado="failed")
+        saldo = self.saldo()
+        self.assertEqual(saldo.total_pagado, Decimal("50.00"))
+        self.assertEqual(saldo.deuda, Decimal("70.00"))
+
+    def test_borrar_factura_recalcula_saldo(self):
+        factura = self.crear_factura("F-1", "100.00")
+        self.crear_factura("F-2", "30.00")
+        factura.delete()
+        self.assertEqual(self.saldo().deuda, Decimal("30.00"))
+
+    def test_cambio_de_unidad_recalcula_ambas(self):
+        otra = Unidad.objects.create(condominio=self.condominio, numero_unidad="102")
+        factura = self.crear_factura("F-1", "100.00")
+        factura.unidad = otra
+        factura.save()
+        self.assertEqual(self.saldo().deuda, Decimal("0"))
+        self.assertEqual(SaldoUnidad.objects.get(unidad=otra).deuda, Decimal("100.00"))
+
+    def test_factura_pagada_no_genera_deuda(self):
+        self.crear_factura("F-1", "100.00", estado="pagada")
+        self.assertEqual(self.saldo().deuda, Decimal("0"))
+
+    def test_relleno_de_la_migracion_coincide_con_calcular_saldos(self):
+        # bulk_create no dispara señales: es el caso que la migración tiene que cubrir
+        factura = self.crear_factura("F-1", "100.00")
+        Factura.objects.bulk_create([Factura(
+            condominio=self.condominio, unidad=self.unidad, numero_factura="F-2",
+            monto=Decimal("40.00"), fecha_vencimiento=self.hoy + timedelta(days=3),
+        )])
+        Cargo.objects.bulk_create([Cargo(factura=factura, descripcion="Multa", monto=Decimal("15.00"))])
+        vacia = Unidad.objects.create(condominio=self.condominio, numero_unidad="103")
+        SaldoUnidad.objects.all().delete()
+
+        migracion = importlib.import_module("apps.finanzas.migrations.0002_saldo_unidad")
+        migracion.rellenar_saldos(django_apps, None)
+
+        esperado = {s.unidad_id: s for s in calcular_saldos([self.unidad, vacia], self.hoy)}
+        for saldo in SaldoUnidad.objects.all():
+            calculado = esperado.pop(saldo.unidad_id)
+            self.assertEqual(saldo.deuda, calculado.deuda)
+            self.assertEqual(saldo.monto_vencido, calculado.monto_vencido)
+            self.assertEqual(saldo.total_facturado, calculado.total_facturado)
+            self.assertEqual(saldo.proximo_vencimiento, calculado.proximo_vencimiento)
+        self.assertEqual(esperado, {})
+        self.assertEqual(self.saldo().deuda, Decimal("155.00"))
+
+
+class MorososViewTests(TestCase):
+    """FacturaViewSet.morosos: una fila por unidad, paginada."""
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.condominio = Condominio.objects.create(nombre="Las Palmas")
+        self.usuario = User.objects.create_user(username="admin", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse("factura-morosos")
+        self.numero = 0
+
+    def crear_factura(self, unidad, monto, dias, estado="pendiente"):
+        self.numero += 1
+        return Factura.objects.create(
+            condominio=unidad.condominio, unidad=unidad, numero_factura=f"F-{self.numero}",
+            monto=Decimal(monto), fecha_vencimiento=self.hoy + timedelta(days=dias), estado=estado,
+        )
+
+    def crear_morosos(self):
+        a, b, c, d = (Unidad.objects.create(condominio=self.condominio, numero_unidad=n) for n in ("A", "B", "C", "D"))
+        factura = self.crear_factura(a, "100.00", -30)
+        Pago.objects.create(factura=factura, unidad=a, usuario=self.usuario, monto=Decimal("40.00"), estado="success")
+        self.crear_factura(b, "50.00", -20)
+        self.crear_factura(c, "30.00", -10)
+        self.crear_factura(c, "20.00", 5)  # aún no vence
+        self.crear_factura(d, "70.00", -40, estado="pagada")
+
+    def test_pagina_por_unidad(self):
+        self.crear_morosos()
+
+        res = self.client.get(self.url, {"page_size": 2})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["count"], 3)
+        self.assertIsNone(res.data["previous"])
+        self.assertIsNotNone(res.data["next"])
+        self.assertEqual([f["unidad"] for f in res.data["results"]], ["A", "B"])
+
+        res = self.client.get(self.url, {"page_size": 2, "page": 2})
+        self.assertEqual([f["unidad"] for f in res.data["results"]], ["C"])
+        self.assertIsNone(res.data["next"])
+        fila = res.data["results"][0]
+        self.assertEqual(fila["facturas_vencidas"], 1)
+        self.assertEqual([f["numero_factura"] for f in fila["facturas"]], ["F-3"])
+
+    def test_total_pendiente_es_la_deuda_restante(self):
+        self.crear_morosos()
+
+        fila = self.client.get(self.url).data["results"][0]
+
+        self.assertEqual(set(fila), {
+            "unidad", "unidad_id", "condominio", "facturas_vencidas", "total_monto",
+            "total_pendiente", "vencimiento_mas_antiguo", "facturas",
+        })
+        self.assertEqual(fila["condominio"], "Las Palmas")
+        self.assertEqual(fila["total_monto"], 100.0)
+        self.assertEqual(fila["total_pendiente"], 60.0)
+        self.assertEqual(fila["vencimiento_mas_antiguo"], str(self.hoy - timedelta(days=30)))
+
+    def test_filtra_por_condominio(self):
+        self.crear_morosos()
+        otro = Condominio.objects.create(nombre="El Bosque")
+        self.crear_factura(Unidad.objects.create(condominio=otro, numero_unidad="Z"), "10.00", -3)
 
-# Create your tests here.
+        self.assertEqual(self.client.get(self.url).data["count"], 4)
+        res = self.client.get(self.url, {"condominio_id": otro.pk})
+        self.assertEqual([f["unidad"] for f in res.data["results"]], ["Z"])
+        res = self.client.get(self.url, {"condominio_id": "00000000-0000-0000-0000-000000000000"})
+        self.assertEqual(res.status_code, 404)
@@ -3,17 +3,26 @@ from rest_framework import viewsets, filters, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.utils import timezone
 from django.db import transaction
 from django.db.models import Sum, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.pagination import PageNumberPagination
+
+from apps.facilidades.models import Condominio
 
 from .models import Factura, Cargo, Pago, EnlacePago
+from .services import morosos_por_unidad
 from .serializers import FacturaSerializer, CargoSerializer, PagoSerializer, EnlacePagoSerializer
 
 User = get_user_model()
 
+class MorososPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
 class FacturaViewSet(viewsets.ModelViewSet):
     queryset = Factura.objects.all().select_related("unidad", "condominio")
     serializer_class = FacturaSerializer
@@ -26,27 +35,35 @@ class FacturaViewSet(viewsets.ModelViewSet):
     def morosos(self, request):
         """
         CU8: Reporte de morosidad.
-        Devuelve residentes con facturas vencidas y no pagadas.
+        Devuelve, por unidad, las facturas vencidas y no pagadas, agrupadas en
+        la BD y paginadas (?page=, ?page_size=); ?condominio_id= limita a un condominio.
+        total_monto suma el monto facturado; total_pendiente suma lo que aún se
+        debe (monto menos pagos completados), no el monto bruto de las facturas.
         """
-        hoy = timezone.now().date()
-        facturas_vencidas = Factura.objects.filter(estado="pendiente", fecha_vencimiento__lt=hoy)
-        data = {}
-        for f in facturas_vencidas:
-            unidad = f.unidad.numero_unidad
-            if unidad not in data:
-                data[unidad] = {
-                    "unidad": unidad,
-                    "condominio": f.condominio.nombre,
-                    "facturas": [],
-                    "total_pendiente": 0,
-                }
-            data[unidad]["facturas"].append({
-                "numero_factura": f.numero_factura,
-                "monto": float(f.monto),
-                "fecha_vencimiento": str(f.fecha_vencimiento),
-            })
-            data[unidad]["total_pendiente"] += float(f.monto)
-        return Response(list(data.values()))
+        condominio = None
+        condominio_id = request.query_params.get("condominio_id")
+        if condominio_id:
+            try:
+                condominio = Condominio.objects.get(pk=condominio_id)
+            except (Condominio.DoesNotExist, DjangoValidationError):
+                return Response({"detail": "Condominio no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = MorososPagination()
+        page = paginator.paginate_queryset(morosos_por_unidad(condominio), request, view=self)
+        data = [
+            {
+                "unidad": fila["numero_unidad"],
+                "unidad_id": fila["unidad_id"],
+                "condominio": fila["condominio_nombre"],
+                "facturas_vencidas": fila["facturas_vencidas"],
+                "total_monto": float(fila["total_monto"]),
+                "total_pendiente": float(fila["total_pendiente"]),
+                "vencimiento_mas_antiguo": str(fila["vencimiento_mas_antiguo"]),
+                "facturas": fila["facturas"],
+            }
+            for fila in page
+        ]
+        return paginator.get_paginated_response(data)
     
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated], url_path="pagar")
     def pagar(self, request, pk=None):
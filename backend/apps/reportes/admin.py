@@ -1,7 +1,11 @@
 from django.contrib import admin
-from .models import ReporteMorosidad
+from .models import ReporteMorosidad, TrabajoReporte
 
 @admin.register(ReporteMorosidad)
 class ReporteMorosidadAdmin(admin.ModelAdmin):
     list_display = ("condominio", "generado_en")
 
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ("tipo", "formato", "condominio", "status", "requested_at", "finished_at", "expira_en")
+    list_filter = ("status", "tipo", "formato")
@@ -0,0 +1,156 @@
+# apps/reportes/agregados.py
+"""
+Agregados diarios por condominio (tabla agregados_diarios) para que los
+reportes de meses o años lean unos cientos de filas en lugar de recorrer
+reservas, registros_acceso, incidencias y pagos.
+
+Cada métrica define su consulta base, cómo llegar al condominio, el campo de
+fecha que decide el día y hasta dos dimensiones. `recalcular_agregados`
+reemplaza los días de un rango con un único GROUP BY por métrica; el comando
+`actualizar_agregados` lo llama solo para los días nuevos más una ventana de
+llegadas tardías.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, TextField, UUIDField, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.facilidades.models import Incidencia, Reserva, ResidentesUnidad
+from apps.finanzas.models import Pago
+from apps.seguridad.models import RegistroAcceso
+from .models import AgregadoDiario, AvanceAgregado
+from .services import filtrar_rango
+
+SIN_DIMENSION = Value("")
+
+
+def _condominio_acceso():
+    """
+    RegistroAcceso no tiene condominio: el del vehículo o, si no hay vehículo,
+    el de una unidad donde reside el usuario.
+    """
+    residencia = ResidentesUnidad.objects.filter(usuario=OuterRef("usuario")).order_by("pk").values("unidad__condominio")[:1]
+    return Coalesce(F("vehiculo__unidad__condominio_id"), Subquery(residencia), output_field=UUIDField())
+
+
+METRICAS = {
+    "reservas": {
+        "consulta": lambda: Reserva.objects.all(),
+        "condominio": lambda: F("instalacion__condominio"),
+        "fecha": "inicio",
+        "dimensiones": (F("instalacion__nombre"), F("estado")),
+    },
+    "accesos": {
+        "consulta": lambda: RegistroAcceso.objects.all(),
+        "condominio": _condominio_acceso,
+        "fecha": "ocurrido_en",
+        "dimensiones": (F("punto_acceso__nombre"), F("tipo_evento")),
+    },
+    "incidencias_abiertas": {
+        "consulta": lambda: Incidencia.objects.all(),
+        "condominio": lambda: F("condominio"),
+        "fecha": "reportado_en",
+        "dimensiones": (F("prioridad"), SIN_DIMENSION),
+    },
+    "incidencias_cerradas": {
+        "consulta": lambda: Incidencia.objects.filter(estado="cerrada"),
+        "condominio": lambda: F("condominio"),
+        "fecha": "cerrado_en",
+        "dimensiones": (F("prioridad"), SIN_DIMENSION),
+    },
+    "pagos": {
+        "consulta": lambda: Pago.objects.filter(estado="success"),
+        "condominio": lambda: F("unidad__condominio"),
+        "fecha": "pagado_en",
+        "dimensiones": (F("metodo"), SIN_DIMENSION),
+        "monto": "monto",
+    },
+}
+
+
+def filas_agregadas(metrica, inicio, fin):
+    """GROUP BY (condominio, día, dimensiones) de la métrica en [inicio, fin]."""
+    definicion = METRICAS[metrica]
+    dimension_1, dimension_2 = definicion["dimensiones"]
+    monto = definicion.get("monto")
+    return (
+        filtrar_rango(definicion["consulta"](), definicion["fecha"], inicio, fin)
+        .annotate(
+            agr_condominio=definicion["condominio"](),
+            agr_fecha=TruncDate(definicion["fecha"], tzinfo=timezone.get_current_timezone()),
+            agr_dim1=Coalesce(dimension_1, SIN_DIMENSION, output_field=TextField()),
+            agr_dim2=Coalesce(dimension_2, SIN_DIMENSION, output_field=TextField()),
+        )
+        .filter(agr_condominio__isnull=False)
+        .order_by()
+        .values("agr_condominio", "agr_fecha", "agr_dim1", "agr_dim2")
+        .annotate(cantidad=Count("pk"), **({"monto": Sum(monto)} if monto else {}))
+    )
+
+
+def recalcular_agregados(metrica, inicio, fin):
+    """
+    Reemplaza los agregados de la métrica en [inicio, fin] dentro de una
+    transacción (borrar + insertar), así un reproceso nunca duplica filas.
+    """
+    nuevos = [
+        AgregadoDiario(
+            condominio_id=fila["agr_condominio"],
+            fecha=fila["agr_fecha"],
+            metrica=metrica,
+            dimension_1=str(fila["agr_dim1"])[:150],
+            dimension_2=str(fila["agr_dim2"])[:150],
+            cantidad=fila["cantidad"],
+            monto=fila.get("monto") or 0,
+        )
+        for fila in filas_agregadas(metrica, inicio, fin)
+    ]
+    with transaction.atomic():
+        # El bloqueo del avance serializa dos ejecuciones simultáneas de la misma métrica
+        avance = AvanceAgregado.objects.select_for_update().filter(metrica=metrica).first()
+        AgregadoDiario.objects.filter(metrica=metrica, fecha__gte=inicio, fecha__lte=fin).delete()
+        AgregadoDiario.objects.bulk_create(nuevos, batch_size=1000)
+        # Reprocesar días viejos (--desde) no hace retroceder el avance
+        if avance is None:
+            AvanceAgregado.objects.create(metrica=metrica, procesado_hasta=fin)
+        elif fin > avance.procesado_hasta:
+            avance.procesado_hasta = fin
+            avance.save(update_fields=["procesado_hasta", "actualizado_en"])
+    return len(nuevos)
+
+
+def primer_dia(metrica):
+    """Día del evento más antiguo de la métrica (None si no hay datos)."""
+    definicion = METRICAS[metrica]
+    primero = definicion["consulta"]().order_by(definicion["fecha"]).values_list(definicion["fecha"], flat=True).first()
+    return timezone.localtime(primero).date() if primero else None
+
+
+def rango_pendiente(metrica, hasta, ventana):
+    """
+    Días a procesar: desde el último procesado menos la ventana de llegadas
+    tardías (o desde el primer evento, la primera vez) hasta `hasta`.
+    """
+    avance = AvanceAgregado.objects.filter(metrica=metrica).values_list("procesado_hasta", flat=True).first()
+    if avance is None:
+        inicio = primer_dia(metrica)
+    else:
+        inicio = avance + timedelta(days=1 - ventana)
+    if inicio is None or inicio > hasta:
+        return None
+    return inicio, hasta
+
+
+def consultar_agregados(condominio, metrica, desde=None, hasta=None, por_dia=False):
+    """Suma de los agregados del rango, por dimensiones (y por día si `por_dia`)."""
+    filas = AgregadoDiario.objects.filter(condominio=condominio, metrica=metrica)
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    campos = (["fecha"] if por_dia else []) + ["dimension_1", "dimension_2"]
+    return list(
+        filas.order_by().values(*campos).annotate(cantidad=Sum("cantidad"), monto=Sum("monto")).order_by(*campos)
+    )
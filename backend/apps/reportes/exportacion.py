@@ -0,0 +1,171 @@
+# apps/reportes/exportacion.py
+import csv
+import io
+import re
+import tempfile
+from datetime import datetime
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+class Echo:
+    """Pseudo-buffer para csv.writer: devuelve cada línea en vez de acumularla."""
+
+    def write(self, value):
+        return value
+
+
+def lineas_csv(filas):
+    """Generador de líneas CSV a partir de un iterable de filas (listas)."""
+    writer = csv.writer(Echo())
+    for fila in filas:
+        yield writer.writerow(fila)
+
+
+def respuesta_csv(filas, nombre_archivo):
+    """
+    StreamingHttpResponse que va escribiendo las filas a medida que se generan:
+    la memoria del worker no crece con el tamaño del reporte y el primer byte
+    sale en cuanto está la primera fila.
+    """
+    response = StreamingHttpResponse(lineas_csv(filas), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _celda_xlsx(valor):
+    # Excel no admite zonas horarias: las fechas con hora van en hora local sin tz
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.make_naive(valor)
+    return valor
+
+
+def _titulo_hoja(titulo):
+    """Excel limita el nombre de la hoja a 31 caracteres y prohíbe []:*?/\\."""
+    return re.sub(r"[\[\]:*?/\\]", " ", str(titulo))[:31] or "Hoja"
+
+
+def escribir_xlsx(hojas, archivo):
+    """
+    Escribe un libro con una hoja por (título, filas). El libro en modo
+    write-only manda cada fila a disco al agregarla, así la memoria no crece
+    con el número de filas.
+    """
+    libro = Workbook(write_only=True)
+    for titulo, filas in hojas:
+        hoja = libro.create_sheet(_titulo_hoja(titulo))
+        for fila in filas:
+            hoja.append([_celda_xlsx(v) for v in fila])
+    libro.save(archivo)
+
+
+def respuesta_xlsx(hojas, nombre_archivo):
+    """
+    El XLSX es un zip y no se puede enviar a medida que se genera: se escribe a
+    un archivo temporal y se sirve desde ahí en bloques (FileResponse).
+    """
+    tmp = tempfile.TemporaryFile()
+    escribir_xlsx(hojas, tmp)
+    tmp.seek(0)
+    return FileResponse(tmp, as_attachment=True, filename=nombre_archivo, content_type=XLSX_CONTENT_TYPE)
+
+
+def filas_reporte_morosidad(reporte):
+    """Filas (encabezado incluido) de un ReporteMorosidad guardado, para CSV y XLSX."""
+    yield ["Unidad", "Propietario", "Monto Pendiente", "Fecha Vencimiento"]
+    yield from filas_de_reporte(reporte)
+
+
+def filas_de_reporte(reporte):
+    """(unidad, propietario, monto, vencimiento) de las FilaMorosidad, leídas con un cursor."""
+    filas = reporte.filas.order_by("fecha_vencimiento", "pk").values_list(
+        "unidad", "propietario", "monto_pendiente", "fecha_vencimiento",
+    )
+    return filas.iterator(chunk_size=2000)
+
+
+def escribir_csv(filas, archivo):
+    """Escribe las filas en un archivo de texto abierto, sin acumularlas en memoria."""
+    writer = csv.writer(archivo)
+    for fila in filas:
+        writer.writerow(fila)
+
+
+def pdf_morosidad(reporte):
+    """PDF (bytes) de un ReporteMorosidad guardado."""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, height - 50, f"Reporte de Morosidad - {reporte.condominio.nombre}")
+    p.setFont("Helvetica", 10)
+    p.drawString(50, height - 70, f"Generado en: {reporte.generado_en.strftime('%Y-%m-%d %H:%M')}")
+
+    # Encabezados de tabla
+    y = height - 120
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(50, y, "Unidad")
+    p.drawString(150, y, "Propietario")
+    p.drawString(300, y, "Monto Pendiente")
+    p.drawString(430, y, "Fecha Vencimiento")
+
+    p.setFont("Helvetica", 10)
+    y -= 20
+
+    # Contenido
+    for unidad, propietario, monto, vencimiento in filas_de_reporte(reporte):
+        p.drawString(50, y, str(unidad))
+        p.drawString(150, y, str(propietario))
+        p.drawString(300, y, str(monto))
+        p.drawString(430, y, str(vencimiento))
+        y -= 20
+        if y < 100:
+            p.showPage()
+            y = height - 50
+
+    p.save()
+    return buffer.getvalue()
+
+
+def pdf_general(condominio, morosidad, generado_en):
+    """PDF (bytes) del reporte general de un condominio."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    elements.append(Paragraph(f"Reporte General - {condominio.nombre}", styles["Title"]))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(f"Generado en: {generado_en}", styles["Normal"]))
+    elements.append(Spacer(1, 24))
+
+    # Morosidad
+    elements.append(Paragraph("Morosidad", styles["Heading2"]))
+    if morosidad:
+        data = [["Unidad", "Propietario", "Monto Pendiente", "Fecha Vencimiento"]]
+        for m in morosidad:
+            data.append([m["unidad"], m["propietario"], m["monto_pendiente"], str(m["fecha_vencimiento"])])
+        table = Table(data, hAlign="LEFT")
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ]))
+        elements.append(table)
+    else:
+        elements.append(Paragraph("No hay morosos.", styles["Normal"]))
+
+    doc.build(elements)
+    return buffer.getvalue()
@@ -0,0 +1,62 @@
+# apps/reportes/management/commands/actualizar_agregados.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.reportes.agregados import METRICAS, rango_pendiente, recalcular_agregados
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza los agregados diarios por condominio (agregados_diarios). Procesa "
+        "solo los días posteriores al último procesado más una ventana de llegadas "
+        "tardías; la primera vez recorre todo el historial en lotes de días. Pensado "
+        "para cron, p. ej. cada noche después de las 00:00."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--metrica", action="append", choices=list(METRICAS),
+                            help="Métrica a actualizar (se puede repetir; por defecto todas).")
+        parser.add_argument("--ventana", type=int, default=3,
+                            help="Días ya procesados que se recalculan por datos que llegan tarde.")
+        parser.add_argument("--desde", help="Recalcula desde esta fecha (AAAA-MM-DD), ignorando el avance guardado.")
+        parser.add_argument("--hasta", help="Último día a procesar (AAAA-MM-DD, por defecto ayer).")
+        parser.add_argument("--incluir-hoy", action="store_true",
+                            help="Procesa también el día en curso (quedará incompleto hasta la próxima pasada).")
+        parser.add_argument("--dias-por-lote", type=int, default=31, help="Días por transacción.")
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        hasta = self._fecha(options["hasta"], "--hasta") or (hoy if options["incluir_hoy"] else hoy - timedelta(days=1))
+        desde = self._fecha(options["desde"], "--desde")
+        if options["ventana"] < 0 or options["dias_por_lote"] < 1:
+            raise CommandError("--ventana debe ser >= 0 y --dias-por-lote >= 1")
+
+        for metrica in options["metrica"] or list(METRICAS):
+            rango = (desde, hasta) if desde else rango_pendiente(metrica, hasta, options["ventana"])
+            if rango is None or rango[0] > rango[1]:
+                self.stdout.write(f"{metrica}: al día")
+                continue
+
+            inicio_metrica = time.monotonic()
+            filas = 0
+            inicio, fin = rango
+            while inicio <= fin:
+                fin_lote = min(inicio + timedelta(days=options["dias_por_lote"] - 1), fin)
+                filas += recalcular_agregados(metrica, inicio, fin_lote)
+                inicio = fin_lote + timedelta(days=1)
+            self.stdout.write(
+                f"{metrica}: {rango[0]} a {rango[1]}, {filas} filas en {time.monotonic() - inicio_metrica:.1f}s"
+            )
+        self.stdout.write(self.style.SUCCESS("Agregados actualizados."))
+
+    def _fecha(self, valor, opcion):
+        if not valor:
+            return None
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f"{opcion}: fecha inválida, use AAAA-MM-DD")
+        return fecha
@@ -0,0 +1,111 @@
+# apps/reportes/management/commands/benchmark_morosidad.py
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.facilidades.models import Condominio, Unidad
+from apps.finanzas.models import Factura, Pago
+from apps.finanzas.services import actualizar_saldos
+from apps.reportes.services import calcular_morosidad
+
+User = get_user_model()
+
+
+def _morosidad_por_factura(condominio):
+    """Implementación anterior (una consulta de pagos + cargas perezosas por factura), como referencia."""
+    datos = []
+    for factura in Factura.objects.filter(condominio=condominio, estado="pendiente"):
+        unidad = factura.unidad
+        pagado = sum(p.monto for p in Pago.objects.filter(factura=factura, estado="success"))
+        deuda = float(factura.monto) - float(pagado)
+        if deuda > 0:
+            datos.append({
+                "unidad": unidad.numero_unidad if unidad else None,
+                "propietario": unidad.propietario_user.username if unidad and unidad.propietario_user else None,
+                "monto_pendiente": deuda,
+                "fecha_vencimiento": factura.fecha_vencimiento.isoformat(),
+            })
+    return datos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide número de consultas y tiempo del cálculo de morosidad para distintas "
+        "cantidades de facturas. Los datos se siembran en una transacción que se "
+        "revierte al terminar. Falla si el número de consultas cambia con el tamaño."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--facturas", default="100,1000,5000", help="Tamaños separados por coma.")
+        parser.add_argument("--sin-legado", action="store_true", help="No medir la implementación por factura.")
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = sorted({int(n) for n in options["facturas"].split(",") if n.strip()})
+        except ValueError:
+            raise CommandError("--facturas debe ser una lista de enteros separados por coma.")
+
+        self.stdout.write(f"{'facturas':>9}{'morosos':>9}{'consultas':>11}{'ms':>10}{'legado consultas':>18}{'legado ms':>11}")
+        conteos = set()
+        for n in tamanos:
+            with transaction.atomic():
+                condominio = self._sembrar(n)
+                consultas, ms, morosos = self._medir(calcular_morosidad, condominio)
+                conteos.add(consultas)
+                fila = f"{n:>9}{len(morosos):>9}{consultas:>11}{ms:>10.1f}"
+                if not options["sin_legado"]:
+                    consultas_leg, ms_leg, morosos_leg = self._medir(_morosidad_por_factura, condominio)
+                    if len(morosos_leg) != len(morosos):
+                        raise CommandError("Los resultados no coinciden con la implementación anterior.")
+                    fila += f"{consultas_leg:>18}{ms_leg:>11.1f}"
+                self.stdout.write(fila)
+                transaction.set_rollback(True)
+
+        if len(conteos) > 1:
+            raise CommandError(f"El número de consultas varía con el tamaño: {sorted(conteos)}")
+        self.stdout.write(self.style.SUCCESS(f"Consultas constantes: {conteos.pop()} por reporte"))
+
+    def _medir(self, funcion, condominio):
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            resultado = funcion(condominio)
+            ms = (time.perf_counter() - inicio) * 1000
+        return len(ctx.captured_queries), ms, resultado
+
+    def _sembrar(self, n):
+        """Una unidad con propietario por factura; 1/3 sin pagos, 1/3 con pago parcial, 1/3 pagadas."""
+        sufijo = timezone.now().strftime("%H%M%S%f")
+        condominio = Condominio.objects.create(nombre=f"Benchmark morosidad {n}")
+        usuarios = User.objects.bulk_create([
+            User(username=f"bench_moroso_{sufijo}_{i}", password="!") for i in range(n)
+        ])
+        unidades = Unidad.objects.bulk_create([
+            Unidad(condominio=condominio, numero_unidad=f"U-{i}", propietario_user=u)
+            for i, u in enumerate(usuarios)
+        ])
+        vencimiento = timezone.now().date() - timedelta(days=10)
+        facturas = Factura.objects.bulk_create([
+            Factura(condominio=condominio, unidad=unidad, numero_factura=f"B{sufijo}-{i}",
+                    monto=Decimal("100.00"), fecha_vencimiento=vencimiento)
+            for i, unidad in enumerate(unidades)
+        ])
+        pagos = []
+        for i, (factura, usuario) in enumerate(zip(facturas, usuarios)):
+            if i % 3 == 1:
+                pagos.append(Pago(factura=factura, unidad=factura.unidad, usuario=usuario,
+                                  monto=Decimal("40.00"), estado="success"))
+                pagos.append(Pago(factura=factura, unidad=factura.unidad, usuario=usuario,
+                                  monto=Decimal("60.00"), estado="failed"))
+            elif i % 3 == 2:
+                pagos.append(Pago(factura=factura, unidad=factura.unidad, usuario=usuario,
+                                  monto=Decimal("100.00"), estado="success"))
+        Pago.objects.bulk_create(pagos)
+        # bulk_create no dispara las señales del saldo por unidad: se calcula como en conciliar_saldos
+        actualizar_saldos([unidad.pk for unidad in unidades])
+        return condominio
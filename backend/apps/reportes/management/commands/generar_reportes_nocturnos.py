@@ -0,0 +1,122 @@
+# apps/reportes/management/commands/generar_reportes_nocturnos.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+def _init_worker():
+    # Cada proceso abre su propia conexión a la BD al primer uso y la reutiliza
+    django.setup()
+
+
+def _generar(condominio_id, formato, forzar):
+    """Se ejecuta en el pool: devuelve (condominio_id, nombre, resultado, segundos, detalle)."""
+    # Importes aquí: el módulo se carga en el hijo antes de que _init_worker llame a django.setup()
+    from apps.facilidades.models import Condominio
+    from apps.reportes.models import ReporteMorosidad, TrabajoReporte
+    from apps.reportes.services import generar_archivo, generar_reporte_morosidad, huella_financiera, huella_general
+
+    inicio = time.monotonic()
+    nombre = str(condominio_id)
+    try:
+        condominio = Condominio.objects.get(pk=condominio_id)
+        nombre = condominio.nombre
+
+        # Cada producto lleva su propia huella y la guarda recién cuando quedó completo:
+        # el reporte de morosidad en la misma transacción que sus filas y el archivo
+        # general al marcar el trabajo como terminado. Si el archivo falla, la noche
+        # siguiente lo vuelve a intentar.
+        huella = huella_financiera(condominio)
+        ultima = (
+            ReporteMorosidad.objects.filter(condominio=condominio).order_by("-generado_en")
+            .values_list("huella_datos", flat=True).first()
+        )
+        reporte = None
+        if forzar or ultima != huella:
+            reporte = generar_reporte_morosidad(condominio, huella=huella)
+
+        huella_archivo = huella_general(condominio)
+        ultimo_archivo = (
+            TrabajoReporte.objects.filter(
+                condominio=condominio, tipo="general", formato=formato, status="done",
+                desde__isnull=True, hasta__isnull=True,
+            )
+            .order_by("-finished_at").values_list("huella_datos", flat=True).first()
+        )
+        trabajo = None
+        if forzar or ultimo_archivo != huella_archivo:
+            trabajo = TrabajoReporte(
+                tipo="general", formato=formato, condominio=condominio,
+                status="processing", started_at=timezone.now(), attempts=1,
+            )
+            generar_archivo(trabajo)
+            trabajo.status = "done"
+            trabajo.finished_at = timezone.now()
+            trabajo.huella_datos = huella_archivo
+            trabajo.save()
+
+        segundos = time.monotonic() - inicio
+        if reporte is None and trabajo is None:
+            return condominio_id, nombre, "sin_cambios", segundos, ""
+        detalle = []
+        if reporte is not None:
+            ReporteMorosidad.objects.filter(pk=reporte.pk).update(duracion_ms=int(segundos * 1000))
+            detalle.append(f"{reporte.datos['total_morosos']} morosos")
+        if trabajo is not None:
+            detalle.append(f"trabajo {trabajo.pk}")
+        return condominio_id, nombre, "generado", segundos, ", ".join(detalle)
+    except Exception as e:
+        return condominio_id, nombre, "error", time.monotonic() - inicio, str(e)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera en paralelo, para cada condominio, el reporte de morosidad y el archivo "
+        "del reporte general (como TrabajoReporte terminado). Omite el reporte de morosidad "
+        "si facturas, cargos y pagos no cambiaron desde el último, y el archivo general si "
+        "tampoco cambiaron sus secciones desde el último archivo terminado. Pensado para cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--formato", choices=["xlsx", "pdf", "csv"], default="xlsx",
+                            help="Formato del archivo del reporte general.")
+        parser.add_argument("--condominio", action="append", help="ID de condominio (se puede repetir; por defecto todos).")
+        parser.add_argument("--forzar", action="store_true", help="Genera aunque los datos no hayan cambiado.")
+
+    def handle(self, *args, **options):
+        from apps.facilidades.models import Condominio
+
+        ids = Condominio.objects.order_by("nombre").values_list("pk", flat=True)
+        if options["condominio"]:
+            ids = ids.filter(pk__in=options["condominio"])
+        ids = list(ids)
+        if not ids:
+            self.stdout.write("No hay condominios para procesar.")
+            return
+        self.stdout.write(f"Generando reportes de {len(ids)} condominios con {options['workers']} procesos...")
+
+        inicio = time.monotonic()
+        totales = {"generado": 0, "sin_cambios": 0, "error": 0}
+        # "spawn": los procesos hijos no heredan la conexión a la BD del proceso principal.
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=options["workers"], mp_context=contexto, initializer=_init_worker) as pool:
+            futuros = [pool.submit(_generar, pk, options["formato"], options["forzar"]) for pk in ids]
+            for futuro in as_completed(futuros):
+                condominio_id, nombre, resultado, segundos, detalle = futuro.result()
+                totales[resultado] += 1
+                linea = f"  {nombre} ({condominio_id}): {resultado} en {segundos:.2f}s"
+                if detalle:
+                    linea += f" - {detalle}"
+                if resultado == "error":
+                    self.stderr.write(linea)
+                else:
+                    self.stdout.write(linea)
+
+        resumen = ", ".join(f"{k}={v}" for k, v in totales.items())
+        self.stdout.write(self.style.SUCCESS(f"Reportes terminados en {time.monotonic() - inicio:.1f}s: {resumen}"))
@@ -0,0 +1,85 @@
+# apps/reportes/management/commands/procesar_reportes.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.reportes.models import TrabajoReporte
+from apps.reportes.services import generar_archivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker que genera los reportes encolados (TrabajoReporte) y borra los "
+        "archivos que superaron REPORTES_RETENCION_HORAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5, help="Trabajos reclamados por lote.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--max-attempts", type=int, default=3, help="Reintentos antes de marcar el trabajo como fallido.")
+        parser.add_argument("--stale-after", type=int, default=1800,
+                            help="Segundos tras los que un trabajo 'processing' se considera abandonado y se reencola.")
+        parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina.")
+
+    def handle(self, *args, **options):
+        while True:
+            self._reencolar_abandonados(options["stale_after"])
+            self._purgar_expirados()
+            trabajos = self._reclamar_lote(options["batch_size"])
+            for trabajo in trabajos:
+                self._procesar(trabajo, options["max_attempts"])
+
+            if options["once"] and not trabajos:
+                break
+            if not trabajos:
+                time.sleep(options["sleep"])
+
+    def _reencolar_abandonados(self, stale_after):
+        limite = timezone.now() - timedelta(seconds=stale_after)
+        TrabajoReporte.objects.filter(status="processing", started_at__lt=limite).update(status="pending")
+
+    def _purgar_expirados(self):
+        for trabajo in TrabajoReporte.objects.filter(status="done", expira_en__lt=timezone.now()):
+            if trabajo.archivo:
+                trabajo.archivo.delete(save=False)
+            TrabajoReporte.objects.filter(pk=trabajo.pk).update(status="expired", archivo=None)
+
+    def _reclamar_lote(self, batch_size):
+        """
+        Toma hasta batch_size trabajos pendientes con SKIP LOCKED, de modo que
+        varios workers pueden correr a la vez sin generar el mismo reporte.
+        """
+        with transaction.atomic():
+            trabajos = list(
+                TrabajoReporte.objects.select_for_update(skip_locked=True)
+                .filter(status="pending")
+                .order_by("requested_at")[:batch_size]
+            )
+            if trabajos:
+                TrabajoReporte.objects.filter(pk__in=[t.pk for t in trabajos]).update(
+                    status="processing", started_at=timezone.now(), attempts=F("attempts") + 1
+                )
+        return trabajos
+
+    def _procesar(self, trabajo, max_attempts):
+        inicio = time.monotonic()
+        try:
+            generar_archivo(trabajo)
+        except Exception as e:
+            intentos = trabajo.attempts + 1
+            estado = "failed" if intentos >= max_attempts else "pending"
+            TrabajoReporte.objects.filter(pk=trabajo.pk).update(status=estado, error=str(e), finished_at=timezone.now())
+            self.stderr.write(f"Trabajo {trabajo.pk}: error generando el reporte ({intentos}/{max_attempts}): {e}")
+            return
+
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(
+            status="done", error=None, finished_at=timezone.now(),
+            archivo=trabajo.archivo.name, expira_en=trabajo.expira_en,
+        )
+        self.stdout.write(
+            f"Trabajo {trabajo.pk}: {trabajo.tipo}/{trabajo.formato} generado en {time.monotonic() - inicio:.1f}s"
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:55
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilidades', '0001_initial'),
+        ('reportes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('tipo', models.CharField(choices=[('morosidad', 'Reporte de morosidad guardado'), ('general', 'Reporte general del condominio')], max_length=20)),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('pdf', 'PDF')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'Procesando'), ('done', 'Terminado'), ('failed', 'Fallido'), ('expired', 'Expirado')], default='pending', max_length=20)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('archivo', models.FileField(blank=True, null=True, upload_to='reportes/%Y/%m/')),
+                ('expira_en', models.DateTimeField(blank=True, null=True)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_reporte', to='facilidades.condominio')),
+                ('reporte', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trabajos', to='reportes.reportemorosidad')),
+                ('solicitado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trabajos_reporte',
+                'indexes': [models.Index(fields=['status', 'requested_at'], name='trabajos_re_status_458368_idx'), models.Index(fields=['status', 'expira_en'], name='trabajos_re_status_f489f2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilidades', '0001_initial'),
+        ('reportes', '0002_trabajo_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvanceAgregado',
+            fields=[
+                ('metrica', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('procesado_hasta', models.DateField()),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'avance_agregados',
+            },
+        ),
+        migrations.CreateModel(
+            name='AgregadoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('metrica', models.CharField(max_length=30)),
+                ('dimension_1', models.CharField(blank=True, default='', max_length=150)),
+                ('dimension_2', models.CharField(blank=True, default='', max_length=150)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agregados_diarios', to='facilidades.condominio')),
+            ],
+            options={
+                'db_table': 'agregados_diarios',
+                'constraints': [models.UniqueConstraint(fields=('condominio', 'metrica', 'fecha', 'dimension_1', 'dimension_2'), name='agregado_diario_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_formato_xlsx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportemorosidad',
+            name='duracion_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportemorosidad',
+            name='huella_datos',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
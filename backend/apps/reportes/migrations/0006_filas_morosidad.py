@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0005_huella_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilaMorosidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unidad', models.TextField(blank=True, null=True)),
+                ('propietario', models.CharField(blank=True, max_length=150, null=True)),
+                ('monto_pendiente', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('fecha_vencimiento', models.DateField(blank=True, null=True)),
+                ('reporte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filas', to='reportes.reportemorosidad')),
+            ],
+            options={
+                'db_table': 'filas_morosidad',
+                'indexes': [models.Index(fields=['reporte', 'monto_pendiente'], name='fila_morosidad_monto_idx'), models.Index(fields=['reporte', 'fecha_vencimiento'], name='fila_morosidad_venc_idx')],
+            },
+        ),
+        # Pasa los morosos guardados en el JSON de cada reporte a filas y deja en
+        # `datos` solo el resumen.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO filas_morosidad (reporte_id, unidad, propietario, monto_pendiente, fecha_vencimiento)
+                SELECT r.id, m->>'unidad', m->>'propietario',
+                       COALESCE((m->>'monto_pendiente')::numeric(12, 2), 0),
+                       NULLIF(NULLIF(m->>'fecha_vencimiento', ''), 'None')::date
+                FROM reportes_morosidad r
+                CROSS JOIN LATERAL jsonb_array_elements(r.datos->'morosos') AS m
+                WHERE jsonb_typeof(r.datos->'morosos') = 'array';
+
+                UPDATE reportes_morosidad r
+                SET datos = jsonb_build_object(
+                    'total_morosos', jsonb_array_length(r.datos->'morosos'),
+                    'deuda_total', (
+                        SELECT COALESCE(SUM((m->>'monto_pendiente')::numeric(12, 2)), 0)::float
+                        FROM jsonb_array_elements(r.datos->'morosos') AS m
+                    )
+                )
+                WHERE jsonb_typeof(r.datos->'morosos') = 'array';
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0006_filas_morosidad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='desde',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='hasta',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
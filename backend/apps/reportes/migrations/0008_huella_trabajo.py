@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0007_rango_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='huella_datos',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from apps.core.models import BaseModel
 from apps.facilidades.models import Condominio, Unidad
 from apps.finanzas.models import Factura, Pago
@@ -7,6 +9,9 @@ class ReporteMorosidad(BaseModel):
     condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name="reportes_morosidad")
     generado_en = models.DateTimeField(auto_now_add=True)
     datos = models.JSONField(default=dict, blank=True, help_text="Lista de residentes con pagos pendientes")
+    # Huella de facturas/cargos/pagos del condominio al generarlo: si no cambió, no hace falta otro reporte
+    huella_datos = models.CharField(max_length=64, blank=True, default="")
+    duracion_ms = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         db_table = "reportes_morosidad"
@@ -15,3 +20,114 @@ class ReporteMorosidad(BaseModel):
 
     def __str__(self):
         return f"Morosidad {self.condominio.nombre} - {self.generado_en.date()}"
+
+
+class TrabajoReporte(BaseModel):
+    """
+    Generación diferida de un reporte (CSV, XLSX o PDF). La API lo encola, el worker
+    `procesar_reportes` lo genera y guarda el archivo en el storage, y el
+    archivo se borra al pasar `expira_en`.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('processing', 'Procesando'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+        ('expired', 'Expirado'),
+    ]
+    TIPO_CHOICES = [
+        ('morosidad', 'Reporte de morosidad guardado'),
+        ('general', 'Reporte general del condominio'),
+    ]
+    FORMATO_CHOICES = [('csv', 'CSV'), ('xlsx', 'Excel (XLSX)'), ('pdf', 'PDF')]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES)
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name="trabajos_reporte")
+    reporte = models.ForeignKey(ReporteMorosidad, on_delete=models.CASCADE, null=True, blank=True, related_name="trabajos")
+    solicitado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="trabajos_reporte")
+    # Rango de fechas de las secciones del reporte general (opcional, como ?desde=&hasta=)
+    desde = models.DateField(null=True, blank=True)
+    hasta = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    archivo = models.FileField(upload_to="reportes/%Y/%m/", null=True, blank=True)
+    expira_en = models.DateTimeField(null=True, blank=True)
+    # Huella de los datos con que se generó el archivo (solo la guardan los reportes nocturnos)
+    huella_datos = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        db_table = "trabajos_reporte"
+        indexes = [
+            models.Index(fields=['status', 'requested_at']),
+            models.Index(fields=['status', 'expira_en']),
+        ]
+
+    def __str__(self):
+        return f"TrabajoReporte {self.tipo}/{self.formato} ({self.status})"
+
+
+class AgregadoDiario(models.Model):
+    """
+    Agregado por condominio, día y métrica (ver apps/reportes/agregados.py).
+    `dimension_1`/`dimension_2` dependen de la métrica (instalación y estado,
+    punto de acceso y tipo de evento, prioridad, método de pago); "" si no aplica.
+    Lo llena el comando `actualizar_agregados`.
+    """
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name="agregados_diarios")
+    fecha = models.DateField()
+    metrica = models.CharField(max_length=30)
+    dimension_1 = models.CharField(max_length=150, blank=True, default="")
+    dimension_2 = models.CharField(max_length=150, blank=True, default="")
+    cantidad = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "agregados_diarios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["condominio", "metrica", "fecha", "dimension_1", "dimension_2"], name="agregado_diario_unico",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.metrica} {self.condominio_id} {self.fecha}: {self.cantidad}"
+
+
+class AvanceAgregado(models.Model):
+    """Último día completo procesado de cada métrica (para el cálculo incremental)."""
+    metrica = models.CharField(max_length=30, primary_key=True)
+    procesado_hasta = models.DateField()
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "avance_agregados"
+
+    def __str__(self):
+        return f"{self.metrica} hasta {self.procesado_hasta}"
+
+
+class FilaMorosidad(models.Model):
+    """
+    Un moroso de un ReporteMorosidad. Las filas van en su propia tabla (no en
+    el JSON del reporte) para poder paginarlas, ordenarlas y filtrarlas en la BD.
+    """
+    reporte = models.ForeignKey(ReporteMorosidad, on_delete=models.CASCADE, related_name="filas")
+    unidad = models.TextField(null=True, blank=True)
+    propietario = models.CharField(max_length=150, null=True, blank=True)
+    monto_pendiente = models.DecimalField(max_digits=12, decimal_places=2)
+    fecha_vencimiento = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = "filas_morosidad"
+        indexes = [
+            models.Index(fields=["reporte", "monto_pendiente"], name="fila_morosidad_monto_idx"),
+            models.Index(fields=["reporte", "fecha_vencimiento"], name="fila_morosidad_venc_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.unidad} - {self.monto_pendiente}"
@@ -1,7 +1,38 @@
 from rest_framework import serializers
-from .models import ReporteMorosidad
+from apps.facilidades.models import Condominio
+from .models import FilaMorosidad, ReporteMorosidad, TrabajoReporte
 
 class ReporteMorosidadSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReporteMorosidad
         fields = "__all__"
+        read_only_fields = ("huella_datos", "duracion_ms")
+
+class FilaMorosidadSerializer(serializers.ModelSerializer):
+    monto_pendiente = serializers.FloatField()
+
+    class Meta:
+        model = FilaMorosidad
+        fields = ("unidad", "propietario", "monto_pendiente", "fecha_vencimiento")
+
+class TrabajoReporteSerializer(serializers.ModelSerializer):
+    condominio = serializers.PrimaryKeyRelatedField(queryset=Condominio.objects.all(), required=False)
+
+    class Meta:
+        model = TrabajoReporte
+        fields = (
+            "id", "tipo", "formato", "condominio", "reporte", "desde", "hasta", "status", "requested_at",
+            "started_at", "finished_at", "attempts", "error", "expira_en",
+        )
+        read_only_fields = ("status", "requested_at", "started_at", "finished_at", "attempts", "error", "expira_en")
+
+    def validate(self, attrs):
+        if attrs["tipo"] == "morosidad":
+            if not attrs.get("reporte"):
+                raise serializers.ValidationError({"reporte": "Debe indicar el reporte de morosidad a exportar."})
+            attrs["condominio"] = attrs["reporte"].condominio
+        elif not attrs.get("condominio"):
+            raise serializers.ValidationError({"condominio": "Debe indicar el condominio."})
+        if attrs.get("desde") and attrs.get("hasta") and attrs["desde"] > attrs["hasta"]:
+            raise serializers.ValidationError({"desde": "'desde' no puede ser posterior a 'hasta'"})
+        return attrs
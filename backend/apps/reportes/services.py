@@ -0,0 +1,334 @@
+# apps/reportes/services.py
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from apps.facilidades.models import Incidencia, Reserva, ResidentesUnidad
+from apps.finanzas.models import Cargo, Factura, Pago
+from apps.finanzas.services import facturas_impagas, saldos_con_deuda
+from apps.seguridad.models import AlertaPanico, RegistroAcceso
+from .exportacion import escribir_csv, escribir_xlsx, filas_reporte_morosidad, pdf_general, pdf_morosidad
+from .models import FilaMorosidad, ReporteMorosidad, TrabajoReporte
+
+# Filas por lectura del cursor al recorrer consultas grandes con iterator()
+CHUNK_SIZE = 2000
+
+
+def facturas_morosas(condominio):
+    """
+    Facturas pendientes del condominio con deuda > 0, anotadas con `pagado`
+    (suma de pagos exitosos) y `deuda` (monto + cargos - pagado). Es una sola
+    consulta: cargos y pagos se suman en subconsultas correlacionadas, y solo
+    se miran las facturas de las unidades que el saldo marca con deuda (ver
+    saldos_con_deuda: las escrituras en bloque no lo actualizan).
+    """
+    unidades = saldos_con_deuda(condominio).values("unidad")
+    return facturas_impagas(Factura.objects.filter(condominio=condominio, unidad__in=unidades))
+
+
+def filas_morosidad(condominio):
+    """(unidad, propietario, deuda, fecha_vencimiento) de cada factura morosa."""
+    return facturas_morosas(condominio).values_list(
+        "unidad__numero_unidad", "unidad__propietario_user__username", "deuda", "fecha_vencimiento",
+    )
+
+
+def calcular_morosidad(condominio):
+    """
+    Lista de morosos del condominio (para el PDF del reporte general). Unidad y propietario vienen en el mismo
+    SELECT (JOIN), así que el número de consultas no depende de las facturas.
+    """
+    filas = filas_morosidad(condominio)
+    return [
+        {
+            "unidad": unidad,
+            "propietario": propietario,
+            "monto_pendiente": float(deuda),
+            "fecha_vencimiento": fecha.isoformat() if fecha else None,
+        }
+        for unidad, propietario, deuda, fecha in filas
+    ]
+
+
+def huella_financiera(condominio):
+    """
+    Huella de los datos financieros del condominio: cantidad, suma y última
+    modificación de facturas, cargos y pagos. Un alta, cambio o baja la altera,
+    así que si coincide con la del último reporte no hay nada nuevo que reportar.
+    """
+    partes = []
+    for filas in (
+        Factura.objects.filter(condominio=condominio),
+        Cargo.objects.filter(factura__condominio=condominio),
+        Pago.objects.filter(unidad__condominio=condominio),
+    ):
+        totales = filas.aggregate(n=Count("pk"), suma=Sum("monto"), ultima=Max("updated_at"))
+        partes.append(f"{totales['n']}:{totales['suma'] or 0}:{totales['ultima'].isoformat() if totales['ultima'] else ''}")
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+def generar_reporte_morosidad(condominio, huella=None):
+    """
+    Calcula la morosidad del condominio y la guarda como ReporteMorosidad: cada
+    moroso va a FilaMorosidad (insertadas en lotes mientras se lee el cursor) y
+    `datos` solo lleva el resumen.
+    """
+    huella = huella if huella is not None else huella_financiera(condominio)
+    with transaction.atomic():
+        reporte = ReporteMorosidad.objects.create(condominio=condominio, generado_en=timezone.now(), huella_datos=huella)
+        total, deuda_total, lote = 0, Decimal("0"), []
+        for unidad, propietario, deuda, fecha in filas_morosidad(condominio).iterator(chunk_size=CHUNK_SIZE):
+            lote.append(FilaMorosidad(
+                reporte=reporte, unidad=unidad, propietario=propietario,
+                monto_pendiente=deuda, fecha_vencimiento=fecha,
+            ))
+            total += 1
+            deuda_total += deuda
+            if len(lote) >= CHUNK_SIZE:
+                FilaMorosidad.objects.bulk_create(lote)
+                lote = []
+        FilaMorosidad.objects.bulk_create(lote)
+        reporte.datos = {"total_morosos": total, "deuda_total": float(deuda_total)}
+        reporte.save(update_fields=["datos"])
+    return reporte
+
+
+def reservas_condominio(condominio):
+    return Reserva.objects.filter(instalacion__condominio=condominio)
+
+
+def accesos_condominio(condominio):
+    """
+    RegistroAcceso no tiene condominio: se toman los accesos de vehículos de
+    unidades del condominio o de usuarios que residen en él.
+    """
+    residentes = ResidentesUnidad.objects.filter(unidad__condominio=condominio).values("usuario")
+    return RegistroAcceso.objects.filter(
+        Q(vehiculo__unidad__condominio=condominio) | Q(usuario__in=residentes)
+    )
+
+
+def incidencias_condominio(condominio):
+    return Incidencia.objects.filter(condominio=condominio)
+
+
+def alertas_condominio(condominio):
+    return AlertaPanico.objects.filter(unidad__condominio=condominio)
+
+
+# Secciones del reporte general: consulta base, campo de fecha por el que se
+# filtra el rango, agrupación del resumen y columnas (campo, encabezado) del detalle/CSV.
+SECCIONES = {
+    "reservas": {
+        "titulo": "Reservas",
+        "consulta": reservas_condominio,
+        "fecha": "inicio",
+        "agrupar": ("instalacion__nombre", "estado"),
+        "columnas": (("instalacion__nombre", "Instalación"), ("estado", "Estado"), ("inicio", "Inicio"), ("fin", "Fin")),
+    },
+    "accesos": {
+        "titulo": "Accesos",
+        "consulta": accesos_condominio,
+        "fecha": "ocurrido_en",
+        "agrupar": ("tipo_evento",),
+        "columnas": (("punto_acceso__nombre", "Punto de acceso"), ("tipo_evento", "Tipo"), ("ocurrido_en", "Ocurrido en")),
+    },
+    "incidencias": {
+        "titulo": "Incidencias",
+        "consulta": incidencias_condominio,
+        "fecha": "reportado_en",
+        "agrupar": ("estado", "prioridad"),
+        "columnas": (("titulo", "Título"), ("estado", "Estado"), ("prioridad", "Prioridad"), ("reportado_en", "Reportado en")),
+    },
+    "alertas": {
+        "titulo": "Alertas de pánico",
+        "consulta": alertas_condominio,
+        "fecha": "creado_en",
+        "agrupar": ("estado",),
+        "columnas": (("unidad__numero_unidad", "Unidad"), ("estado", "Estado"), ("creado_en", "Creada en")),
+    },
+}
+
+
+def huella_general(condominio):
+    """
+    Huella de los datos del reporte general: la financiera (por la hoja de
+    morosidad) más cantidad y última modificación de cada sección. Se guarda en
+    el TrabajoReporte recién cuando su archivo quedó escrito.
+    """
+    partes = [huella_financiera(condominio)]
+    for nombre, seccion in SECCIONES.items():
+        totales = seccion["consulta"](condominio).aggregate(n=Count("pk"), ultima=Max("updated_at"))
+        partes.append(f"{nombre}:{totales['n']}:{totales['ultima'].isoformat() if totales['ultima'] else ''}")
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+def filtrar_rango(queryset, campo, desde=None, hasta=None):
+    """
+    Filtra por fecha [desde, hasta] (ambas inclusive) comparando el campo
+    datetime contra límites del día, para que pueda usar un índice sobre él.
+    """
+    if desde:
+        queryset = queryset.filter(**{f"{campo}__gte": timezone.make_aware(datetime.combine(desde, time.min))})
+    if hasta:
+        queryset = queryset.filter(**{f"{campo}__lt": timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))})
+    return queryset
+
+
+def consulta_seccion(nombre, condominio, desde=None, hasta=None):
+    seccion = SECCIONES[nombre]
+    return filtrar_rango(seccion["consulta"](condominio), seccion["fecha"], desde, hasta)
+
+
+def resumen_seccion(nombre, condominio, desde=None, hasta=None):
+    """Conteos agrupados de la sección, calculados en la BD (un GROUP BY)."""
+    agrupar = SECCIONES[nombre]["agrupar"]
+    return list(
+        consulta_seccion(nombre, condominio, desde, hasta)
+        .order_by().values(*agrupar).annotate(total=Count("pk")).order_by(*agrupar)
+    )
+
+
+def detalle_seccion(nombre, condominio, desde=None, hasta=None):
+    """Filas de la sección, de la más reciente a la más antigua (para paginar)."""
+    seccion = SECCIONES[nombre]
+    campos = [campo for campo, _ in seccion["columnas"]]
+    return (
+        consulta_seccion(nombre, condominio, desde, hasta)
+        .order_by(f"-{seccion['fecha']}", "pk").values("id", *campos)
+    )
+
+
+def resumen_morosidad(condominio):
+    """
+    Totales de morosidad del condominio; el detalle va en el reporte de morosidad.
+    Unidades y deuda salen del saldo por unidad, sin recorrer las facturas.
+    """
+    totales = saldos_con_deuda(condominio).aggregate(unidades=Count("pk"), deuda_total=Sum("deuda"))
+    return {
+        "facturas": facturas_morosas(condominio).count(),
+        "unidades": totales["unidades"],
+        "deuda_total": float(totales["deuda_total"] or 0),
+    }
+
+
+def resumen_general(condominio, desde=None, hasta=None):
+    """Reporte general con tamaño constante: totales y conteos agrupados por sección."""
+    return {
+        "morosidad": resumen_morosidad(condominio),
+        **{nombre: resumen_seccion(nombre, condominio, desde, hasta) for nombre in SECCIONES},
+    }
+
+
+def filas_morosidad_general(condominio):
+    """Encabezado y filas de morosidad del condominio, leídas con un cursor del servidor."""
+    yield ["Unidad", "Propietario", "Monto Pendiente", "Fecha Vencimiento"]
+    for unidad, propietario, deuda, fecha in filas_morosidad(condominio).iterator(chunk_size=CHUNK_SIZE):
+        yield [unidad, propietario, float(deuda), fecha]
+
+
+def filas_seccion(nombre, condominio, desde=None, hasta=None):
+    """Encabezado y filas de una sección; la consulta se recorre con iterator()."""
+    columnas = SECCIONES[nombre]["columnas"]
+    yield [encabezado for _, encabezado in columnas]
+    filas = consulta_seccion(nombre, condominio, desde, hasta).values_list(*(c for c, _ in columnas))
+    yield from filas.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _filas_encabezado(condominio, generado_en, desde, hasta):
+    yield ["Sección", "Detalle"]
+    yield ["Condominio", condominio.nombre]
+    yield ["Generado en", generado_en]
+    if desde or hasta:
+        yield ["Desde", desde or ""]
+        yield ["Hasta", hasta or ""]
+
+
+def filas_reporte_general_csv(condominio, generado_en, desde=None, hasta=None):
+    """
+    Filas del CSV del reporte general. Cada sección recorre su consulta con un
+    cursor del servidor (iterator), así nunca se tiene la sección completa en memoria.
+    """
+    yield from _filas_encabezado(condominio, generado_en, desde, hasta)
+    yield []
+    yield ["Morosidad"]
+    yield from filas_morosidad_general(condominio)
+    for nombre, seccion in SECCIONES.items():
+        yield []
+        yield [seccion["titulo"]]
+        yield from filas_seccion(nombre, condominio, desde, hasta)
+
+
+def hojas_reporte_general(condominio, generado_en, desde=None, hasta=None):
+    """(título, filas) de cada hoja del XLSX del reporte general; las filas son generadores."""
+    yield "Reporte", _filas_encabezado(condominio, generado_en, desde, hasta)
+    yield "Morosidad", filas_morosidad_general(condominio)
+    for nombre, seccion in SECCIONES.items():
+        yield seccion["titulo"], filas_seccion(nombre, condominio, desde, hasta)
+
+
+def encolar_reporte(tipo, formato, condominio, reporte=None, usuario=None, desde=None, hasta=None):
+    """Crea un TrabajoReporte pendiente; el worker `procesar_reportes` lo genera."""
+    return TrabajoReporte.objects.create(
+        tipo=tipo, formato=formato, condominio=condominio, reporte=reporte, solicitado_por=usuario,
+        desde=desde, hasta=hasta,
+    )
+
+
+def nombre_descarga(trabajo):
+    return os.path.basename(trabajo.archivo.name) if trabajo.archivo else None
+
+
+def generar_archivo(trabajo):
+    """
+    Genera el CSV/XLSX/PDF del trabajo y lo sube al storage en trabajo.archivo (no
+    guarda el modelo). El CSV se escribe primero a un archivo temporal, así la
+    memoria no depende del tamaño del reporte.
+    """
+    generado_en = timezone.now()
+    if trabajo.tipo == "morosidad":
+        base = f"reporte_morosidad_{trabajo.reporte_id}"
+    else:
+        base = f"reporte_general_{trabajo.condominio_id}"
+    nombre = f"{base}_{generado_en:%Y%m%d%H%M%S}.{trabajo.formato}"
+
+    if trabajo.formato == "csv":
+        if trabajo.tipo == "morosidad":
+            filas = filas_reporte_morosidad(trabajo.reporte)
+        else:
+            filas = filas_reporte_general_csv(trabajo.condominio, generado_en, trabajo.desde, trabajo.hasta)
+        with tempfile.TemporaryFile() as tmp:
+            texto = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+            escribir_csv(filas, texto)
+            texto.flush()
+            texto.detach()
+            tmp.seek(0)
+            trabajo.archivo.save(nombre, File(tmp), save=False)
+    elif trabajo.formato == "xlsx":
+        if trabajo.tipo == "morosidad":
+            hojas = [("Morosidad", filas_reporte_morosidad(trabajo.reporte))]
+        else:
+            hojas = hojas_reporte_general(trabajo.condominio, generado_en, trabajo.desde, trabajo.hasta)
+        with tempfile.TemporaryFile() as tmp:
+            escribir_xlsx(hojas, tmp)
+            tmp.seek(0)
+            trabajo.archivo.save(nombre, File(tmp), save=False)
+    else:
+        if trabajo.tipo == "morosidad":
+            pdf = pdf_morosidad(trabajo.reporte)
+        else:
+            pdf = pdf_general(trabajo.condominio, calcular_morosidad(trabajo.condominio), generado_en)
+        trabajo.archivo.save(nombre, ContentFile(pdf), save=False)
+
+    trabajo.expira_en = timezone.now() + timedelta(hours=settings.REPORTES_RETENCION_HORAS)
+    return trabajo.archivo
@@ -1,3 +1,193 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.facilidades.models import Condominio, Unidad
+from apps.finanzas.models import Cargo, Factura, Pago
+from apps.finanzas.services import facturas_impagas
+from .management.commands.procesar_reportes import Command as ProcesarReportes
+from .models import TrabajoReporte
+from .services import calcular_morosidad, generar_reporte_morosidad
+
+User = get_user_model()
+
+
+class MorosidadTestMixin:
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.condominio = Condominio.objects.create(nombre="Las Palmas")
+        self.propietario = User.objects.create_user(username="propietario", password="x")
+        self.numero = 0
+
+    def crear_unidad(self, numero):
+        return Unidad.objects.create(condominio=self.condominio, numero_unidad=numero, propietario_user=self.propietario)
+
+    def crear_factura(self, unidad, monto, estado="pendiente", dias=-5):
+        self.numero += 1
+        return Factura.objects.create(
+            condominio=self.condominio, unidad=unidad, numero_factura=f"F-{self.numero}",
+            monto=Decimal(monto), fecha_vencimiento=self.hoy + timedelta(days=dias), estado=estado,
+        )
+
+    def pagar(self, factura, monto, estado="success"):
+        return Pago.objects.create(
+            factura=factura, unidad=factura.unidad, usuario=self.propietario, monto=Decimal(monto), estado=estado,
+        )
+
+
+class CalcularMorosidadTests(MorosidadTestMixin, TestCase):
+    def test_facturas_impagas_descuenta_pagos_y_suma_cargos(self):
+        unidad = self.crear_unidad("101")
+        parcial = self.crear_factura(unidad, "100.00")
+        Cargo.objects.create(factura=parcial, descripcion="Multa", monto=Decimal("10.00"))
+        self.pagar(parcial, "30.00")
+        self.pagar(parcial, "50.00", estado="failed")
+        saldada = self.crear_factura(unidad, "40.00")
+        self.pagar(saldada, "40.00")
+        self.crear_factura(unidad, "60.00", estado="pagada")
+
+        filas = list(facturas_impagas(Factura.objects.filter(unidad=unidad)))
+
+        self.assertEqual([f.pk for f in filas], [parcial.pk])
+        self.assertEqual(filas[0].importe, Decimal("110.00"))
+        self.assertEqual(filas[0].pagado, Decimal("30.00"))
+        self.assertEqual(filas[0].deuda, Decimal("80.00"))
+
+    def test_calcular_morosidad_lista_deuda_por_factura(self):
+        unidad = self.crear_unidad("101")
+        factura = self.crear_factura(unidad, "100.00")
+        self.pagar(factura, "25.00")
+        self.crear_factura(self.crear_unidad("102"), "50.00", estado="pagada")
+
+        self.assertEqual(calcular_morosidad(self.condominio), [{
+            "unidad": "101",
+            "propietario": "propietario",
+            "monto_pendiente": 75.0,
+            "fecha_vencimiento": factura.fecha_vencimiento.isoformat(),
+        }])
+
+    def test_calcular_morosidad_usa_una_consulta(self):
+        for i in range(2):
+            self.crear_factura(self.crear_unidad(f"1{i:02d}"), "10.00")
+        with self.assertNumQueries(1):
+            self.assertEqual(len(calcular_morosidad(self.condominio)), 2)
+
+        # Más unidades y facturas no agregan consultas
+        for i in range(2, 12):
+            unidad = self.crear_unidad(f"1{i:02d}")
+            factura = self.crear_factura(unidad, "10.00")
+            Cargo.objects.create(factura=factura, descripcion="Multa", monto=Decimal("1.00"))
+            self.pagar(factura, "5.00")
+        with self.assertNumQueries(1):
+            self.assertEqual(len(calcular_morosidad(self.condominio)), 12)
+
+    def test_generar_reporte_guarda_filas_y_resumen(self):
+        unidad = self.crear_unidad("101")
+        self.crear_factura(unidad, "100.00")
+        self.crear_factura(unidad, "20.00", dias=3)
+
+        reporte = generar_reporte_morosidad(self.condominio)
+
+        self.assertEqual(reporte.datos, {"total_morosos": 2, "deuda_total": 120.0})
+        self.assertEqual(
+            sorted(reporte.filas.values_list("monto_pendiente", flat=True)),
+            [Decimal("20.00"), Decimal("100.00")],
+        )
+        self.assertTrue(reporte.huella_datos)
+
+
+class ProcesarReportesTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.condominio = Condominio.objects.create(nombre="Las Palmas")
+        self.worker = ProcesarReportes(stdout=StringIO(), stderr=StringIO())
+
+    def encolar(self, **campos):
+        return TrabajoReporte.objects.create(tipo="general", formato="csv", condominio=self.condominio, **campos)
+
+    def test_genera_los_pendientes_y_guarda_el_archivo(self):
+        trabajo = self.encolar()
+        call_command("procesar_reportes", "--once", stdout=StringIO(), stderr=StringIO())
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.status, "done")
+        self.assertEqual(trabajo.attempts, 1)
+        self.assertIsNotNone(trabajo.expira_en)
+        self.assertTrue(default_storage.exists(trabajo.archivo.name))
+
+    def test_reclamar_lote_solo_toma_pendientes(self):
+        pendiente = self.encolar()
+        ocupado = self.encolar(status="processing", started_at=timezone.now(), attempts=1)
+
+        reclamados = self.worker._reclamar_lote(5)
+
+        self.assertEqual([t.pk for t in reclamados], [pendiente.pk])
+        pendiente.refresh_from_db()
+        self.assertEqual((pendiente.status, pendiente.attempts), ("processing", 1))
+        self.assertIsNotNone(pendiente.started_at)
+        ocupado.refresh_from_db()
+        self.assertEqual(ocupado.attempts, 1)
+
+    def test_reclamar_lote_respeta_el_tamano_y_el_orden(self):
+        ahora = timezone.now()
+        trabajos = [self.encolar(requested_at=ahora - timedelta(minutes=m)) for m in (1, 3, 2)]
+
+        reclamados = self.worker._reclamar_lote(2)
+
+        self.assertEqual([t.pk for t in reclamados], [trabajos[1].pk, trabajos[2].pk])
+        self.assertEqual(TrabajoReporte.objects.filter(status="pending").get().pk, trabajos[0].pk)
+
+    def test_reencola_los_abandonados(self):
+        viejo = self.encolar(status="processing", started_at=timezone.now() - timedelta(hours=2))
+        reciente = self.encolar(status="processing", started_at=timezone.now())
+
+        self.worker._reencolar_abandonados(1800)
+
+        self.assertEqual(TrabajoReporte.objects.get(pk=viejo.pk).status, "pending")
+        self.assertEqual(TrabajoReporte.objects.get(pk=reciente.pk).status, "processing")
+
+    def test_purga_los_archivos_expirados(self):
+        expirado = self.encolar(status="done", expira_en=timezone.now() - timedelta(minutes=1))
+        expirado.archivo.save("viejo.csv", ContentFile(b"a,b\n"))
+        vigente = self.encolar(status="done", expira_en=timezone.now() + timedelta(hours=1))
+        vigente.archivo.save("nuevo.csv", ContentFile(b"a,b\n"))
+        nombre = expirado.archivo.name
+
+        self.worker._purgar_expirados()
+
+        expirado.refresh_from_db()
+        self.assertEqual(expirado.status, "expired")
+        self.assertFalse(expirado.archivo)
+        self.assertFalse(default_storage.exists(nombre))
+        vigente.refresh_from_db()
+        self.assertEqual(vigente.status, "done")
+        self.assertTrue(default_storage.exists(vigente.archivo.name))
+
+    def test_error_reintenta_hasta_el_maximo(self):
+        trabajo = self.encolar()
+        with mock.patch(
+            "apps.reportes.management.commands.procesar_reportes.generar_archivo", side_effect=RuntimeError("sin disco"),
+        ):
+            for reclamado in self.worker._reclamar_lote(5):
+                self.worker._procesar(reclamado, max_attempts=2)
+            trabajo.refresh_from_db()
+            self.assertEqual((trabajo.status, trabajo.error), ("pending", "sin disco"))
+
+            for reclamado in self.worker._reclamar_lote(5):
+                self.worker._procesar(reclamado, max_attempts=2)
+            trabajo.refresh_from_db()
+            self.assertEqual((trabajo.status, trabajo.attempts), ("failed", 2))
@@ -1,12 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReporteMorosidadViewSet, ReportesGeneralesView
+from .views import AgregadosView, ReporteGeneralDetalleView, ReporteMorosidadViewSet, ReportesGeneralesView, TrabajoReporteViewSet
 
 router = DefaultRouter()
 router.register(r"morosidad", ReporteMorosidadViewSet)
+router.register(r"trabajos", TrabajoReporteViewSet, basename="trabajo-reporte")
 #router.register(r"generales", ReportesGeneralesView, basename="reportes-generales")
 
 urlpatterns = [
     path("", include(router.urls)),
     path("general/", ReportesGeneralesView.as_view(), name="reporte-general"),
+    path("agregados/", AgregadosView.as_view(), name="reporte-agregados"),
+    path("general/<str:seccion>/", ReporteGeneralDetalleView.as_view(), name="reporte-general-detalle"),
 ]
@@ -1,27 +1,25 @@
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils.timezone import now
 from apps.facilidades.models import Condominio, Unidad
-from apps.finanzas.models import Factura, Pago
-from .models import ReporteMorosidad
-from .serializers import ReporteMorosidadSerializer
-
-import csv
-import io
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-
+from .agregados import METRICAS, consultar_agregados
+from .models import AvanceAgregado, ReporteMorosidad, TrabajoReporte
+from .serializers import FilaMorosidadSerializer, ReporteMorosidadSerializer, TrabajoReporteSerializer
+from .services import (
+    SECCIONES, detalle_seccion, encolar_reporte, filas_reporte_general_csv,
+    generar_reporte_morosidad, hojas_reporte_general, nombre_descarga, resumen_general,
+)
+from .exportacion import filas_reporte_morosidad, respuesta_csv, respuesta_xlsx
+
+from django.http import FileResponse
+from django.utils.dateparse import parse_date
+from rest_framework import generics, mixins
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
-from apps.bookings.models import Reserva
-from apps.seguridad.models import RegistroAcceso, AlertaPanico
-from apps.facilidades.models import Incidencia
-from django.utils.timezone import now
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
 
 class ReporteMorosidadViewSet(viewsets.ModelViewSet):
     queryset = ReporteMorosidad.objects.all().order_by("-generado_en")
@@ -39,114 +37,78 @@ class ReporteMorosidadViewSet(viewsets.ModelViewSet):
         except Condominio.DoesNotExist:
             return Response({"error": "Condominio no encontrado"}, status=status.HTTP_404_NOT_FOUND)
 
-        # Buscar facturas pendientes de pago
-        facturas_pendientes = Factura.objects.filter(condominio=condominio, estado="pendiente")
-
-        datos = []
-        for factura in facturas_pendientes:
-            unidad = factura.unidad
-            pagos = Pago.objects.filter(factura=factura, estado="success")
-            pagado = sum([p.monto for p in pagos])
-            deuda = float(factura.monto) - float(pagado)
-
-            if deuda > 0:
-                datos.append({
-                    "unidad": unidad.numero_unidad if unidad else None,
-                    "propietario": unidad.propietario_user.username if unidad and unidad.propietario_user else None,
-                    "monto_pendiente": deuda,
-                    "fecha_vencimiento": factura.fecha_vencimiento,
-                })
-
-        # Guardar reporte en BD
-        reporte = ReporteMorosidad.objects.create(
-            condominio=condominio,
-            generado_en=now(),
-            datos={"morosos": datos}
-        )
+        # Facturas pendientes con deuda (una sola consulta), guardadas como reporte
+        reporte = generar_reporte_morosidad(condominio)
 
         return Response(ReporteMorosidadSerializer(reporte).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=["get"], url_path="exportar/json")
     def exportar_json(self, request, pk=None):
         """
-        Exporta el reporte en JSON.
+        Exporta el reporte completo en JSON (para mostrarlo por páginas usar /morosos/).
         """
         reporte = self.get_object()
-        return Response(reporte.datos, status=status.HTTP_200_OK)
+        morosos = FilaMorosidadSerializer(reporte.filas.order_by("fecha_vencimiento", "pk"), many=True).data
+        return Response({**reporte.datos, "morosos": morosos}, status=status.HTTP_200_OK)
 
-    @action(detail=True, methods=["get"], url_path="exportar/csv")
-    def exportar_csv(self, request, pk=None):
+    @action(detail=True, methods=["get"], url_path="morosos")
+    def morosos(self, request, pk=None):
         """
-        Exporta el reporte en formato CSV.
+        Morosos del reporte, paginados en la BD.
+        ?ordering=monto_pendiente|fecha_vencimiento|unidad (con "-" descendente),
+        ?monto_minimo=, ?page=, ?page_size=.
         """
         reporte = self.get_object()
-        datos = reporte.datos.get("morosos", [])
+        filas = reporte.filas.all()
 
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = f'attachment; filename="reporte_morosidad_{reporte.id}.csv"'
+        monto_minimo = request.query_params.get("monto_minimo")
+        if monto_minimo:
+            try:
+                filas = filas.filter(monto_pendiente__gte=Decimal(monto_minimo))
+            except InvalidOperation:
+                return Response({"error": "monto_minimo inválido"}, status=status.HTTP_400_BAD_REQUEST)
 
-        writer = csv.writer(response)
-        writer.writerow(["Unidad", "Propietario", "Monto Pendiente", "Fecha Vencimiento"])
+        ordering = request.query_params.get("ordering", "-monto_pendiente")
+        if ordering.lstrip("-") not in ("monto_pendiente", "fecha_vencimiento", "unidad"):
+            return Response({"error": "ordering inválido"}, status=status.HTTP_400_BAD_REQUEST)
 
-        for d in datos:
-            writer.writerow([
-                d.get("unidad"),
-                d.get("propietario"),
-                d.get("monto_pendiente"),
-                d.get("fecha_vencimiento"),
-            ])
+        paginator = ReportePagination()
+        page = paginator.paginate_queryset(filas.order_by(ordering, "pk"), request, view=self)
+        return paginator.get_paginated_response(FilaMorosidadSerializer(page, many=True).data)
+
+    @action(detail=True, methods=["get"], url_path="exportar/csv")
+    def exportar_csv(self, request, pk=None):
+        """
+        Exporta el reporte en formato CSV.
+        """
+        reporte = self.get_object()
+        return respuesta_csv(filas_reporte_morosidad(reporte), f"reporte_morosidad_{reporte.id}.csv")
 
-        return response
+    @action(detail=True, methods=["get"], url_path="exportar/xlsx")
+    def exportar_xlsx(self, request, pk=None):
+        """
+        Exporta el reporte en formato Excel (XLSX).
+        """
+        reporte = self.get_object()
+        return respuesta_xlsx([("Morosidad", filas_reporte_morosidad(reporte))], f"reporte_morosidad_{reporte.id}.xlsx")
 
     @action(detail=True, methods=["get"], url_path="exportar/pdf")
     def exportar_pdf(self, request, pk=None):
         """
-        Exporta el reporte en formato PDF.
+        Encola la exportación a PDF y responde 202 con el trabajo: el PDF se
+        genera en `procesar_reportes` y se baja desde trabajos/{id}/descargar/.
         """
         reporte = self.get_object()
-        datos = reporte.datos.get("morosos", [])
-
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, height - 50, f"Reporte de Morosidad - {reporte.condominio.nombre}")
-        p.setFont("Helvetica", 10)
-        p.drawString(50, height - 70, f"Generado en: {reporte.generado_en.strftime('%Y-%m-%d %H:%M')}")
-
-        # Encabezados de tabla
-        y = height - 120
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(50, y, "Unidad")
-        p.drawString(150, y, "Propietario")
-        p.drawString(300, y, "Monto Pendiente")
-        p.drawString(430, y, "Fecha Vencimiento")
-
-        p.setFont("Helvetica", 10)
-        y -= 20
-
-        # Contenido
-        for d in datos:
-            p.drawString(50, y, str(d.get("unidad")))
-            p.drawString(150, y, str(d.get("propietario")))
-            p.drawString(300, y, str(d.get("monto_pendiente")))
-            p.drawString(430, y, str(d.get("fecha_vencimiento")))
-            y -= 20
-            if y < 100:
-                p.showPage()
-                y = height - 50
-
-        p.save()
-        buffer.seek(0)
-
-        response = HttpResponse(buffer, content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="reporte_morosidad_{reporte.id}.pdf"'
-        return response
+        trabajo = encolar_reporte("morosidad", "pdf", reporte.condominio, reporte=reporte, usuario=request.user)
+        return respuesta_trabajo(request, trabajo)
     
 class ReportesGeneralesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_content_negotiation(self, request, force=False):
+        # ?format=csv|xlsx|pdf lo resuelve la vista, no los renderers de DRF
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request):
         condominio_id = request.query_params.get("condominio_id")
         formato = request.query_params.get("format", "json")
@@ -159,103 +121,174 @@ class ReportesGeneralesView(APIView):
         except Condominio.DoesNotExist:
             return Response({"error": "Condominio no encontrado"}, status=status.HTTP_404_NOT_FOUND)
 
-        # --- Construir reporte general ---
-        facturas_pendientes = Factura.objects.filter(condominio=condominio, estado="pendiente")
-        morosidad = []
-        for factura in facturas_pendientes:
-            unidad = factura.unidad
-            pagos = Pago.objects.filter(factura=factura, estado="success")
-            pagado = sum([p.monto for p in pagos])
-            deuda = float(factura.monto) - float(pagado)
-            if deuda > 0:
-                morosidad.append({
-                    "unidad": unidad.numero_unidad if unidad else None,
-                    "propietario": unidad.propietario_user.username if unidad and unidad.propietario_user else None,
-                    "monto_pendiente": deuda,
-                    "fecha_vencimiento": factura.fecha_vencimiento,
-                })
-
-        reservas = Reserva.objects.filter(instalacion__condominio=condominio).values("instalacion__nombre", "estado")
-        accesos = RegistroAcceso.objects.filter(condominio=condominio).values("tipo", "resultado")
-        incidencias = Incidencia.objects.filter(condominio=condominio).values("estado", "prioridad")
-        alertas = AlertaPanico.objects.filter(condominio=condominio).values("tipo", "nivel")
+        try:
+            desde, hasta = rango_fechas(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        generado_en = now()
 
+        # --- Exportación CSV (en streaming, sin armar el reporte en memoria) ---
+        if formato == "csv":
+            return respuesta_csv(
+                filas_reporte_general_csv(condominio, generado_en, desde, hasta),
+                f"reporte_general_{condominio.nombre}.csv",
+            )
+
+        # --- Exportación XLSX (libro write-only, una hoja por sección) ---
+        if formato == "xlsx":
+            return respuesta_xlsx(
+                hojas_reporte_general(condominio, generado_en, desde, hasta),
+                f"reporte_general_{condominio.nombre}.xlsx",
+            )
+
+        # --- Exportación PDF: se encola como TrabajoReporte (202) ---
+        if formato == "pdf":
+            trabajo = encolar_reporte("general", "pdf", condominio, usuario=request.user, desde=desde, hasta=hasta)
+            return respuesta_trabajo(request, trabajo)
+
+        # --- Respuesta JSON por defecto: conteos agrupados, el tamaño no crece con el historial ---
         reporte_general = {
             "condominio": condominio.nombre,
-            "generado_en": now(),
-            "morosidad": morosidad,
-            "reservas": list(reservas),
-            "accesos": list(accesos),
-            "incidencias": list(incidencias),
-            "alertas": list(alertas),
+            "generado_en": generado_en,
+            "desde": desde,
+            "hasta": hasta,
+            **resumen_general(condominio, desde, hasta),
         }
+        return Response(reporte_general, status=status.HTTP_200_OK)
 
-        # --- Exportación CSV ---
-        if formato == "csv":
-            buffer = io.StringIO()
-            writer = csv.writer(buffer)
-            writer.writerow(["Sección", "Detalle"])
-            writer.writerow(["Condominio", condominio.nombre])
-            writer.writerow(["Generado en", now()])
-
-            writer.writerow([])
-            writer.writerow(["Morosidad"])
-            writer.writerow(["Unidad", "Propietario", "Monto Pendiente", "Fecha Vencimiento"])
-            for m in morosidad:
-                writer.writerow([m["unidad"], m["propietario"], m["monto_pendiente"], m["fecha_vencimiento"]])
-
-            writer.writerow([])
-            writer.writerow(["Reservas"])
-            writer.writerow(["Instalación", "Estado"])
-            for r in reservas:
-                writer.writerow([r["instalacion__nombre"], r["estado"]])
-
-            writer.writerow([])
-            writer.writerow(["Accesos"])
-            writer.writerow(["Tipo", "Resultado"])
-            for a in accesos:
-                writer.writerow([a["tipo"], a["resultado"]])
-
-            response = HttpResponse(buffer.getvalue(), content_type="text/csv")
-            response["Content-Disposition"] = f'attachment; filename="reporte_general_{condominio.nombre}.csv"'
-            return response
-
-        # --- Exportación PDF ---
-        if formato == "pdf":
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-            elements = []
-
-            elements.append(Paragraph(f"Reporte General - {condominio.nombre}", styles["Title"]))
-            elements.append(Spacer(1, 12))
-            elements.append(Paragraph(f"Generado en: {now()}", styles["Normal"]))
-            elements.append(Spacer(1, 24))
-
-            # Morosidad
-            elements.append(Paragraph("Morosidad", styles["Heading2"]))
-            if morosidad:
-                data = [["Unidad", "Propietario", "Monto Pendiente", "Fecha Vencimiento"]]
-                for m in morosidad:
-                    data.append([m["unidad"], m["propietario"], m["monto_pendiente"], str(m["fecha_vencimiento"])])
-                table = Table(data, hAlign="LEFT")
-                table.setStyle(TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-                ]))
-                elements.append(table)
-            else:
-                elements.append(Paragraph("No hay morosos.", styles["Normal"]))
-
-            doc.build(elements)
-            pdf = buffer.getvalue()
-            buffer.close()
-
-            response = HttpResponse(pdf, content_type="application/pdf")
-            response["Content-Disposition"] = f'attachment; filename="reporte_general_{condominio.nombre}.pdf"'
-            return response
-
-        # --- Respuesta JSON por defecto ---
-        return Response(reporte_general, status=status.HTTP_200_OK)
\ No newline at end of file
+
+class ReportePagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class ReporteGeneralDetalleView(generics.ListAPIView):
+    """
+    Filas de una sección del reporte general (reservas, accesos, incidencias,
+    alertas), paginadas y con el mismo rango de fechas que el resumen.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ReportePagination
+
+    def list(self, request, *args, **kwargs):
+        if kwargs["seccion"] not in SECCIONES:
+            return Response({"error": "Sección no válida", "secciones": list(SECCIONES)}, status=status.HTTP_404_NOT_FOUND)
+        condominio_id = request.query_params.get("condominio_id")
+        if not condominio_id:
+            return Response({"error": "Debe enviar condominio_id"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            condominio = Condominio.objects.get(id=condominio_id)
+        except Condominio.DoesNotExist:
+            return Response({"error": "Condominio no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            desde, hasta = rango_fechas(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        page = self.paginate_queryset(detalle_seccion(kwargs["seccion"], condominio, desde, hasta))
+        return self.get_paginated_response(page)
+
+
+class AgregadosView(APIView):
+    """
+    Métricas diarias precalculadas (ver actualizar_agregados) de un condominio:
+    ?condominio_id=&metrica=&desde=&hasta=&por_dia=1. Lee la tabla de agregados,
+    no las tablas de eventos, así que un rango de años cuesta lo mismo que uno de días.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        metrica = request.query_params.get("metrica")
+        if metrica not in METRICAS:
+            return Response({"error": "Métrica no válida", "metricas": list(METRICAS)}, status=status.HTTP_400_BAD_REQUEST)
+        condominio_id = request.query_params.get("condominio_id")
+        if not condominio_id:
+            return Response({"error": "Debe enviar condominio_id"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            condominio = Condominio.objects.get(id=condominio_id)
+        except Condominio.DoesNotExist:
+            return Response({"error": "Condominio no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            desde, hasta = rango_fechas(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        por_dia = request.query_params.get("por_dia") in ("1", "true", "True")
+        avance = AvanceAgregado.objects.filter(metrica=metrica).values_list("procesado_hasta", flat=True).first()
+        return Response({
+            "condominio": condominio.nombre,
+            "metrica": metrica,
+            "desde": desde,
+            "hasta": hasta,
+            "procesado_hasta": avance,
+            "filas": consultar_agregados(condominio, metrica, desde, hasta, por_dia=por_dia),
+        }, status=status.HTTP_200_OK)
+
+
+def rango_fechas(request):
+    """(desde, hasta) de los parámetros ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD (opcionales)."""
+    fechas = []
+    for nombre in ("desde", "hasta"):
+        valor = request.query_params.get(nombre)
+        try:
+            fecha = parse_date(valor) if valor else None
+        except ValueError:  # formato correcto pero fecha imposible (2025-02-30)
+            fecha = None
+        if valor and fecha is None:
+            raise ValueError(f"Fecha '{nombre}' inválida, use AAAA-MM-DD")
+        fechas.append(fecha)
+    if fechas[0] and fechas[1] and fechas[0] > fechas[1]:
+        raise ValueError("'desde' no puede ser posterior a 'hasta'")
+    return tuple(fechas)
+
+
+def respuesta_trabajo(request, trabajo):
+    """202 con el trabajo encolado, la URL para consultar su estado y la de descarga."""
+    url = reverse("trabajo-reporte-detail", args=[trabajo.pk], request=request)
+    datos = {
+        **TrabajoReporteSerializer(trabajo).data,
+        "url": url,
+        "descargar": reverse("trabajo-reporte-descargar", args=[trabajo.pk], request=request),
+    }
+    return Response(datos, status=status.HTTP_202_ACCEPTED, headers={"Location": url})
+
+
+class TrabajoReporteViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                            mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Reportes generados en segundo plano: POST encola el trabajo y responde 202
+    con su id; GET /{id}/ informa el estado y /{id}/descargar/ entrega el archivo
+    cuando está listo. Los PDF grandes ya no ocupan un worker de Gunicorn.
+    """
+    serializer_class = TrabajoReporteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        trabajos = TrabajoReporte.objects.all().order_by("-requested_at")
+        if not self.request.user.is_staff:
+            trabajos = trabajos.filter(solicitado_por=self.request.user)
+        return trabajos
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        trabajo = encolar_reporte(
+            datos["tipo"], datos["formato"], datos["condominio"], reporte=datos.get("reporte"), usuario=request.user,
+            desde=datos.get("desde"), hasta=datos.get("hasta"),
+        )
+        return respuesta_trabajo(request, trabajo)
+
+    @action(detail=True, methods=["get"], url_path="descargar")
+    def descargar(self, request, pk=None):
+        trabajo = self.get_object()
+        if trabajo.status == "expired":
+            return Response({"detail": "El archivo del reporte ya expiró."}, status=status.HTTP_410_GONE)
+        if trabajo.status != "done" or not trabajo.archivo:
+            return Response(
+                {"detail": "El reporte todavía no está listo.", "status": trabajo.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(trabajo.archivo.open("rb"), as_attachment=True, filename=nombre_descarga(trabajo))
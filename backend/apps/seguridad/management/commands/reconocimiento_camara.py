@@ -0,0 +1,78 @@
+# apps/seguridad/management/commands/reconocimiento_camara.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.facilidades.models import Condominio
+from apps.seguridad.reconocimiento import ReconocedorCamara
+
+
+class Command(BaseCommand):
+    help = (
+        "Agente de reconocimiento facial de la garita. Lee una cámara (índice de "
+        "dispositivo) o un archivo de video sin interfaz gráfica, reconoce a los "
+        "residentes registrados y guarda DeteccionRostro por lotes. Al terminar "
+        "informa los frames por segundo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("fuente", help="Índice del dispositivo (p. ej. 0) o ruta/URL de video.")
+        parser.add_argument("--condominio", required=True, help="ID del condominio al que pertenece la cámara.")
+        parser.add_argument("--camara", default="", help="Identificador de la cámara (se guarda en metadata).")
+        parser.add_argument("--cada", type=int, default=3, help="Detectar caras 1 de cada N frames.")
+        parser.add_argument("--tolerancia", type=float, default=None)
+        parser.add_argument("--lote", type=int, default=50, help="Detecciones por bulk_create.")
+        parser.add_argument("--max-frames", type=int, default=None, help="Detenerse tras N frames (benchmark).")
+
+    def handle(self, *args, **options):
+        try:
+            import cv2
+        except ImportError:
+            raise CommandError("Se requiere OpenCV (opencv-python-headless) para leer la cámara.")
+
+        try:
+            condominio = Condominio.objects.get(id=options["condominio"])
+        except (Condominio.DoesNotExist, ValueError):
+            raise CommandError("Condominio no encontrado")
+
+        fuente = options["fuente"]
+        captura = cv2.VideoCapture(int(fuente) if fuente.isdigit() else fuente)
+        if not captura.isOpened():
+            raise CommandError(f"No se pudo abrir la fuente de video: {fuente}")
+
+        reconocedor = ReconocedorCamara(
+            condominio,
+            camara=options["camara"],
+            cada=options["cada"],
+            tolerancia=options["tolerancia"],
+            lote=options["lote"],
+        )
+        max_frames = options["max_frames"]
+        inicio = time.perf_counter()
+        indice = 0
+        try:
+            while max_frames is None or indice < max_frames:
+                ok, frame = captura.read()
+                if not ok:
+                    break
+                reconocedor.procesar_frame(frame, indice)
+                indice += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            captura.release()
+            reconocedor.flush()
+
+        total = time.perf_counter() - inicio
+        s = reconocedor.stats
+        fps = s["frames"] / total if total else 0.0
+        self.stdout.write(
+            f"Frames: {s['frames']} ({s['frames_procesados']} con detección) en {total:.1f}s -> {fps:.1f} FPS"
+        )
+        self.stdout.write(f"Rostros seguidos: {s['rostros']}, reconocidos: {s['reconocidos']}")
+        self.stdout.write(f"Encodings desde la caché perceptual: {s['cache_hits']} de {s['rostros']}")
+        self.stdout.write(
+            "Tiempo por etapa: detección {:.2f}s, encoding {:.2f}s, match {:.3f}s, BD {:.2f}s".format(
+                s["t_deteccion"], s["t_encoding"], s["t_match"], s["t_bd"]
+            )
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0002_deteccionrostro'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroacceso',
+            index=models.Index(fields=['ocurrido_en'], name='registro_acceso_ocurrido_idx'),
+        ),
+    ]
@@ -69,6 +69,7 @@ class RegistroAcceso(BaseModel):
         db_table = "registros_acceso"
         verbose_name = "Registro de Acceso"
         verbose_name_plural = "Registros de Acceso"
+        indexes = [models.Index(fields=["ocurrido_en"], name="registro_acceso_ocurrido_idx")]
 
 
 # --- Alertas de Pánico ---
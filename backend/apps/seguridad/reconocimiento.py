@@ -0,0 +1,169 @@
+# apps/seguridad/reconocimiento.py
+"""
+Agente de reconocimiento facial para las cámaras de la garita.
+
+Por cada N frames se detectan caras sobre una copia reducida del frame; las
+caras se siguen entre detecciones por solapamiento (IoU) y solo las que aparecen
+por primera vez se codifican, todas juntas en una sola llamada (salvo las que
+ya están en la caché por hash perceptual del recorte, p. ej. la misma persona que
+el seguidor perdió y volvió a encontrar). Los encodings se comparan en lote contra el
+índice en memoria de embeddings registrados y se genera una DeteccionRostro por
+cada rostro seguido, que se guardan en la BD por lotes con bulk_create.
+"""
+import logging
+import time
+import uuid
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+
+from apps.users import face_processing
+from apps.users.embedding_cache import clave_perceptual, frame_cache
+from apps.users.face_index import face_index
+from .models import DeteccionRostro
+
+logger = logging.getLogger(__name__)
+
+
+def _iou(a, b):
+    """IoU entre dos cajas (top, right, bottom, left)."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    if not inter:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+class RostroSeguido:
+    def __init__(self, box, frame):
+        self.rostro_id = uuid.uuid4()
+        self.box = box
+        self.ultimo_frame = frame
+
+
+class SeguidorRostros:
+    """Asocia las cajas de cada detección con los rostros ya vistos (greedy por IoU)."""
+
+    def __init__(self, iou_minimo=0.3, max_frames_perdido=30):
+        self.iou_minimo = iou_minimo
+        self.max_frames_perdido = max_frames_perdido
+        self.rostros = []
+
+    def actualizar(self, boxes, frame):
+        """Devuelve la lista de RostroSeguido nuevos (cajas que no coinciden con ninguno)."""
+        self.rostros = [r for r in self.rostros if frame - r.ultimo_frame <= self.max_frames_perdido]
+        libres = list(self.rostros)
+        nuevos = []
+        for box in boxes:
+            mejor, mejor_iou = None, self.iou_minimo
+            for rostro in libres:
+                iou = _iou(box, rostro.box)
+                if iou >= mejor_iou:
+                    mejor, mejor_iou = rostro, iou
+            if mejor is not None:
+                libres.remove(mejor)
+                mejor.box = box
+                mejor.ultimo_frame = frame
+            else:
+                rostro = RostroSeguido(box, frame)
+                self.rostros.append(rostro)
+                nuevos.append(rostro)
+        return nuevos
+
+
+class ReconocedorCamara:
+    def __init__(self, condominio, camara="", cada=3, tolerancia=None, lote=50, endpoint="camera"):
+        self.condominio = condominio
+        self.camara = camara
+        self.cada = max(1, cada)
+        self.tolerancia = tolerancia if tolerancia is not None else getattr(settings, "FACE_MATCH_TOLERANCE", 0.5)
+        self.lote = lote
+        self.endpoint = endpoint
+        self.seguidor = SeguidorRostros(max_frames_perdido=self.cada * 10)
+        self._pendientes = []
+        self.stats = {
+            "frames": 0, "frames_procesados": 0, "rostros": 0, "reconocidos": 0, "cache_hits": 0,
+            "t_deteccion": 0.0, "t_encoding": 0.0, "t_match": 0.0, "t_bd": 0.0,
+        }
+
+    def procesar_frame(self, frame_bgr, indice):
+        """Procesa un frame BGR (formato de OpenCV). Solo detecta 1 de cada `cada` frames."""
+        self.stats["frames"] += 1
+        if indice % self.cada:
+            return
+        self.stats["frames_procesados"] += 1
+        frame = np.ascontiguousarray(frame_bgr[:, :, ::-1])
+
+        t0 = time.perf_counter()
+        boxes = face_processing.locate_faces(frame, self.endpoint)
+        nuevos = self.seguidor.actualizar(boxes, indice)
+        t1 = time.perf_counter()
+        self.stats["t_deteccion"] += t1 - t0
+        if not nuevos:
+            return
+
+        # Un solo encoding por rostro seguido: los recortes parecidos a uno visto hace
+        # poco salen de la caché perceptual y el resto se codifica en una llamada
+        encodings = [None] * len(nuevos)
+        faltantes = []
+        for i, rostro in enumerate(nuevos):
+            top, right, bottom, left = rostro.box
+            clave = clave_perceptual(frame[top:bottom, left:right], self.endpoint)
+            encontrado, encoding = frame_cache.get(clave)
+            if encontrado and encoding is not None:
+                encodings[i] = encoding
+                self.stats["cache_hits"] += 1
+            else:
+                faltantes.append((i, clave))
+        if faltantes:
+            calculados = face_processing.get_face_recognition().face_encodings(
+                frame, known_face_locations=[nuevos[i].box for i, _ in faltantes]
+            )
+            for (i, clave), encoding in zip(faltantes, calculados):
+                encodings[i] = encoding
+                frame_cache.set(clave, encoding)
+        t2 = time.perf_counter()
+        self.stats["t_encoding"] += t2 - t1
+
+        matches = face_index.best_matches(encodings, self.tolerancia)
+        self.stats["t_match"] += time.perf_counter() - t2
+
+        for rostro, encoding, match in zip(nuevos, encodings, matches):
+            self._registrar(rostro, encoding, match, indice)
+
+        if len(self._pendientes) >= self.lote:
+            self.flush()
+
+    def _registrar(self, rostro, encoding, match, indice):
+        self.stats["rostros"] += 1
+        metadata = {"camara": self.camara, "frame": indice, "box": list(rostro.box)}
+        usuario_id, confianza = None, None
+        if match is not None:
+            usuario_id, distancia = match
+            confianza = Decimal(max(0.0, 1.0 - distancia) * 100).quantize(Decimal("0.01"))
+            metadata["distancia"] = distancia
+            self.stats["reconocidos"] += 1
+        else:
+            # Guardamos el embedding para poder identificarlo más tarde (acción identificar)
+            metadata["embedding"] = [float(x) for x in encoding]
+
+        self._pendientes.append(DeteccionRostro(
+            usuario_id=usuario_id,
+            condominio=self.condominio,
+            rostro_id=rostro.rostro_id,
+            confianza=confianza,
+            metadata=metadata,
+        ))
+
+    def flush(self):
+        if not self._pendientes:
+            return
+        t0 = time.perf_counter()
+        DeteccionRostro.objects.bulk_create(self._pendientes)
+        self.stats["t_bd"] += time.perf_counter() - t0
+        logger.info("%s detecciones de rostro guardadas", len(self._pendientes))
+        self._pendientes = []
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Vehiculo, DeteccionPlaca, PuntoAcceso, RegistroAcceso, AlertaPanico, RegistroSeguridad
 from .models import DeteccionRostro
+from apps.users.face_index import EMBEDDING_DIM
 
 class VehiculoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,4 +37,16 @@ class RegistroSeguridadSerializer(serializers.ModelSerializer):
 class DeteccionRostroSerializer(serializers.ModelSerializer):
     class Meta:
         model = DeteccionRostro
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+    def validate_metadata(self, value):
+        # El embedding se compara contra vector(128) en la BD: otra longitud haría fallar la consulta
+        embedding = value.get("embedding") if isinstance(value, dict) else None
+        if embedding is None:
+            return value
+        if (
+            not isinstance(embedding, list) or len(embedding) != EMBEDDING_DIM
+            or not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in embedding)
+        ):
+            raise serializers.ValidationError(f"'embedding' debe ser una lista de {EMBEDDING_DIM} números.")
+        return value
\ No newline at end of file
@@ -0,0 +1,27 @@
+# apps/seguridad/services.py
+from decimal import Decimal
+
+from apps.users.services import buscar_rostro_cercano
+
+
+def identificar_deteccion(deteccion, tolerancia=None):
+    """
+    Asocia una DeteccionRostro al residente registrado más cercano usando el
+    embedding guardado en metadata["embedding"]. La búsqueda se resuelve en la
+    BD (pgvector). Devuelve True si se encontró coincidencia.
+    """
+    metadata = deteccion.metadata or {}
+    embedding = metadata.get("embedding")
+    if not embedding:
+        return False
+
+    match = buscar_rostro_cercano(embedding, tolerancia)
+    if match is None:
+        return False
+
+    user_id, distancia = match
+    deteccion.usuario_id = user_id
+    deteccion.confianza = Decimal(max(0.0, 1.0 - distancia) * 100).quantize(Decimal("0.01"))
+    deteccion.metadata = {**metadata, "distancia": distancia}
+    deteccion.save(update_fields=["usuario", "confianza", "metadata", "updated_at"])
+    return True
@@ -1,10 +1,13 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import Vehiculo, DeteccionPlaca, PuntoAcceso, RegistroAcceso, AlertaPanico, RegistroSeguridad, DeteccionRostro
 from .serializers import (
     VehiculoSerializer, DeteccionPlacaSerializer, PuntoAccesoSerializer,
     RegistroAccesoSerializer, AlertaPanicoSerializer, RegistroSeguridadSerializer,
     DeteccionRostroSerializer
 )
+from .services import identificar_deteccion
 
 class VehiculoViewSet(viewsets.ModelViewSet):
     queryset = Vehiculo.objects.all()
@@ -41,3 +44,25 @@ class DeteccionRostroViewSet(viewsets.ModelViewSet):
     serializer_class = DeteccionRostroSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_create(self, serializer):
+        deteccion = serializer.save()
+        # Si la cámara envió el embedding y no un usuario, intentamos identificarlo
+        if deteccion.usuario_id is None:
+            identificar_deteccion(deteccion)
+
+    @action(detail=True, methods=["post"], url_path="identificar")
+    def identificar(self, request, pk=None):
+        """
+        Busca el residente más cercano al embedding de la detección (metadata["embedding"]).
+        """
+        deteccion = self.get_object()
+        if not (deteccion.metadata or {}).get("embedding"):
+            return Response({"error": "La detección no tiene embedding"}, status=status.HTTP_400_BAD_REQUEST)
+        tolerancia = request.data.get("tolerancia")
+        try:
+            tolerancia = float(tolerancia) if tolerancia is not None else None
+        except (TypeError, ValueError):
+            return Response({"error": "tolerancia inválida"}, status=status.HTTP_400_BAD_REQUEST)
+        if not identificar_deteccion(deteccion, tolerancia):
+            return Response({"error": "No se encontró coincidencia"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(DeteccionRostroSerializer(deteccion).data, status=status.HTTP_200_OK)
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Profile, Vehiculo
+from .models import Profile, Vehiculo, EmbeddingJob, FaceEmbedding
 from apps.facilidades.models import ResidentesUnidad
 
 class ProfileInline(admin.StackedInline):
@@ -23,6 +23,19 @@ class VehiculoAdmin(admin.ModelAdmin):
     search_fields = ("placa", "usuario__username", "unidad__numero_unidad")
     list_filter = ("marca", "color")
 
+@admin.register(EmbeddingJob)
+class EmbeddingJobAdmin(admin.ModelAdmin):
+    list_display = ("profile", "status", "attempts", "requested_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("profile__user__username",)
+
+@admin.register(FaceEmbedding)
+class FaceEmbeddingAdmin(admin.ModelAdmin):
+    list_display = ("profile", "origen", "embedding_version", "created_at")
+    list_filter = ("origen", "embedding_version")
+    search_fields = ("profile__user__username",)
+    exclude = ("embedding",)
+
 #@admin.register(ResidentesUnidad)
 #class ResidentesUnidadAdmin(admin.ModelAdmin):
 #    list_display = ("unidad", "usuario", "rol", "es_principal", "desde", "hasta")
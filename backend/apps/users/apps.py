@@ -6,3 +6,10 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         import apps.users.signals # noqa
+        from django.conf import settings
+        if getattr(settings, "FACE_WARMUP", False):
+            from .face_processing import warm_up
+            try:
+                warm_up()
+            except RuntimeError:
+                pass
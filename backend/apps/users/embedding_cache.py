@@ -0,0 +1,123 @@
+# apps/users/embedding_cache.py
+"""
+Caché LRU (uno por proceso) de encodings faciales indexada por contenido.
+
+La clave es un hash de los píxeles ya decodificados más el endpoint, su
+configuración de detección y FACE_EMBEDDING_VERSION, de modo que la misma
+imagen subida otra vez (con otro nombre de archivo o re-comprimida sin
+cambios) cuesta un hash en vez de una pasada de dlib. También se guardan los
+resultados "sin cara" para no volver a detectarlos.
+
+Los frames de cámara en vivo casi nunca repiten bytes, así que el agente de la
+garita usa otra instancia (`frame_cache`) indexada por un hash perceptual del
+recorte de la cara (clave_perceptual) y con vida corta: sirve para la misma
+persona frente a la cámara cuando el seguidor la pierde y la vuelve a encontrar.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+_SIN_CARA = object()
+
+
+def clave_imagen(image, endpoint):
+    """Hash del arreglo de píxeles (uint8) y de todo lo que afecta al encoding."""
+    from .face_processing import get_pipeline_config
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((image.shape, endpoint, sorted(get_pipeline_config(endpoint).items()),
+                   getattr(settings, "FACE_EMBEDDING_VERSION", ""))).encode())
+    h.update(memoryview(image).cast("B") if image.flags.c_contiguous else image.tobytes())
+    return h.hexdigest()
+
+
+def clave_perceptual(recorte, endpoint):
+    """
+    dHash de 64 bits del recorte (RGB uint8): se reduce a 9x8 en escala de
+    grises y cada bit dice si un píxel es más claro que su vecino. Ruido de
+    sensor, recompresión o un leve cambio de escala no lo alteran.
+    """
+    from .face_processing import get_pipeline_config
+
+    gris = np.asarray(Image.fromarray(recorte).convert("L").resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = np.packbits(gris[:, 1:] > gris[:, :-1]).tobytes()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((endpoint, sorted(get_pipeline_config(endpoint).items()),
+                   getattr(settings, "FACE_EMBEDDING_VERSION", ""))).encode())
+    h.update(bits)
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries=None, ttl=None):
+        self._max_entries = max_entries
+        # Segundos que vive una entrada (None: hasta que el LRU la desaloje)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, "FACE_EMBEDDING_CACHE_SIZE", 1024)
+
+    def get(self, key):
+        """
+        Devuelve (encontrado, encoding). encoding es None si la imagen se
+        procesó antes y no tenía cara.
+        """
+        with self._lock:
+            entrada = self._data.get(key)
+            if entrada is not None and entrada[1] is not None and entrada[1] < time.monotonic():
+                del self._data[key]
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                return False, None
+            valor = entrada[0]
+            self._data.move_to_end(key)
+            self.hits += 1
+        return True, (None if valor is _SIN_CARA else list(valor))
+
+    def set(self, key, encoding):
+        maximo = self.max_entries
+        if not maximo:
+            return
+        with self._lock:
+            # Tupla inmutable: quien lee recibe siempre una copia
+            valor = _SIN_CARA if encoding is None else tuple(float(x) for x in encoding)
+            self._data[key] = (valor, time.monotonic() + self.ttl if self.ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > maximo:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache()
+frame_cache = EmbeddingCache(
+    max_entries=getattr(settings, "FACE_FRAME_CACHE_SIZE", 256),
+    ttl=getattr(settings, "FACE_FRAME_CACHE_TTL", 10),
+)
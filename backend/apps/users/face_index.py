@@ -0,0 +1,216 @@
+# apps/users/face_index.py
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 128
+
+
+def _sq_norms(matrix):
+    return np.einsum("ij,ij->i", matrix, matrix)
+
+
+def _distances(queries, matrix, sq_norms):
+    """Distancias euclídeas (q x n) con |a - b|^2 = |a|^2 - 2 a·b + |b|^2."""
+    sq = sq_norms[np.newaxis, :] - 2.0 * (queries @ matrix.T) + _sq_norms(queries)[:, np.newaxis]
+    return np.sqrt(np.maximum(sq, 0.0))
+
+
+class _Snapshot:
+    """
+    Estado inmutable del índice. Las consultas toman una referencia y las
+    actualizaciones construyen uno nuevo, así que no hace falta bloquear al leer.
+    """
+
+    def __init__(self, user_ids, centroids, spreads, members, owners):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.centroids = np.ascontiguousarray(np.asarray(centroids, dtype=np.float32).reshape(-1, EMBEDDING_DIM))
+        self.spreads = np.asarray(spreads, dtype=np.float32)
+        self.members = np.ascontiguousarray(np.asarray(members, dtype=np.float32).reshape(-1, EMBEDDING_DIM))
+        # Posición (en user_ids) del usuario dueño de cada embedding individual
+        self.owners = np.asarray(owners, dtype=np.int64)
+        self.c_sq = _sq_norms(self.centroids)
+        self.m_sq = _sq_norms(self.members)
+        self.positions = {int(uid): i for i, uid in enumerate(self.user_ids)}
+
+    @classmethod
+    def empty(cls):
+        vacio = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        return cls([], vacio, [], vacio, [])
+
+    def without(self, pos):
+        keep = np.ones(len(self.user_ids), dtype=bool)
+        keep[pos] = False
+        member_keep = self.owners != pos
+        owners = self.owners[member_keep]
+        owners = np.where(owners > pos, owners - 1, owners)
+        return _Snapshot(
+            self.user_ids[keep], self.centroids[keep], self.spreads[keep],
+            self.members[member_keep], owners,
+        )
+
+    def with_user(self, user_id, centroid, spread, members):
+        pos = len(self.user_ids)
+        members = np.asarray(members, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        return _Snapshot(
+            np.append(self.user_ids, np.int64(user_id)),
+            np.vstack([self.centroids, np.asarray(centroid, dtype=np.float32)[np.newaxis, :]]),
+            np.append(self.spreads, np.float32(spread)),
+            np.vstack([self.members, members]),
+            np.append(self.owners, np.full(len(members), pos, dtype=np.int64)),
+        )
+
+
+class FaceEmbeddingIndex:
+    """
+    Índice en memoria (uno por proceso) de los rostros registrados.
+
+    Por cada usuario guarda el centroide de sus embeddings, su dispersión
+    (distancia máxima de un embedding al centroide) y los embeddings individuales.
+    Una consulta compara primero contra todos los centroides en una sola
+    operación vectorizada; solo los usuarios cuyo centroide está cerca del
+    umbral (distancia - dispersión <= tolerancia, cota por desigualdad triangular)
+    se comparan además contra sus embeddings individuales.
+    El índice se construye perezosamente en la primera consulta, se parchea desde
+    los servicios de embeddings y se reconstruye cada FACE_INDEX_TTL segundos para
+    recoger cambios hechos por otros procesos (otros workers de Gunicorn).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshot = _Snapshot.empty()
+        self._loaded_at = None
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._snapshot.user_ids)
+
+    def _is_stale(self):
+        if self._loaded_at is None:
+            return True
+        ttl = getattr(settings, "FACE_INDEX_TTL", 300)
+        return bool(ttl) and (time.monotonic() - self._loaded_at) > ttl
+
+    def _ensure_loaded(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self.rebuild()
+
+    def rebuild(self):
+        """Carga centroides y embeddings individuales desde la BD (dos consultas)."""
+        from .models import FaceEmbedding, Profile
+
+        user_ids, centroids, spreads = [], [], []
+        rows = Profile.objects.filter(embedding__isnull=False).values_list("user_id", "embedding", "embedding_spread")
+        for user_id, embedding, spread in rows.iterator(chunk_size=2000):
+            if embedding is None or len(embedding) != EMBEDDING_DIM:
+                continue
+            user_ids.append(user_id)
+            centroids.append(embedding)
+            spreads.append(spread or 0.0)
+
+        positions = {uid: i for i, uid in enumerate(user_ids)}
+        members, owners = [], []
+        rows = FaceEmbedding.objects.values_list("profile__user_id", "embedding")
+        for user_id, embedding in rows.iterator(chunk_size=2000):
+            pos = positions.get(user_id)
+            if pos is None or embedding is None:
+                continue
+            members.append(embedding)
+            owners.append(pos)
+
+        self.load(user_ids, centroids, spreads, members, owners)
+        logger.info("Índice de rostros reconstruido con %s usuarios y %s embeddings", len(user_ids), len(members))
+
+    def load(self, user_ids, centroids, spreads=None, members=None, owners=None):
+        """
+        Reemplaza el contenido del índice (sin tocar la BD). Sin `members`, cada
+        centroide se toma como único embedding de su usuario.
+        """
+        user_ids = [int(uid) for uid in user_ids]
+        if spreads is None:
+            spreads = np.zeros(len(user_ids), dtype=np.float32)
+        if members is None:
+            members, owners = centroids, np.arange(len(user_ids))
+        snapshot = _Snapshot(user_ids, centroids, spreads, members, owners)
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Fuerza la reconstrucción en la próxima consulta."""
+        with self._lock:
+            self._loaded_at = None
+
+    def update(self, user_id, centroid, spread=0.0, members=None):
+        """Inserta o reemplaza los embeddings de un usuario. Con centroid=None lo elimina."""
+        if centroid is None or len(centroid) != EMBEDDING_DIM:
+            self.remove(user_id)
+            return
+        if members is None or not len(members):
+            members = [centroid]
+        with self._lock:
+            if self._loaded_at is None:
+                # Aún no construido: se cargará completo en la próxima consulta.
+                return
+            snapshot = self._snapshot
+            pos = snapshot.positions.get(int(user_id))
+            if pos is not None:
+                snapshot = snapshot.without(pos)
+            self._snapshot = snapshot.with_user(user_id, centroid, spread or 0.0, members)
+
+    def remove(self, user_id):
+        with self._lock:
+            pos = self._snapshot.positions.get(int(user_id))
+            if pos is None:
+                return
+            self._snapshot = self._snapshot.without(pos)
+
+    def best_match(self, encoding, tolerance):
+        """
+        Devuelve (user_id, distancia) del usuario más cercano si su distancia
+        euclídea es <= tolerance, o None si ninguno cumple.
+        """
+        return self.best_matches([encoding], tolerance)[0]
+
+    def best_matches(self, encodings, tolerance):
+        """
+        Versión por lotes de best_match: resuelve todas las caras de una vez.
+        Devuelve una lista paralela a `encodings` con (user_id, distancia) o None.
+        """
+        self._ensure_loaded()
+        s = self._snapshot
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        if not len(s.user_ids):
+            return [None] * len(queries)
+
+        centroid_dist = _distances(queries, s.centroids, s.c_sq)
+        results = []
+        for row, distances in enumerate(centroid_dist):
+            best = int(np.argmin(distances))
+            if distances[best] <= tolerance:
+                results.append((int(s.user_ids[best]), float(distances[best])))
+                continue
+
+            # Ningún embedding individual está a menos de (distancia al centroide - dispersión)
+            candidates = (distances - s.spreads) <= tolerance
+            if not candidates.any():
+                results.append(None)
+                continue
+            mask = candidates[s.owners]
+            member_dist = _distances(queries[row:row + 1], s.members[mask], s.m_sq[mask])[0]
+            j = int(np.argmin(member_dist))
+            if member_dist[j] <= tolerance:
+                results.append((int(s.user_ids[s.owners[mask][j]]), float(member_dist[j])))
+            else:
+                results.append(None)
+        return results
+
+
+face_index = FaceEmbeddingIndex()
@@ -0,0 +1,207 @@
+# apps/users/face_metrics.py
+"""
+Métricas de tiempo por etapa del pipeline facial (upload, decode, detect,
+encode, match, token) en histogramas con formato de texto de Prometheus.
+
+Cada petición abre una captura (`capturar()`); las funciones del pipeline
+miden sus etapas con `etapa(nombre)` y las acumulan en la captura activa del
+hilo. Si la inferencia se hace en el servicio de rostros, el servidor devuelve
+los tiempos de su captura y el cliente los fusiona con `fusionar()`. Al final,
+quien abrió la captura la vuelca a los histogramas con `observar()`, etiquetada
+con el endpoint, el tamaño de la imagen y el número de rostros registrados.
+El acierto o fallo de la caché de encodings viaja en la misma captura, así que
+también se cuenta cuando la inferencia ocurre en el servicio de rostros.
+
+Los histogramas viven en memoria de cada proceso: con varios workers de
+Gunicorn cada uno expone los suyos en /api/face/metrics/.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TAMANOS = ((640, "<=640"), (1024, "<=1024"), (2048, "<=2048"))
+CANDIDATOS = ((0, "0"), (999, "<1k"), (9999, "<10k"), (99999, "<100k"))
+
+_local = threading.local()
+
+
+def tamano_imagen(width, height):
+    """Etiqueta acotada (no el valor exacto) para no disparar la cardinalidad."""
+    if not width or not height:
+        return "desconocido"
+    lado = max(width, height)
+    for limite, etiqueta in TAMANOS:
+        if lado <= limite:
+            return etiqueta
+    return ">2048"
+
+
+def rango_candidatos(n):
+    if n is None:
+        return "desconocido"
+    for limite, etiqueta in CANDIDATOS:
+        if n <= limite:
+            return etiqueta
+    return ">=100k"
+
+
+class Captura:
+    def __init__(self):
+        self.etapas = {}
+        self.width = None
+        self.height = None
+        # "hit"/"miss" de la caché de encodings, si la petición pasó por ella
+        self.cache = None
+
+    def sumar(self, nombre, segundos):
+        self.etapas[nombre] = self.etapas.get(nombre, 0.0) + segundos
+
+    def as_dict(self):
+        return {"etapas": dict(self.etapas), "width": self.width, "height": self.height, "cache": self.cache}
+
+
+def captura_actual():
+    pila = getattr(_local, "pila", None)
+    return pila[-1] if pila else None
+
+
+@contextmanager
+def capturar():
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    captura = Captura()
+    pila.append(captura)
+    try:
+        yield captura
+    finally:
+        pila.pop()
+
+
+@contextmanager
+def etapa(nombre):
+    """Mide el bloque y lo suma a la captura activa (si no hay, no hace nada)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        captura = captura_actual()
+        if captura is not None:
+            captura.sumar(nombre, time.perf_counter() - inicio)
+
+
+def registrar_dimensiones(width, height):
+    captura = captura_actual()
+    if captura is not None:
+        captura.width, captura.height = width, height
+
+
+def registrar_cache(encontrado):
+    captura = captura_actual()
+    if captura is not None:
+        captura.cache = "hit" if encontrado else "miss"
+
+
+def fusionar(datos):
+    """Suma a la captura activa los tiempos (y el uso de caché) devueltos por el servicio de rostros."""
+    captura = captura_actual()
+    if captura is None or not datos:
+        return
+    for nombre, segundos in (datos.get("etapas") or {}).items():
+        captura.sumar(nombre, segundos)
+    if datos.get("width"):
+        captura.width, captura.height = datos["width"], datos.get("height")
+    if datos.get("cache"):
+        captura.cache = datos["cache"]
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + 1
+
+    def render(self):
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, total in series:
+            etiquetas = ",".join(f'{n}="{v}"' for n, v in zip(self.labelnames, key))
+            lineas.append(f"{self.name}{{{etiquetas}}} {total}")
+        return lineas
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            serie = self._series.get(key)
+            if serie is None:
+                serie = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if value <= limite:
+                    serie[0][i] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def render(self):
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(v[0]), v[1], v[2]) for k, v in sorted(self._series.items())]
+        for key, cuentas, suma, total in series:
+            etiquetas = ",".join(f'{n}="{v}"' for n, v in zip(self.labelnames, key))
+            for limite, cuenta in zip(self.buckets, cuentas):
+                lineas.append(f'{self.name}_bucket{{{etiquetas},le="{limite}"}} {cuenta}')
+            lineas.append(f'{self.name}_bucket{{{etiquetas},le="+Inf"}} {total}')
+            lineas.append(f"{self.name}_sum{{{etiquetas}}} {suma}")
+            lineas.append(f"{self.name}_count{{{etiquetas}}} {total}")
+        return lineas
+
+
+stage_seconds = Histogram(
+    "face_stage_seconds",
+    "Duración de cada etapa del pipeline facial.",
+    ("endpoint", "stage", "image_size", "candidates"),
+)
+
+cache_lookups = Counter(
+    "face_embedding_cache_lookups_total",
+    "Consultas a la caché de encodings, por resultado (hit/miss).",
+    ("endpoint", "result"),
+)
+
+
+def observar(endpoint, captura, candidatos=None):
+    """Vuelca una captura a los histogramas (una observación por etapa y el total)."""
+    etiquetas = {
+        "endpoint": endpoint,
+        "image_size": tamano_imagen(captura.width, captura.height),
+        "candidates": rango_candidatos(candidatos),
+    }
+    for nombre, segundos in captura.etapas.items():
+        stage_seconds.observe(segundos, stage=nombre, **etiquetas)
+    if captura.etapas:
+        stage_seconds.observe(sum(captura.etapas.values()), stage="total", **etiquetas)
+    if captura.cache:
+        cache_lookups.inc(endpoint=endpoint, result=captura.cache)
+
+
+def render():
+    """Texto en formato de exposición de Prometheus (0.0.4)."""
+    return "\n".join(stage_seconds.render() + cache_lookups.render()) + "\n"
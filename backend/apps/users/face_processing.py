@@ -0,0 +1,184 @@
+# apps/users/face_processing.py
+"""
+Pipeline compartido de procesamiento facial (registro, login y worker de embeddings).
+
+La detección se hace sobre una copia reducida de la imagen (lado mayor como
+máximo `max_dimension`), la caja encontrada se lleva de vuelta a la resolución
+original y el encoding se calcula sobre la imagen completa. Modelo de detección
+(hog/cnn), upsampling y tamaño máximo se configuran por endpoint en
+settings.FACE_PIPELINES.
+
+face_recognition (y con él dlib y sus modelos) se importa la primera vez que
+se necesita, no al cargar el módulo: migrate, los comandos que no tocan rostros
+y los workers que nunca reciben una petición facial no pagan ese costo.
+Con FACE_WARMUP=True la app lo precarga al arrancar (ver UsersConfig.ready).
+"""
+import io
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from .face_metrics import etapa, registrar_cache, registrar_dimensiones
+
+logger = logging.getLogger(__name__)
+
+_face_recognition = None
+_import_error = None
+_import_lock = threading.Lock()
+
+
+class InvalidImage(ValueError):
+    """Los bytes recibidos no son una imagen decodificable."""
+
+DEFAULT_PIPELINE = {
+    "model": "hog",
+    "upsample": 1,
+    "max_dimension": 800,
+}
+
+
+def get_pipeline_config(endpoint):
+    """Configuración efectiva (defaults + settings.FACE_PIPELINES[endpoint])."""
+    config = dict(DEFAULT_PIPELINE)
+    config.update(getattr(settings, "FACE_PIPELINES", {}).get(endpoint, {}))
+    return config
+
+
+def get_face_recognition():
+    """Devuelve el módulo face_recognition, importándolo en el primer uso."""
+    global _face_recognition, _import_error
+    if _face_recognition is not None:
+        return _face_recognition
+    with _import_lock:
+        if _face_recognition is None and _import_error is None:
+            try:
+                import face_recognition
+                _face_recognition = face_recognition
+            except Exception as e:
+                _import_error = e
+                logger.warning("No se pudo importar face_recognition: %s. Los embeddings NO se generarán.", e)
+    if _face_recognition is None:
+        raise RuntimeError(f"face_recognition no está disponible: {_import_error}")
+    return _face_recognition
+
+
+def warm_up():
+    """
+    Importa face_recognition y ejecuta una detección y un encoding sobre una
+    imagen vacía para dejar los modelos de dlib cargados antes de la primera petición.
+    """
+    face_recognition = get_face_recognition()
+    blank = np.zeros((64, 64, 3), dtype=np.uint8)
+    face_recognition.face_locations(blank, number_of_times_to_upsample=0)
+    face_recognition.face_encodings(blank, known_face_locations=[(0, 64, 64, 0)])
+    logger.info("Modelos de reconocimiento facial precargados")
+
+
+def load_image(file_obj):
+    """Decodifica un archivo de imagen (file-like) a un arreglo RGB uint8."""
+    with Image.open(file_obj) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def downscale(image, max_dimension):
+    """
+    Devuelve (imagen_reducida, escala). Si la imagen ya es pequeña, se devuelve
+    tal cual con escala 1.0.
+    """
+    height, width = image.shape[:2]
+    largest = max(height, width)
+    if not max_dimension or largest <= max_dimension:
+        return image, 1.0
+    scale = max_dimension / float(largest)
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    small = Image.fromarray(image).resize(size, Image.BILINEAR)
+    return np.asarray(small), scale
+
+
+def _to_full_resolution(location, scale, shape):
+    if scale == 1.0:
+        return location
+    height, width = shape[:2]
+    top, right, bottom, left = (int(round(v / scale)) for v in location)
+    return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+
+def locate_faces(image, endpoint):
+    """
+    Detecta caras en `image` según la configuración del endpoint.
+    Devuelve las cajas (top, right, bottom, left) en coordenadas de la imagen original.
+    """
+    face_recognition = get_face_recognition()
+    config = get_pipeline_config(endpoint)
+    with etapa("detect"):
+        small, scale = downscale(image, config["max_dimension"])
+        locations = face_recognition.face_locations(
+            small, number_of_times_to_upsample=config["upsample"], model=config["model"]
+        )
+    return [_to_full_resolution(loc, scale, image.shape) for loc in locations]
+
+
+def locate_face(image, endpoint):
+    """Caja de la cara más grande de la imagen, o None si no hay ninguna."""
+    locations = locate_faces(image, endpoint)
+    if not locations:
+        return None
+    return max(locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+
+
+def encode_face(image, endpoint):
+    """
+    Encoding (np.ndarray de 128 floats) de la cara principal de la imagen,
+    o None si no se detectó ninguna cara.
+    """
+    location = locate_face(image, endpoint)
+    if location is None:
+        return None
+    with etapa("encode"):
+        encodings = get_face_recognition().face_encodings(image, known_face_locations=[location])
+    if not encodings:
+        return None
+    return encodings[0]
+
+
+def encode_image_bytes(data, endpoint):
+    """
+    Decodifica `data` (bytes de la imagen) y devuelve el encoding como lista de
+    floats, o None si no hay cara. Lanza InvalidImage si no es una imagen válida.
+    """
+    try:
+        with etapa("decode"):
+            image = load_image(io.BytesIO(data))
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        raise InvalidImage(str(e)) from e
+    registrar_dimensiones(image.shape[1], image.shape[0])
+    return _encode_cached(image, endpoint)
+
+
+def _encode_cached(image, endpoint):
+    """encode_face como lista, pasando antes por la caché por contenido."""
+    from .embedding_cache import clave_imagen, embedding_cache
+
+    with etapa("hash"):
+        key = clave_imagen(image, endpoint)
+    encontrado, encoding = embedding_cache.get(key)
+    registrar_cache(encontrado)
+    if encontrado:
+        return encoding
+    encoding = encode_face(image, endpoint)
+    encoding = encoding.tolist() if encoding is not None else None
+    embedding_cache.set(key, encoding)
+    return encoding
+
+
+def encode_image_file(path, endpoint="embedding"):
+    """
+    Carga una imagen desde disco y devuelve su encoding como lista de floats
+    (o None si no hay cara). Pensado para ejecutarse en procesos de un pool.
+    """
+    with open(path, "rb") as fh:
+        image = load_image(fh)
+    return _encode_cached(image, endpoint)
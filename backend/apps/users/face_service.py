@@ -0,0 +1,207 @@
+# apps/users/face_service.py
+"""
+Servicio local de inferencia facial.
+
+`manage.py servidor_rostros` levanta un pool de procesos con los modelos de
+dlib precargados y lo expone en un socket Unix (FACE_INFERENCE_SOCKET). Las
+vistas de rostro y el worker de embeddings le envían los bytes de la imagen en
+lugar de ejecutar la detección en su propio proceso, de modo que la carga de CPU
+queda aislada del tráfico normal de la API y se dimensiona aparte.
+
+El servidor acepta como máximo `max_pending` peticiones en curso; por encima
+responde "busy" de inmediato (backpressure) y el cliente lo traduce a
+FaceServiceBusy. Si FACE_INFERENCE_SOCKET no está configurado, encode()
+ejecuta la inferencia en el proceso actual.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+import django
+from django.conf import settings
+
+from . import face_metrics, face_processing
+
+logger = logging.getLogger(__name__)
+
+
+class FaceServiceError(Exception):
+    """Error al comunicarse con el servicio de inferencia."""
+
+
+class FaceServiceBusy(FaceServiceError):
+    """El servicio tiene la cola llena; el cliente debe reintentar más tarde."""
+
+
+class FaceServiceTimeout(FaceServiceError):
+    """El servicio no respondió dentro del tiempo límite."""
+
+
+def _authkey():
+    key = getattr(settings, "FACE_INFERENCE_AUTHKEY", None) or settings.SECRET_KEY
+    return key.encode("utf-8")
+
+
+def encode(data, endpoint, timeout=None):
+    """
+    Encoding (lista de 128 floats) de la cara principal de la imagen `data`
+    (bytes), o None si no hay cara. Lanza face_processing.InvalidImage si la
+    imagen no es válida y FaceServiceError si el servicio remoto falla.
+    """
+    address = getattr(settings, "FACE_INFERENCE_SOCKET", None)
+    if not address:
+        return face_processing.encode_image_bytes(data, endpoint)
+
+    if timeout is None:
+        timeout = getattr(settings, "FACE_INFERENCE_TIMEOUT", 10)
+    try:
+        conn = Client(address, family="AF_UNIX", authkey=_authkey())
+    except OSError as e:
+        raise FaceServiceError(f"No se pudo conectar al servicio de rostros: {e}") from e
+
+    inicio = time.perf_counter()
+    with conn:
+        conn.send({"op": "encode", "endpoint": endpoint, "image": bytes(data), "timeout": timeout})
+        if not conn.poll(timeout):
+            raise FaceServiceTimeout(f"Sin respuesta del servicio de rostros en {timeout}s")
+        try:
+            response = conn.recv()
+        except EOFError as e:
+            raise FaceServiceError("El servicio de rostros cerró la conexión") from e
+
+    # Tiempos medidos dentro del servicio + lo que costó ir y volver (socket y cola)
+    metricas = response.get("metricas") or {}
+    remoto = sum((metricas.get("etapas") or {}).values())
+    face_metrics.fusionar(metricas)
+    captura = face_metrics.captura_actual()
+    if captura is not None:
+        captura.sumar("ipc", max(0.0, time.perf_counter() - inicio - remoto))
+
+    if response.get("ok"):
+        return response.get("encoding")
+    error = response.get("error")
+    if error == "busy":
+        raise FaceServiceBusy("Servicio de rostros saturado")
+    if error == "timeout":
+        raise FaceServiceTimeout(f"El servicio de rostros no terminó en {timeout}s")
+    if error == "invalid_image":
+        raise face_processing.InvalidImage(response.get("detail", ""))
+    raise FaceServiceError(response.get("detail") or error or "Error desconocido")
+
+
+def _init_worker():
+    django.setup()
+    face_processing.warm_up()
+
+
+def _noop():
+    return os.getpid()
+
+
+def _encode_job(data, endpoint):
+    """Se ejecuta dentro de un proceso del pool."""
+    with face_metrics.capturar() as captura:
+        try:
+            encoding = face_processing.encode_image_bytes(data, endpoint)
+        except face_processing.InvalidImage as e:
+            return {"ok": False, "error": "invalid_image", "detail": str(e)}
+        except Exception as e:
+            logger.exception("Error en inferencia facial")
+            return {"ok": False, "error": "internal", "detail": str(e)}
+    return {"ok": True, "encoding": encoding, "metricas": captura.as_dict()}
+
+
+class FaceInferenceServer:
+    def __init__(self, address, workers, max_pending):
+        self.address = address
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # Arrancamos los procesos (y cargamos los modelos) antes de aceptar conexiones.
+        for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+        try:
+            # Sin authkey en el Listener: el desafío se hace en el hilo de cada
+            # conexión, así un cliente lento no frena el accept de los demás.
+            with Listener(self.address, family="AF_UNIX") as listener:
+                os.chmod(self.address, 0o660)
+                logger.info("Servicio de rostros escuchando en %s con %s procesos", self.address, self.workers)
+                while True:
+                    try:
+                        conn = listener.accept()
+                    except OSError as e:
+                        logger.warning("Error al aceptar conexión: %s", e)
+                        continue
+                    threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            with self._pool_lock:
+                self._pool.shutdown(cancel_futures=True)
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                deliver_challenge(conn, _authkey())
+                answer_challenge(conn, _authkey())
+            except (AuthenticationError, EOFError, OSError) as e:
+                logger.warning("Conexión rechazada: %s", e)
+                return
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(self._dispatch(request))
+                except (BrokenPipeError, OSError):
+                    # El cliente se fue (timeout); el resultado se descarta.
+                    return
+
+    def _replace_pool(self, broken):
+        """Cambia el pool roto por uno nuevo (una sola vez aunque fallen varios hilos a la vez)."""
+        with self._pool_lock:
+            if self._pool is not broken:
+                return
+            logger.error("Pool de inferencia roto, recreándolo")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op != "encode":
+            return {"ok": False, "error": "bad_request", "detail": f"Operación desconocida: {op}"}
+
+        if not self._slots.acquire(blocking=False):
+            return {"ok": False, "error": "busy"}
+        pool = self._pool
+        try:
+            future = pool.submit(_encode_job, request["image"], request.get("endpoint", "login"))
+        except BrokenProcessPool as e:
+            self._slots.release()
+            self._replace_pool(pool)
+            return {"ok": False, "error": "internal", "detail": str(e)}
+        # El cupo se libera cuando el trabajo termina de verdad (o se cancela),
+        # no cuando el cliente deja de esperarlo.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            # Mismo plazo que el cliente: pasado ese tiempo nadie espera el resultado
+            return future.result(timeout=request.get("timeout"))
+        except FutureTimeoutError:
+            # Si aún no empezó se descarta; si ya corre, sigue ocupando su cupo hasta terminar
+            future.cancel()
+            return {"ok": False, "error": "timeout"}
+        except BrokenProcessPool as e:
+            self._replace_pool(pool)
+            return {"ok": False, "error": "internal", "detail": str(e)}
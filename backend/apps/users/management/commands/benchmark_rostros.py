@@ -0,0 +1,233 @@
+# apps/users/management/commands/benchmark_rostros.py
+import io
+import json
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from apps.users import face_processing
+from apps.users.face_index import EMBEDDING_DIM, FaceEmbeddingIndex
+from apps.users.models import Profile
+from apps.users.services import buscar_rostro_cercano
+
+User = get_user_model()
+
+EXTENSIONES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+ESTRATEGIAS = ("memory", "pgvector", "pgvector_exacto")
+ETAPAS = ("decode", "detect", "encode", "match", "total")
+
+
+def _ms(segundos):
+    return segundos * 1000.0
+
+
+def _percentiles(valores):
+    arr = np.asarray(valores, dtype=np.float64)
+    return float(np.percentile(arr, 50)), float(np.percentile(arr, 95))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark del pipeline de login facial. Siembra N embeddings sintéticos "
+        "(por defecto 1k, 10k y 100k), reproduce un conjunto fijo de imágenes locales "
+        "y reporta p50/p95 por etapa (decode, detect, encode, match) y el throughput "
+        "para cada estrategia de búsqueda. Los datos sembrados en la BD se descartan "
+        "al terminar (la transacción se revierte). Con --max-p95 sirve de gate antes de un deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--imagenes",
+            default=os.path.join(str(settings.MEDIA_ROOT), "profile_photos"),
+            help="Directorio (recursivo) con las imágenes de prueba.",
+        )
+        parser.add_argument("--poblaciones", default="1000,10000,100000", help="Tamaños de población separados por coma.")
+        parser.add_argument(
+            "--estrategias", default=",".join(ESTRATEGIAS),
+            help="memory (índice en memoria), pgvector (índice HNSW) y/o pgvector_exacto (scan secuencial).",
+        )
+        parser.add_argument("--repeticiones", type=int, default=3, help="Veces que se reproduce cada imagen.")
+        parser.add_argument("--endpoint", default="login", help="Configuración de FACE_PIPELINES a medir.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--max-p95", type=float, help="Falla si el p95 total (ms) de alguna combinación lo supera.")
+        parser.add_argument("--json", dest="salida_json", help="Guarda los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        estrategias = [e.strip() for e in options["estrategias"].split(",") if e.strip()]
+        invalidas = set(estrategias) - set(ESTRATEGIAS)
+        if invalidas:
+            raise CommandError(f"Estrategias desconocidas: {', '.join(sorted(invalidas))}")
+        try:
+            poblaciones = sorted({int(n) for n in options["poblaciones"].split(",") if n.strip()})
+        except ValueError:
+            raise CommandError("--poblaciones debe ser una lista de enteros separados por coma.")
+        if not poblaciones:
+            raise CommandError("Indica al menos un tamaño de población.")
+
+        imagenes = self._leer_imagenes(options["imagenes"])
+        face_processing.warm_up()
+
+        self.stdout.write(f"Procesando {len(imagenes)} imágenes x {options['repeticiones']} repeticiones...")
+        muestras = self._medir_pipeline(imagenes, options["repeticiones"], options["endpoint"])
+        encodings = [m["encoding"] for m in muestras if m["encoding"] is not None]
+        if not encodings:
+            raise CommandError("No se detectó ninguna cara en las imágenes de prueba.")
+
+        rng = np.random.default_rng(options["seed"])
+        tolerancia = getattr(settings, "FACE_MATCH_TOLERANCE", 0.5)
+        resultados = []
+
+        if "memory" in estrategias:
+            for n in poblaciones:
+                vectores = self._poblacion(rng, n, encodings)
+                indice = FaceEmbeddingIndex()
+                indice.load(range(1, n + 1), vectores)
+                tiempos = self._medir_match(muestras, lambda enc: indice.best_match(enc, tolerancia))
+                resultados.append(self._resumir("memory", n, muestras, tiempos))
+
+        sql = [e for e in estrategias if e != "memory"]
+        if sql:
+            resultados.extend(self._benchmark_pgvector(sql, poblaciones, muestras, encodings, rng))
+
+        self._imprimir(resultados)
+        if options["salida_json"]:
+            with open(options["salida_json"], "w", encoding="utf-8") as fh:
+                json.dump(resultados, fh, indent=2)
+
+        if options["max_p95"] is not None:
+            fallas = [r for r in resultados if r["total"]["p95_ms"] > options["max_p95"]]
+            if fallas:
+                detalle = ", ".join(f"{r['estrategia']}@{r['poblacion']}={r['total']['p95_ms']:.1f}ms" for r in fallas)
+                raise CommandError(f"p95 total por encima de {options['max_p95']}ms: {detalle}")
+            self.stdout.write(self.style.SUCCESS(f"OK: todos los p95 totales <= {options['max_p95']}ms"))
+
+    def _leer_imagenes(self, carpeta):
+        if not os.path.isdir(carpeta):
+            raise CommandError(f"No existe el directorio de imágenes: {carpeta}")
+        rutas = []
+        for raiz, _, archivos in os.walk(carpeta):
+            rutas.extend(
+                os.path.join(raiz, nombre) for nombre in archivos
+                if os.path.splitext(nombre)[1].lower() in EXTENSIONES
+            )
+        if not rutas:
+            raise CommandError(f"No hay imágenes en {carpeta}")
+        imagenes = []
+        for ruta in sorted(rutas):
+            with open(ruta, "rb") as fh:
+                imagenes.append((ruta, fh.read()))
+        return imagenes
+
+    def _medir_pipeline(self, imagenes, repeticiones, endpoint):
+        """Decode, detect y encode no dependen de la población: se miden una vez."""
+        face_recognition = face_processing.get_face_recognition()
+        muestras = []
+        for _ in range(repeticiones):
+            for ruta, data in imagenes:
+                t0 = time.perf_counter()
+                image = face_processing.load_image(io.BytesIO(data))
+                t1 = time.perf_counter()
+                location = face_processing.locate_face(image, endpoint)
+                t2 = time.perf_counter()
+                encoding = None
+                if location is not None:
+                    encodings = face_recognition.face_encodings(image, known_face_locations=[location])
+                    encoding = encodings[0] if encodings else None
+                t3 = time.perf_counter()
+                muestras.append({
+                    "ruta": ruta, "encoding": encoding,
+                    "decode": t1 - t0, "detect": t2 - t1, "encode": t3 - t2,
+                })
+        return muestras
+
+    def _poblacion(self, rng, n, encodings):
+        """
+        N embeddings sintéticos con una escala parecida a la de dlib. Los primeros
+        corresponden a las caras de prueba (con un poco de ruido) para que el
+        benchmark incluya coincidencias reales y no solo rechazos.
+        """
+        vectores = rng.normal(0.0, 0.09, size=(n, EMBEDDING_DIM)).astype(np.float32)
+        unicos = np.unique(np.asarray(encodings, dtype=np.float32), axis=0)[:n]
+        vectores[:len(unicos)] = unicos + rng.normal(0.0, 0.01, size=unicos.shape).astype(np.float32)
+        return vectores
+
+    def _medir_match(self, muestras, buscar):
+        tiempos = []
+        for muestra in muestras:
+            if muestra["encoding"] is None:
+                tiempos.append(0.0)
+                continue
+            t0 = time.perf_counter()
+            buscar(muestra["encoding"])
+            tiempos.append(time.perf_counter() - t0)
+        return tiempos
+
+    def _benchmark_pgvector(self, estrategias, poblaciones, muestras, encodings, rng):
+        """
+        Siembra usuarios y perfiles dentro de una transacción que se revierte al
+        final; la población crece de forma incremental hasta el mayor tamaño pedido.
+        """
+        resultados = []
+        with transaction.atomic():
+            base = Profile.objects.filter(embedding__isnull=False).count()
+            vectores = self._poblacion(rng, poblaciones[-1], encodings)
+            sembrados = 0
+            for n in poblaciones:
+                self._sembrar(vectores[sembrados:n], sembrados)
+                sembrados = n
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {Profile._meta.db_table}")
+                for estrategia in estrategias:
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SET LOCAL enable_indexscan = %s",
+                            ["off" if estrategia == "pgvector_exacto" else "on"],
+                        )
+                    with override_settings(FACE_MATCH_BACKEND="pgvector"):
+                        tiempos = self._medir_match(muestras, buscar_rostro_cercano)
+                    resultados.append(self._resumir(estrategia, n, muestras, tiempos, existentes=base))
+            transaction.set_rollback(True)
+        return resultados
+
+    def _sembrar(self, vectores, desde, lote=5000):
+        self.stdout.write(f"  Sembrando {len(vectores)} perfiles sintéticos...")
+        for inicio in range(0, len(vectores), lote):
+            bloque = vectores[inicio:inicio + lote]
+            usuarios = User.objects.bulk_create([
+                User(username=f"bench_rostro_{desde + inicio + i}", password="!")
+                for i in range(len(bloque))
+            ])
+            Profile.objects.bulk_create([
+                Profile(user=usuario, embedding=vector, embedding_status="ready")
+                for usuario, vector in zip(usuarios, bloque)
+            ])
+
+    def _resumir(self, estrategia, n, muestras, tiempos_match, existentes=0):
+        resumen = {"estrategia": estrategia, "poblacion": n + existentes}
+        series = {etapa: [m[etapa] for m in muestras] for etapa in ("decode", "detect", "encode")}
+        series["match"] = tiempos_match
+        series["total"] = [
+            m["decode"] + m["detect"] + m["encode"] + t for m, t in zip(muestras, tiempos_match)
+        ]
+        for etapa in ETAPAS:
+            p50, p95 = _percentiles(series[etapa])
+            resumen[etapa] = {"p50_ms": _ms(p50), "p95_ms": _ms(p95)}
+        total = sum(series["total"])
+        resumen["throughput_img_s"] = len(muestras) / total if total else 0.0
+        return resumen
+
+    def _imprimir(self, resultados):
+        cabecera = f"{'estrategia':<16}{'N':>9}" + "".join(f"{e + ' p50/p95':>22}" for e in ETAPAS) + f"{'img/s':>9}"
+        self.stdout.write(cabecera)
+        for r in resultados:
+            fila = f"{r['estrategia']:<16}{r['poblacion']:>9}"
+            for etapa in ETAPAS:
+                fila += f"{r[etapa]['p50_ms']:>12.2f}/{r[etapa]['p95_ms']:<9.2f}"
+            fila += f"{r['throughput_img_s']:>9.2f}"
+            self.stdout.write(fila)
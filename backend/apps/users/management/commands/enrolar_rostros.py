@@ -0,0 +1,173 @@
+# apps/users/management/commands/enrolar_rostros.py
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+
+from apps.users import face_processing
+from apps.users.models import Profile
+from apps.users.services import reemplazar_embeddings
+
+User = get_user_model()
+
+EXTENSIONES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def _init_worker():
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado.
+    django.setup()
+
+
+def _procesar_archivo(path):
+    """Se ejecuta en el pool: devuelve (path, resultado, embedding, detalle)."""
+    try:
+        embedding = face_processing.encode_image_file(path, "embedding")
+    except Exception as e:
+        return path, "error", None, str(e)
+    if embedding is None:
+        return path, "no_face", None, "No se detectó ninguna cara"
+    return path, "ok", embedding, ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Enrola rostros en bloque. ORIGEN es un directorio con fotos nombradas "
+        "<username o email>.<ext>, o un CSV con columnas 'usuario,foto'. "
+        "La detección/encoding se reparte entre todos los núcleos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("origen", help="Directorio de fotos o archivo CSV.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=200, help="Perfiles por bulk_update.")
+        parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto <origen>.checkpoint.jsonl).")
+        parser.add_argument("--reporte", help="CSV de salida con el resultado por archivo (por defecto <origen>.reporte.csv).")
+
+    def handle(self, *args, **options):
+        origen = os.path.abspath(options["origen"])
+        base = origen.rstrip(os.sep)
+        checkpoint_path = options["checkpoint"] or f"{base}.checkpoint.jsonl"
+        reporte_path = options["reporte"] or f"{base}.reporte.csv"
+
+        entradas = self._leer_entradas(origen)
+        hechos = self._leer_checkpoint(checkpoint_path)
+        # Usuarios con fotos ya guardadas por una ejecución interrumpida: no se les borra lo hecho
+        usuarios_hechos = {usuario.lower() for usuario, path in entradas if path in hechos}
+        entradas = [(usuario, path) for usuario, path in entradas if path not in hechos]
+        if not entradas:
+            self.stdout.write("Nada que procesar (todo figura en el checkpoint).")
+            return
+
+        perfiles = self._resolver_perfiles({usuario for usuario, _ in entradas})
+        # Perfiles cuyo embedding "enrolamiento" ya se reemplazó en esta pasada: sus
+        # fotos de lotes siguientes se agregan en vez de borrar las anteriores
+        self._reemplazados = {perfiles[u] for u in usuarios_hechos if u in perfiles}
+        pendientes = {}
+        resultados = []
+        for usuario, path in entradas:
+            profile_id = perfiles.get(usuario.lower())
+            if profile_id is None:
+                resultados.append((path, usuario, "usuario_no_encontrado", ""))
+            else:
+                pendientes[path] = (usuario, profile_id)
+
+        self.stdout.write(f"Procesando {len(pendientes)} fotos con {options['workers']} procesos...")
+        # Los procesos hijos no deben heredar la conexión abierta a la BD.
+        connections.close_all()
+
+        lote = []
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+                ProcessPoolExecutor(max_workers=options["workers"], initializer=_init_worker) as pool:
+            for path, resultado, embedding, detalle in pool.map(_procesar_archivo, list(pendientes), chunksize=4):
+                usuario, profile_id = pendientes[path]
+                resultados.append((path, usuario, resultado, detalle))
+                if resultado == "ok":
+                    lote.append((path, profile_id, embedding))
+                elif resultado == "no_face":
+                    checkpoint.write(json.dumps({"path": path, "resultado": resultado}) + "\n")
+                if len(lote) >= options["batch_size"]:
+                    self._guardar_lote(lote, checkpoint)
+                    lote = []
+            if lote:
+                self._guardar_lote(lote, checkpoint)
+
+        self._escribir_reporte(reporte_path, resultados)
+        totales = {}
+        for _, _, resultado, _ in resultados:
+            totales[resultado] = totales.get(resultado, 0) + 1
+        resumen = ", ".join(f"{k}={v}" for k, v in sorted(totales.items()))
+        self.stdout.write(self.style.SUCCESS(f"Enrolamiento terminado: {resumen}. Reporte: {reporte_path}"))
+
+    def _leer_entradas(self, origen):
+        """Lista de (usuario, ruta_absoluta_foto)."""
+        if os.path.isdir(origen):
+            entradas = []
+            for nombre in sorted(os.listdir(origen)):
+                stem, ext = os.path.splitext(nombre)
+                if ext.lower() in EXTENSIONES:
+                    entradas.append((stem, os.path.join(origen, nombre)))
+            return entradas
+
+        if not os.path.isfile(origen):
+            raise CommandError(f"No existe: {origen}")
+
+        carpeta = os.path.dirname(origen)
+        with open(origen, newline="", encoding="utf-8-sig") as fh:
+            reader = csv.DictReader(fh)
+            if not reader.fieldnames or not {"usuario", "foto"} <= set(reader.fieldnames):
+                raise CommandError("El CSV debe tener las columnas 'usuario' y 'foto'.")
+            return [
+                (fila["usuario"].strip(), os.path.join(carpeta, fila["foto"].strip()))
+                for fila in reader
+                if fila.get("usuario") and fila.get("foto")
+            ]
+
+    def _leer_checkpoint(self, path):
+        if not os.path.exists(path):
+            return set()
+        hechos = set()
+        with open(path, encoding="utf-8") as fh:
+            for linea in fh:
+                try:
+                    hechos.add(json.loads(linea)["path"])
+                except (ValueError, KeyError):
+                    continue
+        return hechos
+
+    def _resolver_perfiles(self, usuarios):
+        """username/email (en minúsculas) -> profile_id, en una sola consulta."""
+        if not usuarios:
+            return {}
+        filtro = Q(user__username__in=usuarios) | Q(user__email__in=usuarios)
+        perfiles = {}
+        for profile_id, username, email in Profile.objects.filter(filtro).values_list("id", "user__username", "user__email"):
+            perfiles[username.lower()] = profile_id
+            if email:
+                perfiles.setdefault(email.lower(), profile_id)
+        return perfiles
+
+    def _guardar_lote(self, lote, checkpoint):
+        # Reejecutar el enrolamiento reemplaza el embedding anterior de este origen, no lo duplica;
+        # las fotos de un mismo usuario repartidas en varios lotes se suman
+        reemplazar_embeddings(
+            [(profile_id, embedding, None) for _, profile_id, embedding in lote], "enrolamiento",
+            conservar=self._reemplazados,
+        )
+        self._reemplazados.update(profile_id for _, profile_id, _ in lote)
+        # Solo después de confirmar en la BD marcamos los archivos como hechos.
+        for path, _, _ in lote:
+            checkpoint.write(json.dumps({"path": path, "resultado": "ok"}) + "\n")
+        checkpoint.flush()
+        self.stdout.write(f"  {len(lote)} embeddings guardados")
+
+    def _escribir_reporte(self, path, resultados):
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["archivo", "usuario", "resultado", "detalle"])
+            writer.writerows(resultados)
@@ -0,0 +1,98 @@
+# apps/users/management/commands/procesar_embeddings.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.users.models import Profile, EmbeddingJob
+from apps.users.services import calcular_embedding_foto, reemplazar_embeddings
+
+
+class Command(BaseCommand):
+    help = "Worker que procesa por lotes la cola de trabajos de embedding facial (EmbeddingJob)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20, help="Trabajos reclamados por lote.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--max-attempts", type=int, default=3, help="Reintentos antes de marcar el trabajo como fallido.")
+        parser.add_argument("--stale-after", type=int, default=600,
+                            help="Segundos tras los que un trabajo 'processing' se considera abandonado y se reencola.")
+        parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            self._reencolar_abandonados(options["stale_after"])
+            jobs = self._reclamar_lote(batch_size)
+            for job in jobs:
+                self._procesar(job, options["max_attempts"])
+
+            if options["once"] and not jobs:
+                break
+            if not jobs:
+                time.sleep(options["sleep"])
+
+    def _reencolar_abandonados(self, stale_after):
+        limite = timezone.now() - timedelta(seconds=stale_after)
+        EmbeddingJob.objects.filter(status="processing", started_at__lt=limite).update(status="pending")
+
+    def _reclamar_lote(self, batch_size):
+        """
+        Toma hasta batch_size trabajos pendientes con SKIP LOCKED, de modo que
+        varios workers pueden correr a la vez sin procesar el mismo trabajo.
+        """
+        with transaction.atomic():
+            jobs = list(
+                EmbeddingJob.objects.select_for_update(skip_locked=True)
+                .filter(status="pending")
+                .order_by("requested_at")[:batch_size]
+            )
+            if jobs:
+                EmbeddingJob.objects.filter(pk__in=[j.pk for j in jobs]).update(
+                    status="processing", started_at=timezone.now(), attempts=F("attempts") + 1
+                )
+        return jobs
+
+    def _procesar(self, job, max_attempts):
+        profile = Profile.objects.filter(pk=job.profile_id).only("id", "user_id", "foto").first()
+        if profile is None or not profile.foto:
+            EmbeddingJob.objects.filter(pk=job.pk, requested_at=job.requested_at).delete()
+            return
+
+        try:
+            embedding = calcular_embedding_foto(profile.foto)
+        except Exception as e:
+            intentos = job.attempts + 1
+            estado = "failed" if intentos >= max_attempts else "pending"
+            with transaction.atomic():
+                actualizado = EmbeddingJob.objects.filter(pk=job.pk, requested_at=job.requested_at).update(
+                    status=estado, error=str(e), finished_at=timezone.now()
+                )
+                if actualizado and estado == "failed":
+                    Profile.objects.filter(pk=profile.pk).update(embedding_status="failed")
+            self.stderr.write(f"Profile {profile.pk}: error generando embedding ({intentos}/{max_attempts}): {e}")
+            return
+
+        with transaction.atomic():
+            # Si llegó otra foto mientras procesábamos, requested_at cambió y el
+            # trabajo sigue pendiente: descartamos este resultado.
+            actualizado = EmbeddingJob.objects.filter(pk=job.pk, requested_at=job.requested_at).update(
+                status="done", error=None, finished_at=timezone.now()
+            )
+            if not actualizado:
+                return
+            Profile.objects.filter(pk=profile.pk).update(
+                embedding_status="ready" if embedding is not None else "no_face",
+                embedding_version=settings.FACE_EMBEDDING_VERSION,
+            )
+            # Reemplaza el embedding de la foto de perfil anterior; los demás del usuario se conservan
+            reemplazar_embeddings([(profile.pk, embedding, profile.foto.name)], "perfil")
+
+        if embedding is None:
+            self.stdout.write(f"Profile {profile.pk}: no se detectó cara")
+        else:
+            self.stdout.write(f"Profile {profile.pk}: embedding generado")
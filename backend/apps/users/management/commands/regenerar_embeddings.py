@@ -0,0 +1,163 @@
+# apps/users/management/commands/regenerar_embeddings.py
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users import face_processing
+
+
+def _init_worker():
+    django.setup()
+    face_processing.warm_up()
+
+
+def _procesar(tipo, clave, foto):
+    """Se ejecuta en el pool: devuelve (tipo, clave, foto, resultado, embedding, detalle)."""
+    # Importe aquí: el módulo se carga en el hijo antes de que _init_worker llame a django.setup()
+    from apps.users.models import Profile
+
+    storage = Profile._meta.get_field("foto").storage
+    try:
+        with storage.open(foto, "rb") as fh:
+            data = fh.read()
+        embedding = face_processing.encode_image_bytes(data, "embedding")
+    except Exception as e:
+        return tipo, clave, foto, "error", None, str(e)
+    return tipo, clave, foto, ("ok" if embedding is not None else "no_face"), embedding, ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera en paralelo los embeddings que no estén en la versión indicada (por "
+        "defecto settings.FACE_EMBEDDING_VERSION): la foto de perfil de cada usuario y "
+        "los demás FaceEmbedding que conservan su foto. Cada registro queda marcado con "
+        "la versión al guardarse, así que si el comando se interrumpe basta con volver "
+        "a ejecutarlo para continuar donde quedó."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--version", dest="version_objetivo", default=None,
+                            help="Versión objetivo (por defecto settings.FACE_EMBEDDING_VERSION).")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Filas por lectura del cursor.")
+        parser.add_argument("--batch-size", type=int, default=200, help="Resultados por guardado en bloque.")
+
+    def handle(self, *args, **options):
+        from apps.users.models import FaceEmbedding, Profile
+
+        version = options["version_objetivo"] or settings.FACE_EMBEDDING_VERSION
+        perfiles = (
+            Profile.objects.exclude(foto__isnull=True).exclude(foto="")
+            .exclude(embedding_version=version)
+            .order_by("pk")
+            .values_list("pk", "foto")
+        )
+        # Los embeddings de la foto de perfil se regeneran a través del Profile
+        miembros = (
+            FaceEmbedding.objects.exclude(origen="perfil")
+            .exclude(foto__isnull=True).exclude(foto="")
+            .exclude(embedding_version=version)
+            .order_by("pk")
+            .values_list("pk", "profile_id", "foto")
+        )
+        total = perfiles.count() + miembros.count()
+        if not total:
+            self.stdout.write(f"Todos los embeddings ya están en la versión {version}.")
+            return
+        self.stdout.write(f"Regenerando {total} embeddings a la versión {version} con {options['workers']} procesos...")
+
+        chunk = options["chunk_size"]
+        tareas = itertools.chain(
+            (("perfil", profile_id, foto) for profile_id, foto in perfiles.iterator(chunk_size=chunk)),
+            (("miembro", (pk, profile_id), foto) for pk, profile_id, foto in miembros.iterator(chunk_size=chunk)),
+        )
+
+        # "spawn": los procesos hijos no heredan la conexión a la BD que usa el cursor.
+        contexto = multiprocessing.get_context("spawn")
+        ventana = options["workers"] * 8
+        self._totales = {"ok": 0, "no_face": 0, "error": 0, "foto_cambiada": 0}
+        self._inicio = time.monotonic()
+        self._total = total
+        lote = []
+        with ProcessPoolExecutor(max_workers=options["workers"], mp_context=contexto, initializer=_init_worker) as pool:
+            en_curso = set()
+            for tarea in tareas:
+                en_curso.add(pool.submit(_procesar, *tarea))
+                # Ventana acotada: no encolamos 50k tareas en memoria de una vez.
+                if len(en_curso) >= ventana:
+                    hechos, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+                    lote.extend(f.result() for f in hechos)
+                    if len(lote) >= options["batch_size"]:
+                        self._guardar_lote(lote, version)
+                        lote = []
+            for futuro in en_curso:
+                lote.append(futuro.result())
+                if len(lote) >= options["batch_size"]:
+                    self._guardar_lote(lote, version)
+                    lote = []
+            if lote:
+                self._guardar_lote(lote, version)
+
+        resumen = ", ".join(f"{k}={v}" for k, v in self._totales.items())
+        duracion = time.monotonic() - self._inicio
+        self.stdout.write(self.style.SUCCESS(f"Regeneración terminada en {duracion:.0f}s: {resumen}"))
+        if self._totales["error"]:
+            self.stdout.write("Los registros con error conservan su versión anterior; vuelve a ejecutar el comando para reintentarlos.")
+
+    def _guardar_lote(self, lote, version):
+        from apps.users.models import FaceEmbedding, Profile
+        from apps.users.services import actualizar_centroides, reemplazar_embeddings
+
+        for tipo, clave, _, resultado, _, detalle in lote:
+            if resultado == "error":
+                self.stderr.write(f"{tipo} {clave}: {detalle}")
+
+        validos = [r for r in lote if r[3] != "error"]
+        de_perfil = [r for r in validos if r[0] == "perfil"]
+        de_miembro = [r for r in validos if r[0] == "miembro"]
+        guardados = 0
+        with transaction.atomic():
+            # Si la foto de perfil cambió mientras la procesábamos, el worker de la cola se encarga de ella.
+            actuales = dict(
+                Profile.objects.select_for_update()
+                .filter(pk__in=[r[1] for r in de_perfil])
+                .values_list("pk", "foto")
+            )
+            de_perfil = [r for r in de_perfil if actuales.get(r[1]) == r[2]]
+            Profile.objects.bulk_update([
+                Profile(pk=profile_id, embedding_status="ready" if resultado == "ok" else "no_face",
+                        embedding_version=version)
+                for _, profile_id, _, resultado, _, _ in de_perfil
+            ], ["embedding_status", "embedding_version"])
+            reemplazar_embeddings(
+                [(profile_id, embedding, foto) for _, profile_id, foto, _, embedding, _ in de_perfil],
+                "perfil", version=version,
+            )
+            guardados += len(de_perfil)
+
+            # Un embedding individual sin cara con el modelo nuevo se descarta
+            FaceEmbedding.objects.filter(pk__in=[r[1][0] for r in de_miembro if r[3] == "no_face"]).delete()
+            FaceEmbedding.objects.bulk_update([
+                FaceEmbedding(pk=clave[0], embedding=embedding, embedding_version=version)
+                for _, clave, _, resultado, embedding, _ in de_miembro
+                if resultado == "ok"
+            ], ["embedding", "embedding_version"])
+            actualizar_centroides({r[1][1] for r in de_miembro})
+            guardados += len(de_miembro)
+
+        for resultado in (r[3] for r in lote):
+            self._totales[resultado] += 1
+        self._totales["foto_cambiada"] += len(validos) - guardados
+
+        procesados = sum(v for k, v in self._totales.items() if k != "foto_cambiada")
+        transcurrido = time.monotonic() - self._inicio
+        ritmo = procesados / transcurrido if transcurrido else 0.0
+        restante = (self._total - procesados) / ritmo if ritmo else 0.0
+        self.stdout.write(f"  {procesados}/{self._total} ({ritmo:.1f}/s, ~{restante:.0f}s restantes)")
@@ -0,0 +1,38 @@
+# apps/users/management/commands/servidor_rostros.py
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.face_service import FaceInferenceServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta el servicio local de inferencia facial (pool de procesos con los "
+        "modelos precargados) en el socket Unix FACE_INFERENCE_SOCKET."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=getattr(settings, "FACE_INFERENCE_SOCKET", None),
+                            help="Ruta del socket Unix (por defecto FACE_INFERENCE_SOCKET).")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Procesos de inferencia (por defecto, número de núcleos).")
+        parser.add_argument("--max-pending", type=int, default=None,
+                            help="Peticiones en curso admitidas antes de responder 'busy' (por defecto 2 x workers).")
+
+    def handle(self, *args, **options):
+        address = options["socket"]
+        if not address:
+            raise CommandError("Indique --socket o configure FACE_INFERENCE_SOCKET.")
+        workers = max(1, options["workers"])
+        max_pending = options["max_pending"] or workers * 2
+
+        self.stdout.write(f"Servicio de rostros en {address}: {workers} procesos, hasta {max_pending} peticiones en curso")
+        try:
+            FaceInferenceServer(address, workers, max_pending).serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Servicio detenido")
+        finally:
+            if os.path.exists(address):
+                os.unlink(address)
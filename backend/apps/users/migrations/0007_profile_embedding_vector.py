@@ -0,0 +1,41 @@
+import pgvector.django
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_profile_embedding'),
+    ]
+
+    operations = [
+        pgvector.django.VectorExtension(),
+        migrations.AddField(
+            model_name='profile',
+            name='embedding_vector',
+            field=pgvector.django.VectorField(blank=True, dimensions=128, null=True),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "UPDATE users_profile SET embedding_vector = embedding::vector(128) "
+                "WHERE embedding IS NOT NULL AND array_length(embedding, 1) = 128"
+            ),
+            reverse_sql=(
+                "UPDATE users_profile SET embedding = embedding_vector::real[]::double precision[] "
+                "WHERE embedding_vector IS NOT NULL"
+            ),
+        ),
+        migrations.RemoveField(
+            model_name='profile',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='profile',
+            old_name='embedding_vector',
+            new_name='embedding',
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=pgvector.django.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='profile_embedding_hnsw', opclasses=['vector_l2_ops']),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_profile_embedding_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='embedding_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pendiente'), ('ready', 'Listo'), ('no_face', 'Sin rostro'), ('failed', 'Fallido')], max_length=20, null=True),
+        ),
+        migrations.RunSQL(
+            sql="UPDATE users_profile SET embedding_status = 'ready' WHERE embedding IS NOT NULL",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.CreateModel(
+            name='EmbeddingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'Procesando'), ('done', 'Terminado'), ('failed', 'Fallido')], default='pending', max_length=20)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='embedding_job', to='users.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'requested_at'], name='users_embed_status_183089_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_embedding_job'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='profile',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
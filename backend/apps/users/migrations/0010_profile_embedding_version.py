@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_profile_base_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='embedding_version',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
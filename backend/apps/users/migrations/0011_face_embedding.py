@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:46
+
+import django.db.models.deletion
+import pgvector.django.indexes
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_profile_embedding_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='embedding_spread',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FaceEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen', models.CharField(choices=[('perfil', 'Foto de perfil'), ('registro', 'Registro facial'), ('enrolamiento', 'Enrolamiento masivo')], max_length=20)),
+                ('foto', models.CharField(blank=True, max_length=255, null=True)),
+                ('embedding', pgvector.django.vector.VectorField(dimensions=128)),
+                ('embedding_version', models.CharField(blank=True, max_length=32, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='users.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'origen'], name='users_facee_profile_62d318_idx'), pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='faceembedding_hnsw', opclasses=['vector_l2_ops'])],
+            },
+        ),
+        # Cada embedding existente pasa a ser el primer FaceEmbedding ("perfil") de su usuario
+        migrations.RunSQL(
+            sql=(
+                "INSERT INTO users_faceembedding (profile_id, origen, foto, embedding, embedding_version, created_at) "
+                "SELECT id, 'perfil', NULLIF(foto, ''), embedding, embedding_version, NOW() "
+                "FROM users_profile WHERE embedding IS NOT NULL; "
+                "UPDATE users_profile SET embedding_spread = 0 WHERE embedding IS NOT NULL"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -2,10 +2,11 @@ from django.db import models
 from apps.core.models import BaseModel
 from django.contrib.auth.models import User
 from apps.facilidades.models import Unidad, ResidentesUnidad
-from django.contrib.postgres.fields import ArrayField
+from pgvector.django import VectorField, HnswIndex
 
 import uuid, os
 from django.conf import settings
+from django.utils import timezone
 
 def profile_photo_upload_to(instance, filename):
     base, ext = os.path.splitext(filename)
@@ -13,6 +14,23 @@ def profile_photo_upload_to(instance, filename):
     user_part = str(instance.user.id) if instance.user else uuid.uuid4().hex
     return os.path.join('profile_photos', user_part, new_name)
 
+class ProfileQuerySet(models.QuerySet):
+    def with_embedding(self):
+        """Incluye el embedding facial, que por defecto no se carga."""
+        return self.defer(None)
+
+
+class ProfileManager(models.Manager.from_queryset(ProfileQuerySet)):
+    """
+    El embedding (vector float32 de 128 dimensiones) solo lo necesitan el
+    reconocimiento facial y el worker de embeddings, que lo piden explícitamente;
+    el resto de consultas no lo trae de la BD.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer("embedding")
+
+
 class Profile(models.Model):
     ROLE_CHOICES = [
         ('admin', 'Administrador'),
@@ -22,11 +40,34 @@ class Profile(models.Model):
         ('guardia', 'Guardia'),
     ]
 
+    EMBEDDING_STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('ready', 'Listo'),
+        ('no_face', 'Sin rostro'),
+        ('failed', 'Fallido'),
+    ]
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default="residente")
     phone = models.CharField(max_length=20, blank=True, null=True)
     foto = models.ImageField(upload_to=profile_photo_upload_to, null=True, blank=True)
-    embedding = ArrayField(models.FloatField(), null=True, blank=True)
+    # Centroide de los embeddings del usuario (FaceEmbedding); es lo que se compara primero
+    embedding = VectorField(dimensions=128, null=True, blank=True)
+    # Distancia máxima de un embedding individual al centroide
+    embedding_spread = models.FloatField(null=True, blank=True)
+    embedding_status = models.CharField(max_length=20, choices=EMBEDDING_STATUS_CHOICES, null=True, blank=True)
+    # settings.FACE_EMBEDDING_VERSION con la que se calculó el embedding (o se determinó no_face)
+    embedding_version = models.CharField(max_length=32, null=True, blank=True)
+
+    objects = ProfileManager()
+
+    class Meta:
+        # También user.profile (acceso inverso) usa el manager que difiere el embedding
+        base_manager_name = 'objects'
+        indexes = [
+            # Búsqueda del rostro más cercano (distancia L2) sin recorrer toda la tabla
+            HnswIndex(name='profile_embedding_hnsw', fields=['embedding'], m=16, ef_construction=64, opclasses=['vector_l2_ops']),
+        ]
 
     def __str__(self):
         return self.user.username
@@ -42,7 +83,65 @@ class Profile(models.Model):
             'guardia': 'Guardia',
         }
         return mapping.get(self.role, 'Residente')
-      
+
+
+class FaceEmbedding(models.Model):
+    """
+    Embedding de una foto concreta del usuario. Un perfil puede tener varios
+    (foto de perfil, registros faciales con distinta luz, enrolamiento masivo);
+    Profile.embedding guarda su centroide.
+    """
+    ORIGEN_CHOICES = [
+        ('perfil', 'Foto de perfil'),
+        ('registro', 'Registro facial'),
+        ('enrolamiento', 'Enrolamiento masivo'),
+    ]
+
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="embeddings")
+    origen = models.CharField(max_length=20, choices=ORIGEN_CHOICES)
+    # Nombre del archivo en el storage de fotos, para poder regenerarlo (None si no se guardó)
+    foto = models.CharField(max_length=255, null=True, blank=True)
+    embedding = VectorField(dimensions=128)
+    embedding_version = models.CharField(max_length=32, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'origen']),
+            HnswIndex(name='faceembedding_hnsw', fields=['embedding'], m=16, ef_construction=64, opclasses=['vector_l2_ops']),
+        ]
+
+    def __str__(self):
+        return f"FaceEmbedding {self.profile_id} ({self.origen})"
+
+
+class EmbeddingJob(models.Model):
+    """
+    Trabajo pendiente de generación de embedding para un Profile.
+    Hay como máximo un trabajo por perfil: subir otra foto antes de que el
+    worker lo procese reinicia el mismo registro (las subidas se fusionan).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('processing', 'Procesando'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+    ]
+
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name="embedding_job")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'requested_at'])]
+
+    def __str__(self):
+        return f"EmbeddingJob {self.profile_id} ({self.status})"
+
 class Vehiculo(BaseModel):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name="vehiculos")
     unidad = models.ForeignKey(Unidad, on_delete=models.CASCADE, related_name="vehiculos")
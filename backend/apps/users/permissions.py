@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 class IsInRequiredGroup(permissions.BasePermission):
@@ -16,3 +19,14 @@ class IsInRequiredGroup(permissions.BasePermission):
             return False
         user_groups = request.user.groups.values_list("name", flat=True)
         return any(g in user_groups for g in required)
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """
+    Acceso con `Authorization: Token <FACE_METRICS_TOKEN>` (p. ej. el scraper de
+    Prometheus). Si el token no está configurado, nadie entra por esta vía.
+    """
+    def has_permission(self, request, view):
+        esperado = getattr(settings, "FACE_METRICS_TOKEN", "")
+        tipo, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+        return bool(esperado) and tipo == "Token" and hmac.compare_digest(token.strip().encode(), esperado.encode())
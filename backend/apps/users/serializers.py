@@ -191,13 +191,19 @@ class ProfileSerializer(serializers.ModelSerializer):
     #role = serializers.SerializerMethodField(read_only=True)
     #foto = serializers.ImageField(required=False, allow_null=True)
     foto_url = serializers.SerializerMethodField()
+    embedding = serializers.ListField(child=serializers.FloatField(), read_only=True)
 
     class Meta:
         model = Profile
-        fields = ['role', 'phone', 'foto', 'foto_url', 'embedding']
-        extra_kwargs = {
-            'embedding': {'read_only': True}
-        }
+        fields = ['role', 'phone', 'foto', 'foto_url', 'embedding', 'embedding_status', 'embedding_version']
+        read_only_fields = ['embedding_status', 'embedding_version']
+
+    def get_fields(self):
+        # El embedding solo se serializa si se pide (?include=embedding)
+        fields = super().get_fields()
+        if not self.context.get('include_embedding'):
+            fields.pop('embedding', None)
+        return fields
 
     def get_foto_url(self, obj):
         request = self.context.get('request')
@@ -0,0 +1,218 @@
+# apps/users/services.py
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from pgvector.django import L2Distance
+
+from . import face_service
+from .face_index import face_index
+from .models import Profile, EmbeddingJob, FaceEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+def buscar_rostro_cercano(encoding, tolerancia=None):
+    """
+    Devuelve (user_id, distancia) del rostro registrado más cercano a `encoding`
+    si está dentro de la tolerancia, o None.
+
+    Con FACE_MATCH_BACKEND="pgvector" la búsqueda se hace en SQL sobre el índice
+    HNSW de Profile.embedding (compartido por todos los workers); con "memory"
+    se usa el índice en memoria del proceso.
+    """
+    if tolerancia is None:
+        tolerancia = getattr(settings, "FACE_MATCH_TOLERANCE", 0.5)
+
+    if getattr(settings, "FACE_MATCH_BACKEND", "pgvector") == "memory":
+        return face_index.best_match(encoding, tolerancia)
+
+    consulta = np.asarray(encoding, dtype=np.float32)
+    # ORDER BY distancia LIMIT 1 es la forma que aprovecha el índice HNSW;
+    # la tolerancia se aplica después sobre el candidato devuelto.
+    fila = (
+        Profile.objects.filter(embedding__isnull=False)
+        .annotate(distancia=L2Distance("embedding", consulta))
+        .order_by("distancia")
+        .values_list("user_id", "distancia", "embedding_spread")
+        .first()
+    )
+    if fila is None:
+        return None
+    if fila[1] <= tolerancia:
+        return fila[0], float(fila[1])
+
+    # El centroide más cercano no alcanza: como en face_index, solo se revisan los
+    # embeddings individuales de los perfiles cuyo centroide queda a menos de
+    # tolerancia + dispersión (cota por desigualdad triangular).
+    candidatos = (
+        Profile.objects.filter(embedding__isnull=False)
+        .alias(cota=L2Distance("embedding", consulta) - Coalesce("embedding_spread", Value(0.0)))
+        .filter(cota__lte=tolerancia)
+        .values("pk")
+    )
+    fila = (
+        FaceEmbedding.objects.filter(profile__in=candidatos)
+        .annotate(distancia=L2Distance("embedding", consulta))
+        .order_by("distancia")
+        .values_list("profile__user_id", "distancia")
+        .first()
+    )
+    if fila is None or fila[1] > tolerancia:
+        return None
+    return fila[0], float(fila[1])
+
+
+def actualizar_centroides(profile_ids):
+    """
+    Recalcula centroide y dispersión de los perfiles indicados a partir de sus
+    FaceEmbedding (una consulta + un bulk_update) y actualiza el índice en memoria.
+    Los perfiles con embeddings quedan en estado "ready"; los que se quedan sin
+    ninguno pierden el centroide y conservan el estado que les haya puesto el llamador.
+    """
+    profile_ids = set(profile_ids)
+    if not profile_ids:
+        return
+    grupos = {}
+    filas = FaceEmbedding.objects.filter(profile_id__in=profile_ids).values_list("profile_id", "embedding")
+    for profile_id, embedding in filas.iterator(chunk_size=2000):
+        grupos.setdefault(profile_id, []).append(embedding)
+
+    user_ids = dict(Profile.objects.filter(pk__in=profile_ids).values_list("pk", "user_id"))
+    con_embeddings, sin_embeddings, cambios_indice = [], [], []
+    for profile_id in profile_ids:
+        if profile_id not in user_ids:
+            continue
+        miembros = grupos.get(profile_id)
+        if not miembros:
+            sin_embeddings.append(Profile(pk=profile_id, embedding=None, embedding_spread=None))
+            cambios_indice.append((user_ids[profile_id], None, None, None))
+            continue
+        miembros = np.asarray(miembros, dtype=np.float32)
+        centroide = miembros.mean(axis=0)
+        dispersion = float(np.linalg.norm(miembros - centroide, axis=1).max())
+        con_embeddings.append(Profile(
+            pk=profile_id, embedding=centroide, embedding_spread=dispersion, embedding_status="ready",
+        ))
+        cambios_indice.append((user_ids[profile_id], centroide, dispersion, miembros))
+
+    Profile.objects.bulk_update(con_embeddings, ["embedding", "embedding_spread", "embedding_status"], batch_size=500)
+    Profile.objects.bulk_update(sin_embeddings, ["embedding", "embedding_spread"], batch_size=500)
+
+    def _sincronizar_indice():
+        for user_id, centroide, dispersion, miembros in cambios_indice:
+            face_index.update(user_id, centroide, dispersion, miembros)
+    transaction.on_commit(_sincronizar_indice)
+
+
+def reemplazar_embeddings(items, origen, version=None, conservar=()):
+    """
+    Reemplaza, para cada perfil, sus FaceEmbedding del `origen` dado por el nuevo.
+    `items` es una lista de (profile_id, embedding o None, foto); con embedding
+    None el perfil simplemente se queda sin embeddings de ese origen. A los
+    perfiles de `conservar` no se les borra nada: los nuevos se agregan.
+    """
+    if not items:
+        return
+    if version is None:
+        version = settings.FACE_EMBEDDING_VERSION
+    profile_ids = {profile_id for profile_id, _, _ in items}
+    with transaction.atomic():
+        FaceEmbedding.objects.filter(profile_id__in=profile_ids - set(conservar), origen=origen).delete()
+        FaceEmbedding.objects.bulk_create([
+            FaceEmbedding(profile_id=profile_id, origen=origen, foto=foto or None,
+                          embedding=embedding, embedding_version=version)
+            for profile_id, embedding, foto in items
+            if embedding is not None
+        ], batch_size=500)
+        actualizar_centroides(profile_ids)
+
+
+def agregar_embedding(profile, embedding, origen="registro", foto=None):
+    """
+    Añade un embedding al conjunto del usuario. Se conservan como máximo
+    FACE_MAX_EMBEDDINGS por perfil: al superarlo se descartan los más antiguos
+    del mismo origen.
+    """
+    maximo = getattr(settings, "FACE_MAX_EMBEDDINGS", 5)
+    with transaction.atomic():
+        FaceEmbedding.objects.create(
+            profile=profile, origen=origen, foto=foto or None,
+            embedding=embedding, embedding_version=settings.FACE_EMBEDDING_VERSION,
+        )
+        sobrantes = list(
+            FaceEmbedding.objects.filter(profile=profile, origen=origen)
+            .order_by("-created_at", "-pk")
+            .values_list("pk", flat=True)[maximo:]
+        )
+        if sobrantes:
+            FaceEmbedding.objects.filter(pk__in=sobrantes).delete()
+        actualizar_centroides([profile.pk])
+
+
+_conteo_rostros = (None, 0)
+
+
+def contar_rostros_registrados():
+    """
+    Número de usuarios con rostro registrado, para etiquetar las métricas.
+    Con pgvector se consulta como mucho una vez por minuto.
+    """
+    global _conteo_rostros
+    if getattr(settings, "FACE_MATCH_BACKEND", "pgvector") == "memory":
+        return len(face_index)
+    medido_en, total = _conteo_rostros
+    if medido_en is None or time.monotonic() - medido_en > 60:
+        total = Profile.objects.filter(embedding__isnull=False).count()
+        _conteo_rostros = (time.monotonic(), total)
+    return total
+
+
+def encolar_embedding(profile):
+    """
+    Registra (o reinicia) el trabajo de embedding del perfil y lo marca como pendiente.
+    Si ya había un trabajo sin procesar para el mismo perfil se reutiliza, de modo
+    que varias subidas seguidas generan un solo cálculo.
+    """
+    ahora = timezone.now()
+    defaults = {
+        "status": "pending",
+        "requested_at": ahora,
+        "started_at": None,
+        "finished_at": None,
+        "attempts": 0,
+        "error": None,
+    }
+    try:
+        with transaction.atomic():
+            EmbeddingJob.objects.update_or_create(profile=profile, defaults=defaults)
+    except IntegrityError:
+        # Otro proceso creó el trabajo a la vez; basta con reiniciarlo.
+        EmbeddingJob.objects.filter(profile=profile).update(**defaults)
+    Profile.objects.filter(pk=profile.pk).update(embedding_status="pending")
+    profile.embedding_status = "pending"
+
+
+def calcular_embedding_foto(foto):
+    """
+    Calcula el embedding de la primera cara de un ImageField/File.
+    Devuelve la lista de 128 floats, o None si no se detectó ninguna cara.
+    Lanza excepción si la imagen no se puede abrir o procesar.
+    """
+    foto.open(mode='rb')
+    try:
+        data = foto.read()
+    finally:
+        try:
+            foto.close()
+        except Exception:
+            pass
+
+    # El worker de embeddings no tiene prisa: le damos más margen que a las vistas.
+    timeout = getattr(settings, "FACE_INFERENCE_TIMEOUT", 10) * 6
+    return face_service.encode(data, "embedding", timeout=timeout)
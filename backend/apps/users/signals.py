@@ -1,20 +1,16 @@
 # apps/users/signals.py
-from django.db.models.signals import post_save, pre_save, post_migrate
+from django.db.models.signals import post_save, pre_save, post_migrate, post_delete
 from django.contrib.auth.models import User, Group
 from django.dispatch import receiver
-from .models import Profile
+from .models import Profile, EmbeddingJob
+from .face_index import face_index
+from .services import encolar_embedding, reemplazar_embeddings
 from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
 import logging
-import io
 
 logger = logging.getLogger(__name__)
 
-try:
-    import face_recognition
-except Exception as e:
-    face_recognition = None
-    logger.warning("No se pudo importar face_recognition: %s. Los embeddings NO se generarán.", e)
-
 @receiver(post_save, sender=User)
 def ensure_profile_and_default_group(sender, instance, created, **kwargs):
     """
@@ -53,37 +49,51 @@ def profile_pre_save(sender, instance, **kwargs):
     if not instance.pk:
         # Nuevo profile
         instance._old_foto_name = None
+        instance._old_has_embedding = False
+        instance._old_embedding_status = None
         return
     try:
-        prev = Profile.objects.filter(pk=instance.pk).only("foto", "embedding").first()
-        instance._old_foto_name = prev.foto.name if (prev and prev.foto) else None
-        instance._old_embedding = prev.embedding if prev else None
+        # Solo necesitamos saber si hay embedding, no traer el vector
+        prev = (
+            Profile.objects.filter(pk=instance.pk)
+            .annotate(tiene_embedding=ExpressionWrapper(Q(embedding__isnull=False), output_field=BooleanField()))
+            .values("foto", "tiene_embedding", "embedding_status")
+            .first()
+        )
+        instance._old_foto_name = (prev["foto"] or None) if prev else None
+        instance._old_has_embedding = prev["tiene_embedding"] if prev else False
+        instance._old_embedding_status = prev["embedding_status"] if prev else None
     except Exception as e:
         instance._old_foto_name = None
-        instance._old_embedding = None
+        instance._old_has_embedding = False
+        instance._old_embedding_status = None
         logger.exception("Error al obtener profile previo para pk=%s: %s", getattr(instance, "pk", None), e)
 
 
+@receiver(post_delete, sender=Profile)
+def profile_post_delete_sync_face_index(sender, instance, **kwargs):
+    face_index.remove(instance.user_id)
+
+
 @receiver(post_save, sender=Profile)
-def profile_post_save_generate_embedding(sender, instance, created, **kwargs):
+def profile_post_save_enqueue_embedding(sender, instance, created, **kwargs):
     """
-    Genera/actualiza el embedding facial cuando:
+    Encola la generación del embedding facial cuando:
       - Se sube una foto nueva (foto cambia),
       - O cuando no existe embedding aún y hay una foto.
     Si la foto fue removida, limpia el embedding.
+    El cálculo (detección + encoding) lo hace el worker `procesar_embeddings`,
+    fuera del hilo de la petición.
     """
-    if face_recognition is None:
-        # No instalado o no disponible: no intentamos generar embeddings.
-        logger.debug("face_recognition no disponible, no se generará embedding para profile %s", instance.pk)
-        return
-
     try:
         new_name = instance.foto.name if instance.foto else None
         old_name = getattr(instance, "_old_foto_name", None)
 
-        # Caso: foto eliminada -> limpiar embedding si existía
-        if new_name is None and old_name is not None and instance.embedding:
-            Profile.objects.filter(pk=instance.pk).update(embedding=None)
+        # Caso: foto eliminada -> quitar su embedding (se conservan los de otros orígenes) y el trabajo pendiente
+        if new_name is None and old_name is not None:
+            Profile.objects.filter(pk=instance.pk).update(embedding_status=None, embedding_version=None)
+            EmbeddingJob.objects.filter(profile=instance).delete()
+            reemplazar_embeddings([(instance.pk, None, None)], "perfil")
             logger.info("Foto eliminada para profile %s -> embedding limpiado", instance.pk)
             return
 
@@ -91,49 +101,22 @@ def profile_post_save_generate_embedding(sender, instance, created, **kwargs):
         if new_name is None:
             return
 
+        # El embedding ya se calculó para esta foto (p. ej. FaceRegisterView)
+        if getattr(instance, "_embedding_calculado", False):
+            return
+
         # Si la foto no cambió y ya existe embedding, no regenerar (cerramos)
-        if old_name == new_name and instance.embedding:
+        if old_name == new_name and getattr(instance, "_old_has_embedding", False):
             logger.debug("Foto sin cambios y embedding existe para profile %s -> no regeneramos", instance.pk)
             return
 
-        # Abrimos la imagen (funciona con storages locales y remotos que provean file-like)
-        try:
-            # instance.foto.open() puede lanzar si storage remoto no accesible; capturamos.
-            instance.foto.open(mode='rb')
-            try:
-                image = face_recognition.load_image_file(instance.foto)
-            finally:
-                try:
-                    instance.foto.close()
-                except Exception:
-                    pass
-        except Exception as e:
-            logger.exception("No se pudo abrir la imagen para profile %s: %s", instance.pk, e)
-            # No hacemos nada (no guardamos embedding)
+        # Misma foto ya encolada o ya procesada sin encontrar rostro: otro intento daría lo mismo
+        if old_name == new_name and getattr(instance, "_old_embedding_status", None) in ("pending", "no_face"):
+            logger.debug("Foto sin cambios para profile %s (estado %s) -> no encolamos", instance.pk, instance._old_embedding_status)
             return
 
-        # Detectar caras y obtener encoding (usamos la primera cara detectada)
-        try:
-            face_locations = face_recognition.face_locations(image, model="hog")
-            if not face_locations:
-                # No se detectó cara, guardamos embedding=None para reflejarlo
-                Profile.objects.filter(pk=instance.pk).update(embedding=None)
-                logger.warning("No se detectó cara en la foto de profile %s. embedding set a None.", instance.pk)
-                return
-
-            encodings = face_recognition.face_encodings(image, known_face_locations=[face_locations[0]])
-            if not encodings:
-                Profile.objects.filter(pk=instance.pk).update(embedding=None)
-                logger.warning("No se calculó encoding para profile %s. embedding set a None.", instance.pk)
-                return
-
-            embedding = encodings[0].tolist()
-            # Usamos update() para evitar triggers adicionales de signals/save
-            Profile.objects.filter(pk=instance.pk).update(embedding=embedding)
-            logger.info("Embedding generado y guardado para profile %s", instance.pk)
-
-        except Exception as e:
-            logger.exception("Error procesando la imagen para profile %s: %s", instance.pk, e)
+        encolar_embedding(instance)
+        logger.info("Embedding encolado para profile %s", instance.pk)
 
     except Exception as e:
-        logger.exception("Error inesperado en signal post_save Profile pk=%s: %s", getattr(instance, "pk", None), e)
\ No newline at end of file
+        logger.exception("Error inesperado en signal post_save Profile pk=%s: %s", getattr(instance, "pk", None), e)
@@ -1,3 +1,127 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers, StopUpload
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .face_index import EMBEDDING_DIM, FaceEmbeddingIndex
+from .views_face import FaceLoginView, FaceUploadHandler
+
+
+@override_settings(FACE_MAX_UPLOAD_SIZE=1024)
+class FaceUploadHandlerTests(SimpleTestCase):
+    def handler(self):
+        handler = FaceUploadHandler(RequestFactory().post("/"))
+        handler.handle_raw_input(None, {}, None, None)
+        # Como MemoryFileUploadHandler, toma el archivo y deja fuera a los handlers siguientes
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file("foto", "cara.jpg", "image/jpeg", None)
+        return handler
+
+    def test_acepta_hasta_el_tope(self):
+        handler = self.handler()
+        self.assertIsNone(handler.receive_data_chunk(b"x" * 1024, 0))
+        self.assertFalse(handler.excedido)
+        self.assertEqual(handler.file_complete(1024).size, 1024)
+
+    def test_corta_al_pasar_el_tope(self):
+        handler = self.handler()
+        handler.receive_data_chunk(b"x" * 1000, 0)
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(b"x" * 100, 1000)
+        self.assertTrue(handler.excedido)
+
+    def test_leer_foto_responde_413_si_el_handler_corto(self):
+        handler = self.handler()
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(b"x" * 2048, 0)
+        request = SimpleNamespace(META={}, FILES={}, upload_handlers=[handler])
+
+        foto, data, error = FaceLoginView()._leer_foto(request)
+
+        self.assertIsNone(foto)
+        self.assertEqual(error.status_code, 413)
+
+
+@override_settings(FACE_MAX_UPLOAD_SIZE=1024)
+class FaceUploadViewTests(TestCase):
+    def test_content_length_mayor_al_tope_responde_413(self):
+        foto = SimpleUploadedFile("cara.jpg", b"x" * 4096, content_type="image/jpeg")
+        res = APIClient().post(reverse("face-login"), {"foto": foto}, format="multipart")
+        self.assertEqual(res.status_code, 413)
+
+    def test_sin_foto_responde_400(self):
+        res = APIClient().post(reverse("face-login"), {}, format="multipart")
+        self.assertEqual(res.status_code, 400)
+
+
+def _vector(**componentes):
+    """Vector de EMBEDDING_DIM con los componentes indicados (x0=..., x1=...)."""
+    v = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for nombre, valor in componentes.items():
+        v[int(nombre[1:])] = valor
+    return v
+
+
+class FaceEmbeddingIndexTests(SimpleTestCase):
+    def indice(self, usuarios):
+        """usuarios: {user_id: [embeddings]}; centroide y dispersión como actualizar_centroides."""
+        user_ids, centroids, spreads, members, owners = [], [], [], [], []
+        for pos, (user_id, embeddings) in enumerate(usuarios.items()):
+            centroide = np.mean(embeddings, axis=0)
+            user_ids.append(user_id)
+            centroids.append(centroide)
+            spreads.append(max(float(np.linalg.norm(e - centroide)) for e in embeddings))
+            members.extend(embeddings)
+            owners.extend([pos] * len(embeddings))
+        indice = FaceEmbeddingIndex()
+        indice.load(user_ids, centroids, spreads, members, owners)
+        return indice
+
+    def test_coincide_con_el_centroide_mas_cercano(self):
+        indice = self.indice({1: [_vector(x0=0.1)], 2: [_vector(x0=1.0)]})
+        user_id, distancia = indice.best_match(_vector(), 0.5)
+        self.assertEqual(user_id, 1)
+        self.assertAlmostEqual(distancia, 0.1, places=5)
+
+    def test_sin_coincidencia_fuera_de_tolerancia(self):
+        indice = self.indice({1: [_vector(x0=2.0)]})
+        self.assertIsNone(indice.best_match(_vector(), 0.5))
+
+    def test_indice_vacio(self):
+        indice = FaceEmbeddingIndex()
+        indice.load([], [], [])
+        self.assertEqual(indice.best_matches([_vector(), _vector(x1=1.0)], 0.5), [None, None])
+
+    def test_revisa_los_embeddings_si_el_centroide_no_alcanza(self):
+        # Centroide a 0.8 de la consulta, pero un embedding a 0.3: dentro de la cota
+        indice = self.indice({7: [_vector(x1=0.3), _vector(x0=1.6, x1=-0.3)]})
+        user_id, distancia = indice.best_match(_vector(), 0.5)
+        self.assertEqual(user_id, 7)
+        self.assertAlmostEqual(distancia, 0.3, places=5)
+
+    def test_la_cota_descarta_usuarios_lejanos(self):
+        # Dispersión declarada 0: distancia - dispersión > tolerancia, así que sus
+        # embeddings no se miran aunque uno esté cerca de la consulta
+        indice = FaceEmbeddingIndex()
+        indice.load([3], [_vector(x0=0.9)], [0.0], [_vector(x1=0.1)], [0])
+        self.assertIsNone(indice.best_match(_vector(), 0.5))
+
+        indice.load([3], [_vector(x0=0.9)], [0.5], [_vector(x1=0.1)], [0])
+        self.assertEqual(indice.best_match(_vector(), 0.5)[0], 3)
+
+    def test_lote_devuelve_resultados_en_orden(self):
+        indice = self.indice({1: [_vector(x0=0.0)], 2: [_vector(x1=1.0)]})
+        resultados = indice.best_matches([_vector(x1=0.95), _vector(x2=3.0), _vector(x0=0.05)], 0.5)
+        self.assertEqual([r and r[0] for r in resultados], [2, None, 1])
+
+    def test_update_y_remove(self):
+        indice = self.indice({1: [_vector(x0=1.0)]})
+        indice.update(2, _vector(x1=0.1))
+        self.assertEqual(indice.best_match(_vector(), 0.5)[0], 2)
+        indice.remove(2)
+        self.assertIsNone(indice.best_match(_vector(), 0.5))
+        self.assertEqual(len(indice), 1)
@@ -7,7 +7,7 @@ from .views import (RegisterView, UserViewSet, LogoutView,
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .token_serializers import MyTokenObtainPairSerializer, EmailTokenObtainPairSerializer
-from .views_face import FaceRegisterView, FaceLoginView
+from .views_face import FaceRegisterView, FaceLoginView, FaceMetricsView
 
 # Views que usan tus serializers custom
 class MyTokenObtainPairView(TokenObtainPairView):
@@ -35,6 +35,7 @@ urlpatterns = [
     path('profile/', ProfileView.as_view(), name='profile'),
     path("face/register/", FaceRegisterView.as_view(), name="face-register"),
     path("face/login/", FaceLoginView.as_view(), name="face-login"),
+    path("face/metrics/", FaceMetricsView.as_view(), name="face-metrics"),
     path("forgot-password/", ForgotPasswordView.as_view(), name="forgot-password"),
     path("reset-password/<uidb64>/<token>/", ResetPasswordView.as_view(), name="reset-password"),
     path('', include(router.urls)),
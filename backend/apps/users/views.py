@@ -108,7 +108,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return UserSerializer
 
     def get_queryset(self):
-        qs = super().get_queryset().select_related('profile')
+        qs = super().get_queryset().select_related('profile').defer('profile__embedding')
         role_q = self.request.query_params.get('role')
         if role_q:
             qs = qs.filter(profile__role=role_q)
@@ -145,7 +145,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
 class EmpleadoViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = User.objects.filter(profile__role='empleado').select_related('profile')
+    queryset = User.objects.filter(profile__role='empleado').select_related('profile').defer('profile__embedding')
     serializer_class = UserSerializer
     permission_classes = [IsInRequiredGroup]
     required_groups = ['Admin', 'Empleado']  # Admin y Empleado pueden acceder
@@ -153,13 +153,13 @@ class EmpleadoViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['username', 'email']
 
 class JuntaDirectivaViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = User.objects.filter(profile__role='junta').select_related('profile')
+    queryset = User.objects.filter(profile__role='junta').select_related('profile').defer('profile__embedding')
     serializer_class = UserSerializer
     permission_classes = [IsInRequiredGroup]
     required_groups = ['Admin', 'JuntaDirectiva']
 
 class GuardiaViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = User.objects.filter(profile__role='guardia').select_related('profile')
+    queryset = User.objects.filter(profile__role='guardia').select_related('profile').defer('profile__embedding')
     serializer_class = UserSerializer
     permission_classes = [IsInRequiredGroup]
     required_groups = ['Admin', 'Guardia']
@@ -192,13 +192,25 @@ class ChangePasswordView(generics.UpdateAPIView):
 class ProfileView(generics.RetrieveUpdateAPIView):
     """
     GET/PUT /users/profile/ -> editar teléfono u otros campos del Profile del propio usuario
+    GET /users/profile/?include=embedding -> incluye el embedding facial
     """
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
+    def _include_embedding(self):
+        return self.request.query_params.get('include') == 'embedding'
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_embedding'] = self._include_embedding()
+        return context
+
     def get_object(self):
-        return self.request.user.profile
+        qs = Profile.objects.filter(user=self.request.user)
+        if self._include_embedding():
+            qs = qs.with_embedding()
+        return get_object_or_404(qs)
 
 class VehiculoViewSet(viewsets.ModelViewSet):
     queryset = Vehiculo.objects.select_related("usuario", "unidad").all()
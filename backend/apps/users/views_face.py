@@ -1,85 +1,206 @@
 # apps/usuarios/views_face.py
-import face_recognition
-import numpy as np
-import tempfile
+import logging
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Profile
+from django.db import transaction
+from django.core.files.uploadhandler import MemoryFileUploadHandler, StopUpload
+from django.http import HttpResponse
+from django.utils import timezone
+from .models import EmbeddingJob, Profile
+from .permissions import HasMetricsToken
+from .services import agregar_embedding, buscar_rostro_cercano, contar_rostros_registrados, reemplazar_embeddings
+from . import face_metrics, face_processing, face_service
 
+logger = logging.getLogger(__name__)
 User = get_user_model()
 
-class FaceRegisterView(APIView):
+
+class FaceUploadHandler(MemoryFileUploadHandler):
+    """
+    Mantiene la foto subida siempre en memoria (nunca en un archivo temporal),
+    con un tope de FACE_MAX_UPLOAD_SIZE bytes.
+    """
+
+    # Queda en True si la foto superó el tope (p. ej. subida sin Content-Length)
+    excedido = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.max_size = getattr(settings, "FACE_MAX_UPLOAD_SIZE", 8 * 1024 * 1024)
+        self.activated = True
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.excedido = True
+            raise StopUpload()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class FaceUploadMixin:
+    """
+    Lee la foto con FaceUploadHandler (solo en memoria) y obtiene su encoding
+    a través de face_service (servicio de inferencia o, si no está configurado,
+    en el propio proceso).
+    """
+
+    # Etiqueta "endpoint" de las métricas de la vista
+    metrics_endpoint = None
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [FaceUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        # Una captura de tiempos por petición; se vuelca a los histogramas al terminar
+        with face_metrics.capturar() as captura:
+            try:
+                return super().dispatch(request, *args, **kwargs)
+            finally:
+                try:
+                    face_metrics.observar(self.metrics_endpoint, captura, contar_rostros_registrados())
+                except Exception:
+                    logger.exception("No se pudieron registrar las métricas de %s", self.metrics_endpoint)
+
+    def _foto_demasiado_grande(self, request):
+        max_size = getattr(settings, "FACE_MAX_UPLOAD_SIZE", 8 * 1024 * 1024)
+        try:
+            return int(request.META.get("CONTENT_LENGTH") or 0) > max_size
+        except ValueError:
+            return False
+
+    def _respuesta_demasiado_grande(self):
+        return Response({"error": "La foto excede el tamaño máximo permitido"},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def _leer_foto(self, request):
+        """
+        Devuelve (foto, data, error_response). data son los bytes de la foto en memoria.
+        """
+        if self._foto_demasiado_grande(request):
+            return None, None, self._respuesta_demasiado_grande()
+
+        with face_metrics.etapa("upload"):
+            foto = request.FILES.get("foto")
+            # Sin Content-Length el tope se detecta recién al leer: el handler lo anota
+            if any(getattr(h, "excedido", False) for h in request.upload_handlers):
+                return None, None, self._respuesta_demasiado_grande()
+            if not foto:
+                return None, None, Response({"error": "No se envió ninguna foto"}, status=status.HTTP_400_BAD_REQUEST)
+
+            foto.seek(0)
+            data = foto.read()
+            foto.seek(0)
+        return foto, data, None
+
+    def _calcular_encoding(self, data, endpoint):
+        """
+        Devuelve (encoding, error_response). encoding es None si no se detectó cara.
+        """
+        try:
+            return face_service.encode(data, endpoint), None
+        except face_processing.InvalidImage:
+            return None, Response({"error": "Imagen inválida"}, status=status.HTTP_400_BAD_REQUEST)
+        except face_service.FaceServiceBusy:
+            response = Response({"error": "Servicio de reconocimiento ocupado, intente nuevamente"},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response["Retry-After"] = "1"
+            return None, response
+        except face_service.FaceServiceError:
+            return None, Response({"error": "Servicio de reconocimiento no disponible"},
+                                  status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class FaceRegisterView(FaceUploadMixin, APIView):
     """
-    Guarda embedding en el perfil del usuario a partir de una foto
+    Añade al conjunto de embeddings del usuario el de una foto nueva (p. ej. con
+    otra iluminación) y la deja como foto de perfil.
     """
     permission_classes = [permissions.IsAuthenticated]
+    metrics_endpoint = "register"
 
     def post(self, request, *args, **kwargs):
-        foto = request.FILES.get("foto")
-        if not foto:
-            return Response({"error": "No se envió ninguna foto"}, status=status.HTTP_400_BAD_REQUEST)
-
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
-            for chunk in foto.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
-
-        image = face_recognition.load_image_file(tmp_path)
-        face_locations = face_recognition.face_locations(image)
-        if not face_locations:
+        foto, data, error = self._leer_foto(request)
+        if error is not None:
+            return error
+
+        encoding, error = self._calcular_encoding(data, "register")
+        if error is not None:
+            return error
+        if encoding is None:
             return Response({"error": "No se detectó ninguna cara"}, status=status.HTTP_400_BAD_REQUEST)
 
-        encoding = face_recognition.face_encodings(image, known_face_locations=[face_locations[0]])[0]
-        profile = request.user.profile
-        profile.embedding = encoding.tolist()
-        profile.foto = foto
-        profile.save()
+        with face_metrics.etapa("save"), transaction.atomic():
+            profile = request.user.profile
+            profile.embedding_version = settings.FACE_EMBEDDING_VERSION
+            profile.foto = foto
+            # El embedding ya corresponde a esta foto: no encolar otro cálculo
+            profile._embedding_calculado = True
+            profile.save()
+            # Un trabajo pendiente de una foto anterior ya no hace falta
+            EmbeddingJob.objects.filter(profile=profile, status="pending").update(
+                status="done", finished_at=timezone.now(), error=None,
+            )
+            # El de origen "perfil" era de la foto anterior; la nueva queda como "registro"
+            reemplazar_embeddings([(profile.pk, None, None)], "perfil")
+            agregar_embedding(profile, encoding, "registro", foto=profile.foto.name)
 
         return Response({"message": "Embedding guardado correctamente"}, status=status.HTTP_200_OK)
 
 
-class FaceLoginView(APIView):
+class FaceLoginView(FaceUploadMixin, APIView):
     """
-    Login por rostro: compara embedding recibido contra todos los perfiles registrados
+    Login por rostro: busca el embedding registrado más cercano al recibido
+    (pgvector o índice en memoria, según FACE_MATCH_BACKEND).
     """
     permission_classes = [permissions.AllowAny]
+    metrics_endpoint = "login"
 
     def post(self, request, *args, **kwargs):
-        foto = request.FILES.get("foto")
-        if not foto:
-            return Response({"error": "No se envió ninguna foto"}, status=status.HTTP_400_BAD_REQUEST)
-
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
-            for chunk in foto.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
-
-        image = face_recognition.load_image_file(tmp_path)
-        face_locations = face_recognition.face_locations(image)
-        if not face_locations:
+        foto, data, error = self._leer_foto(request)
+        if error is not None:
+            return error
+
+        encoding_actual, error = self._calcular_encoding(data, "login")
+        if error is not None:
+            return error
+        if encoding_actual is None:
             return Response({"error": "No se detectó ninguna cara"}, status=status.HTTP_400_BAD_REQUEST)
 
-        encoding_actual = face_recognition.face_encodings(image, known_face_locations=[face_locations[0]])[0]
-
-        usuarios = User.objects.filter(profile__embedding__isnull=False)
-        for u in usuarios:
-            emb_guardado = np.array(u.profile.embedding)
-            result = face_recognition.compare_faces([emb_guardado], encoding_actual, tolerance=0.5)
-            if result[0]:
-                refresh = RefreshToken.for_user(u)
-                return Response({
-                    "access": str(refresh.access_token),
-                    "refresh": str(refresh),
-                    "user": {
-                        "id": u.id,
-                        "username": u.username,
-                        "email": u.email,
-                        "role": u.profile.role,
-                        "foto": request.build_absolute_uri(u.profile.foto.url) if u.profile.foto else None
-                    }
-                })
-
-        return Response({"error": "No se encontró coincidencia"}, status=status.HTTP_401_UNAUTHORIZED)
+        with face_metrics.etapa("match"):
+            match = buscar_rostro_cercano(encoding_actual)
+        if match is None:
+            return Response({"error": "No se encontró coincidencia"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        user_id, _distancia = match
+        with face_metrics.etapa("token"):
+            u = User.objects.select_related("profile").defer("profile__embedding").filter(pk=user_id).first()
+            if u is None:
+                return Response({"error": "No se encontró coincidencia"}, status=status.HTTP_401_UNAUTHORIZED)
+            refresh = RefreshToken.for_user(u)
+        return Response({
+            "access": str(refresh.access_token),
+            "refresh": str(refresh),
+            "user": {
+                "id": u.id,
+                "username": u.username,
+                "email": u.email,
+                "role": u.profile.role,
+                "foto": request.build_absolute_uri(u.profile.foto.url) if u.profile.foto else None
+            }
+        })
+
+
+class FaceMetricsView(APIView):
+    """
+    Histogramas de tiempos del pipeline facial en formato de texto de
+    Prometheus. Solo para administradores o con el token FACE_METRICS_TOKEN
+    (`Authorization: Token ...`); detrás de un proxy la IP de origen no sirve.
+    """
+    permission_classes = [permissions.IsAdminUser | HasMetricsToken]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(face_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -25,6 +25,62 @@ EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True") == "True"
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
 
+# Reconocimiento facial
+FACE_MATCH_TOLERANCE = float(os.environ.get("FACE_MATCH_TOLERANCE", 0.5))
+# "pgvector": búsqueda del vecino más cercano en SQL (índice HNSW); "memory": índice por proceso
+FACE_MATCH_BACKEND = os.environ.get("FACE_MATCH_BACKEND", "pgvector")
+# Segundos tras los que cada proceso reconstruye su índice de rostros en memoria (0 = nunca)
+FACE_INDEX_TTL = int(os.environ.get("FACE_INDEX_TTL", 300))
+# Precargar face_recognition/dlib al arrancar (activar solo en los procesos que atienden rostros)
+FACE_WARMUP = os.environ.get("FACE_WARMUP", "False") == "True"
+# Tamaño máximo (bytes) de las fotos de login/registro facial; se procesan solo en memoria
+FACE_MAX_UPLOAD_SIZE = int(os.environ.get("FACE_MAX_UPLOAD_SIZE", 8 * 1024 * 1024))
+# Servicio local de inferencia facial (manage.py servidor_rostros). Sin socket, la
+# inferencia se ejecuta en el propio proceso web/worker.
+FACE_INFERENCE_SOCKET = os.environ.get("FACE_INFERENCE_SOCKET") or None
+FACE_INFERENCE_TIMEOUT = float(os.environ.get("FACE_INFERENCE_TIMEOUT", 10))
+# Detección por endpoint: modelo "hog" (CPU) o "cnn" (GPU), veces de upsampling y lado
+# máximo (px) de la copia reducida sobre la que se detecta. El encoding usa la imagen completa.
+FACE_PIPELINES = {
+    "login": {
+        "model": os.environ.get("FACE_LOGIN_MODEL", "hog"),
+        "upsample": int(os.environ.get("FACE_LOGIN_UPSAMPLE", 1)),
+        "max_dimension": int(os.environ.get("FACE_LOGIN_MAX_DIMENSION", 640)),
+    },
+    "register": {
+        "model": os.environ.get("FACE_REGISTER_MODEL", "hog"),
+        "upsample": int(os.environ.get("FACE_REGISTER_UPSAMPLE", 1)),
+        "max_dimension": int(os.environ.get("FACE_REGISTER_MAX_DIMENSION", 1024)),
+    },
+    "embedding": {
+        "model": os.environ.get("FACE_EMBEDDING_MODEL", "hog"),
+        "upsample": int(os.environ.get("FACE_EMBEDDING_UPSAMPLE", 1)),
+        "max_dimension": int(os.environ.get("FACE_EMBEDDING_MAX_DIMENSION", 1024)),
+    },
+    # Agente de cámaras de la garita (manage.py reconocimiento_camara)
+    "camera": {
+        "model": os.environ.get("FACE_CAMERA_MODEL", "hog"),
+        "upsample": int(os.environ.get("FACE_CAMERA_UPSAMPLE", 1)),
+        "max_dimension": int(os.environ.get("FACE_CAMERA_MAX_DIMENSION", 480)),
+    },
+}
+# Versión del modelo/preprocesado con que se generan los embeddings. Al cambiar
+# FACE_PIPELINES["embedding"] o el modelo, súbela y ejecuta `manage.py regenerar_embeddings`.
+FACE_EMBEDDING_VERSION = os.environ.get("FACE_EMBEDDING_VERSION", "1")
+# Token para leer /api/face/metrics/ (formato Prometheus) con `Authorization: Token ...`;
+# vacío = solo administradores autenticados
+FACE_METRICS_TOKEN = os.environ.get("FACE_METRICS_TOKEN", "")
+# Entradas de la caché LRU (por proceso) de encodings por contenido de la imagen (0 = desactivada)
+FACE_EMBEDDING_CACHE_SIZE = int(os.environ.get("FACE_EMBEDDING_CACHE_SIZE", 1024))
+# Caché del agente de cámaras por hash perceptual del recorte: entradas y segundos de vida
+FACE_FRAME_CACHE_SIZE = int(os.environ.get("FACE_FRAME_CACHE_SIZE", 256))
+FACE_FRAME_CACHE_TTL = float(os.environ.get("FACE_FRAME_CACHE_TTL", 10))
+# Embeddings que se conservan por usuario y origen (registros con distinta luz, etc.)
+FACE_MAX_EMBEDDINGS = int(os.environ.get("FACE_MAX_EMBEDDINGS", 5))
+
+# Horas que se conservan los archivos de los trabajos de reporte (worker `procesar_reportes`)
+REPORTES_RETENCION_HORAS = int(os.environ.get("REPORTES_RETENCION_HORAS", 24))
+
 # URL base para servir los archivos multimedia
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media' 
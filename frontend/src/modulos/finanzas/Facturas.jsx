@@ -29,6 +29,10 @@ export default function Facturas() {
   const [openModal, setOpenModal] = useState(false);
   const [editing, setEditing] = useState(null);
   const [morosos, setMorosos] = useState([]);
+  const [morososPage, setMorososPage] = useState(1);
+  const [morososTotal, setMorososTotal] = useState(0);
+  const [morososNext, setMorososNext] = useState(null);
+  const [morososPrev, setMorososPrev] = useState(null);
   const [showMorososModal, setShowMorososModal] = useState(false);
 
   const [openPagoModal, setOpenPagoModal] = useState(false);
@@ -146,10 +150,14 @@ export default function Facturas() {
     }
   }
 
-  async function fetchMorosos() {
+  async function fetchMorosos(p = 1) {
     try {
-      const res = await listMorosos();
-      setMorosos(res.data ?? []);
+      const res = await listMorosos({ page: p });
+      setMorosos(res.data?.results ?? res.data ?? []);
+      setMorososTotal(res.data?.count ?? (res.data?.length || 0));
+      setMorososNext(res.data?.next ?? null);
+      setMorososPrev(res.data?.previous ?? null);
+      setMorososPage(p);
       setShowMorososModal(true);
     } catch (err) {
       console.error(err);
@@ -206,7 +214,7 @@ export default function Facturas() {
 
         <div className="flex gap-2">
           <button onClick={() => { setEditing(null); setOpenModal(true); }} className="px-4 py-2 bg-blue-600 text-white rounded-xl shadow hover:bg-blue-700">Nueva Factura</button>
-          <button onClick={fetchMorosos} className="px-4 py-2 bg-orange-600 text-white rounded-xl shadow hover:bg-orange-700">Ver Morosos</button>
+          <button onClick={() => fetchMorosos(1)} className="px-4 py-2 bg-orange-600 text-white rounded-xl shadow hover:bg-orange-700">Ver Morosos</button>
           <button onClick={() => fetchFacturas()} className="px-4 py-2 bg-gray-200 rounded-xl">Actualizar</button>
         </div>
       </header>
@@ -296,6 +304,15 @@ export default function Facturas() {
                 </div>
               ))}
             </div>
+
+            <div className="flex justify-between items-center mt-4 text-sm">
+              <div className="text-gray-600">{morososTotal} unidades con deuda</div>
+              <div className="flex items-center gap-2">
+                <button onClick={() => fetchMorosos(morososPage - 1)} disabled={!morososPrev} className="px-3 py-1 border rounded disabled:opacity-50">Anterior</button>
+                <span>Página {morososPage}</span>
+                <button onClick={() => fetchMorosos(morososPage + 1)} disabled={!morososNext} className="px-3 py-1 border rounded disabled:opacity-50">Siguiente</button>
+              </div>
+            </div>
           </div>
         </div>
       )}
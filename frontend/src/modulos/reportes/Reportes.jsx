@@ -5,6 +5,8 @@ import {
   deleteReporteMorosidad,
   exportarReporteMorosidad,
   getReporteGeneral,
+  getTrabajoReporte,
+  descargarTrabajoReporte,
 } from "../../services/reportes";
 import ReporteMorosidadTable from "./components/ReporteMorosidadTable";
 import ReporteGeneralCard from "./components/ReporteGeneralCard";
@@ -39,9 +41,25 @@ export default function Reportes() {
     fetchReportes();
   };
 
+  // El PDF se encola (202) y se descarga cuando el trabajo termina
+  const esperarTrabajo = async (trabajoId) => {
+    for (;;) {
+      const { data } = await getTrabajoReporte(trabajoId);
+      if (data.status === "done") return descargarTrabajoReporte(trabajoId);
+      if (data.status === "failed" || data.status === "expired") {
+        throw new Error(data.error || `Trabajo ${data.status}`);
+      }
+      await new Promise((r) => setTimeout(r, 2000));
+    }
+  };
+
   const handleExport = async (id, formato) => {
     try {
-      const res = await exportarReporteMorosidad(id, formato);
+      let res = await exportarReporteMorosidad(id, formato);
+      if (res.status === 202) {
+        const trabajo = JSON.parse(await res.data.text());
+        res = await esperarTrabajo(trabajo.id);
+      }
       const url = window.URL.createObjectURL(new Blob([res.data]));
       const link = document.createElement("a");
       link.href = url;
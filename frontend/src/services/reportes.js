@@ -23,3 +23,9 @@ export const exportarReporteMorosidad = (id, formato) =>
   api.get(`/reportes/morosidad/${id}/exportar/${formato}/`, {
     responseType: "blob", // necesario para CSV/PDF
   });
+
+// --- Trabajos de reporte (PDF generado en segundo plano) ---
+export const getTrabajoReporte = (id) => api.get(`/reportes/trabajos/${id}/`);
+
+export const descargarTrabajoReporte = (id) =>
+  api.get(`/reportes/trabajos/${id}/descargar/`, { responseType: "blob" });